@@ -13,11 +13,13 @@ from agents.summary_agent import SummaryAgent
 from entity.session import create_session, TopicType
 from dao.session_dao import session_dao
 from dao.question_dao import question_dao
+from dao.unit_of_work import release_connection
 from entity.message import create_message, MessageRole, MessageType
 from entity.question import create_question
 import service.ocr_service as ocr_service
 from utils.exceptions import DataNotFoundException, ValidationException
 from utils.jwt_utils import get_current_user_id
+from config.settings import settings
 from service.extract_file_word import extract_text_from_file_url
 
 logger = logging.getLogger(__name__)
@@ -81,13 +83,15 @@ async def guide_question(request: GuideQuestionRequest, current_user_id: str = D
             session = create_session(TopicType.GUIDE, question)
             is_new_session = True
         else:
-            session = await session_dao.get_by_id(request.session_id)
+            session = await session_dao.get_by_id(request.session_id, message_window=settings.SESSION_MESSAGE_WINDOW)
             if not session:
                 session = create_session(TopicType.GUIDE, question)
                 is_new_session = True
             else:
                 session.question = question
 
+        # 调用大模型前归还数据库连接
+        await release_connection()
         state = await agent_graph.ainvoke({
             "session": session,
             "latest_message": create_message(
@@ -132,10 +136,12 @@ async def gossip_chat(request: GossipChatRequest, current_user_id: str = Depends
         if not request.session_id:
             session = create_session(TopicType.GOSSIP, None)
         else:
-            session = await session_dao.get_by_id(request.session_id)
+            session = await session_dao.get_by_id(request.session_id, message_window=settings.SESSION_MESSAGE_WINDOW)
             if not session:
                 session = create_session(TopicType.GOSSIP, None)
 
+        # 调用大模型前归还数据库连接
+        await release_connection()
         state = await agent_graph.ainvoke({
             "session": session,
             "latest_message": create_message(
@@ -177,6 +183,8 @@ async def generate_questions(request: GenerateQuestionsRequest, current_user_id:
             content=f"{request.ai_prompt}\n请根据提示生成{request.count}个题目",
             message_type=MessageType.TEXT
         )
+        # 调用大模型前归还数据库连接
+        await release_connection()
         state = await agent_graph.ainvoke({
             "session": session,
             "latest_message": new_message,
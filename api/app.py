@@ -2,12 +2,19 @@
 FastAPI应用主文件
 """
 
-from fastapi import FastAPI, Request
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from config.settings import settings
 from utils.helpers import setup_logging
 from utils.exceptions import BusinessException
+from dao.database import init_engine, dispose_engine
+from dao.unit_of_work import request_unit_of_work
+from dao.query_stats import track_queries
+from dao.slow_query import set_current_endpoint, reset_current_endpoint
+from dao.session_dao import session_dao
 
 # 导入所有路由
 from .exam_api import exam_router
@@ -16,32 +23,43 @@ from .question_api import question_router
 from .goal_api import goal_router
 from .ai_api import ai_router
 from .session_api import session_router
+from .diagnostics_api import diagnostics_router
+
+async def archive_sessions_periodically():
+    """后台任务：定期归档空闲的会话"""
+    while True:
+        await asyncio.sleep(settings.SESSION_ARCHIVE_INTERVAL)
+        try:
+            await session_dao.archive_idle_sessions()
+        except Exception as e:
+            logger.error(f"定期归档会话失败: {str(e)}")
 
-# 创建FastAPI应用
-app = FastAPI(
-    title="Homework Mentor API",
-    description="学习管理系统API",
-    version="1.0.0"
-)
 
-@app.on_event("startup")
-async def startup_event():
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用启动时创建唯一的数据库引擎并预热连接池，启动会话归档任务，关闭时停止任务并释放连接"""
     logger.info("FastAPI启动事件")
     try:
-        # 尝试导入数据库相关模块
-        from dao.database import create_async_database_engine
-        from sqlalchemy import text
-        
-        # 创建数据库引擎
-        logger.info("检查数据库连接")
-        engine = create_async_database_engine()
-        async with engine.begin() as conn:
-            await conn.execute(text("SELECT 1"))
-        
+        await init_engine()
     except Exception as e:
         logger.error(f"数据库连接失败: {str(e)}")
         raise e
+    archive_task = asyncio.create_task(archive_sessions_periodically()) if settings.SESSION_ARCHIVE_ENABLED else None
+    yield
+    if archive_task is not None:
+        archive_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await archive_task
+    await dispose_engine()
+
 
+# 创建FastAPI应用
+app = FastAPI(
+    title="Homework Mentor API",
+    description="学习管理系统API",
+    version="1.0.0",
+    lifespan=lifespan
+)
 
 
 # 配置CORS
@@ -53,13 +71,35 @@ app.add_middleware(
     allow_headers=["*"],  # 允许所有头部
 )
 
-# 注册路由
-app.include_router(exam_router, prefix="/api")
-app.include_router(user_router, prefix="/api")
-app.include_router(question_router, prefix="/api")
-app.include_router(goal_router, prefix="/api")
-app.include_router(ai_router, prefix="/api")
-app.include_router(session_router, prefix="/api")
+
+@app.middleware("http")
+async def request_context_middleware(request: Request, call_next):
+    """记录当前请求的接口(慢查询日志使用)；调试模式下统计请求执行的SQL语句，写入响应头并记录可能的N+1查询"""
+    endpoint = f"{request.method} {request.url.path}"
+    token = set_current_endpoint(endpoint)
+    try:
+        if not settings.API_DEBUG:
+            return await call_next(request)
+        with track_queries() as stats:
+            response = await call_next(request)
+        response.headers['X-DB-Query-Count'] = str(stats.count)
+        response.headers['X-DB-Query-Time-Ms'] = f"{stats.total_time * 1000:.1f}"
+        logger.debug(f"{endpoint} SQL统计: {stats.get_summary()}")
+        for shape, count in stats.get_repeated(settings.N_PLUS_ONE_THRESHOLD):
+            logger.warning(f"{endpoint} 可能存在N+1查询，同一语句执行了{count}次: {shape}")
+        return response
+    finally:
+        reset_current_endpoint(token)
+
+# 注册路由，业务接口的每个请求使用一个工作单元(一个数据库会话和事务)
+unit_of_work_dependencies = [Depends(request_unit_of_work)]
+app.include_router(exam_router, prefix="/api", dependencies=unit_of_work_dependencies)
+app.include_router(user_router, prefix="/api", dependencies=unit_of_work_dependencies)
+app.include_router(question_router, prefix="/api", dependencies=unit_of_work_dependencies)
+app.include_router(goal_router, prefix="/api", dependencies=unit_of_work_dependencies)
+app.include_router(ai_router, prefix="/api", dependencies=unit_of_work_dependencies)
+app.include_router(session_router, prefix="/api", dependencies=unit_of_work_dependencies)
+app.include_router(diagnostics_router, prefix="/api")
 
 # 设置日志
 logger = setup_logging()
@@ -0,0 +1,76 @@
+"""
+诊断API - 查看数据访问层的运行状态
+"""
+
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from dao.cache import entity_cache
+from dao.database import get_pool_stats
+from dao.index_check import get_uncovered_shapes
+from dao.slow_query import slow_query_log
+from config.settings import settings
+from utils.exceptions import PermissionException
+from utils.jwt_utils import get_current_user_id
+from api.question_api import BaseResponse
+import logging
+
+logger = logging.getLogger(__name__)
+
+diagnostics_router = APIRouter(prefix="/diagnostics", tags=["诊断服务"])
+
+
+async def get_admin_user_id(current_user_id: str = Depends(get_current_user_id)) -> str:
+    """获取当前用户ID，不在ADMIN_USER_IDS中时拒绝访问 - FastAPI依赖注入函数"""
+    admin_user_ids = {user_id.strip() for user_id in (settings.ADMIN_USER_IDS or '').split(',') if user_id.strip()}
+    if current_user_id not in admin_user_ids:
+        raise PermissionException("需要管理员权限")
+    return current_user_id
+
+
+@diagnostics_router.get("/cache")
+async def get_cache_stats(current_user_id: str = Depends(get_current_user_id)):
+    """获取实体缓存的命中、未命中、淘汰等统计信息"""
+    return BaseResponse(
+        message="success",
+        data=entity_cache.get_stats()
+    )
+
+
+@diagnostics_router.get("/indexes")
+async def get_uncovered_queries(current_user_id: str = Depends(get_current_user_id)):
+    """获取运行中发现的没有可用索引的搜索条件与排序组合"""
+    return BaseResponse(
+        message="success",
+        data={'uncovered': get_uncovered_shapes()}
+    )
+
+
+@diagnostics_router.get("/pool")
+async def get_pool_status(current_user_id: str = Depends(get_current_user_id)):
+    """获取数据库连接池的使用中连接数、溢出连接数、获取连接耗时等统计信息"""
+    return BaseResponse(
+        message="success",
+        data=get_pool_stats()
+    )
+
+
+@diagnostics_router.get("/slow-queries")
+async def get_slow_queries(
+    limit: Optional[int] = Query(None, ge=1, description="返回的最近记录数，默认全部"),
+    current_user_id: str = Depends(get_admin_user_id)
+):
+    """获取最近的慢查询记录(SQL、脱敏后的参数、耗时、接口和执行计划)，最新的在前，仅管理员可以访问"""
+    return BaseResponse(
+        message="success",
+        data={**slow_query_log.get_stats(), 'records': slow_query_log.get_records(limit)}
+    )
+
+
+@diagnostics_router.delete("/slow-queries")
+async def clear_slow_queries(current_user_id: str = Depends(get_admin_user_id)):
+    """清空慢查询记录，仅管理员可以访问"""
+    slow_query_log.clear()
+    return BaseResponse(
+        message="success",
+        data=slow_query_log.get_stats()
+    )
@@ -7,13 +7,14 @@ from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 from entity.exam import Exam, ExamStatus, create_exam
-from dao.question_dao import question_dao
+from entity.exam_answer import ExamAnswer, parse_answer_patch
 from dao.exam_dao import exam_dao
 from utils.jwt_utils import verify_token, get_current_user_id
-from utils.exceptions import DataNotFoundException, ValidationException, BusinessException
+from utils.exceptions import DataNotFoundException, ValidationException, BusinessException, ConflictException
 import json
 import logging
-from utils.api_helper import parse_dynamic_filters
+from utils.api_helper import parse_dynamic_filters, parse_fields
+from config.settings import settings
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +35,14 @@ class FinishExamRequest(BaseModel):
     answer_json: Dict[str, Any]
 
 
+class AnswerPatchRequest(BaseModel):
+    id: str
+    # 客户端每次保存递增的序号，不大于已保存序号的增量被拒绝
+    seq: int
+    # 类似JSON Patch的操作列表，如 {"op": "replace", "path": "/问题ID/answer", "value": "A"}
+    patches: List[Dict[str, Any]]
+
+
 class ExamResponse(BaseModel):
     code: int = 0
     message: str
@@ -74,21 +83,32 @@ async def create_exam_api(request: CreateExamRequest, current_user_id: str = Dep
 
 @exam_router.post("/finish", response_model=ExamResponse)
 async def finish_exam(request: FinishExamRequest, current_user_id: str = Depends(get_current_user_id)):
-    """提交考试答卷（只能修改answer_json字段）"""
+    """提交考试答卷，每个问题的答案写入exam_answer表"""
     try:
         # 验证考试是否存在
         exam = await exam_dao.get_by_id(request.id)
         if not exam:
             raise DataNotFoundException("考试", request.id)
 
-        # 更新答案
-        exam.answer_json = json.dumps(request.answer_json)
-        exam.status = ExamStatus.completed
-        updated_exam = await exam_dao.update(exam)
-
+        # 答卷按问题拆分，只允许考试包含的问题
+        try:
+            answers = ExamAnswer.from_answer_json(exam.id, request.answer_json)
+        except ValueError as e:
+            raise ValidationException("answer_json", str(e))
+        exam_question_ids = set(exam.get_question_ids())
+        unknown_ids = [a.question_id for a in answers if a.question_id not in exam_question_ids]
+        if unknown_ids:
+            raise ValidationException("answer_json", f"包含不属于考试的问题: {unknown_ids}")
+
+        # 更新答案并完成考试，旧版本的整份答卷不再保留，之后到达的增量被拒绝
+        await exam_dao.complete_with_answers(exam.id, answers)
+        updated_exam = await exam_dao.get_by_id(exam.id)
+
+        exam_data = updated_exam.to_dict()
+        exam_data['answers'] = [a.to_dict() for a in answers]
         return ExamResponse(
             message='答卷更新成功',
-            data=updated_exam.to_dict()
+            data=exam_data
         )
 
     except BusinessException:
@@ -99,19 +119,78 @@ async def finish_exam(request: FinishExamRequest, current_user_id: str = Depends
         raise HTTPException(status_code=500, detail="更新答卷失败，请稍后重试")
 
 
+@exam_router.post("/answer-patch", response_model=ExamResponse)
+async def patch_exam_answer(request: AnswerPatchRequest, current_user_id: str = Depends(get_current_user_id)):
+    """增量保存答卷，只修改增量涉及的问题的答案"""
+    try:
+        if request.seq < 1:
+            raise ValidationException("seq", "必须是正整数")
+        try:
+            changes = parse_answer_patch(request.patches)
+        except ValueError as e:
+            raise ValidationException("patches", str(e))
+
+        # 验证考试是否存在，只允许考试包含的问题
+        exam = await exam_dao.get_by_id(request.id)
+        if not exam:
+            raise DataNotFoundException("考试", request.id)
+        positions = {question_id: position for position, question_id in enumerate(exam.get_question_ids())}
+        unknown_ids = [question_id for question_id in changes if question_id not in positions]
+        if unknown_ids:
+            raise ValidationException("patches", f"包含不属于考试的问题: {unknown_ids}")
+
+        applied, answer_seq, status = await exam_dao.apply_answer_patch(exam.id, request.seq, changes, positions)
+        if not applied:
+            if status == ExamStatus.completed:
+                raise ConflictException(f"考试已完成，不能再修改答卷: {exam.id}")
+            raise ConflictException(f"答卷增量已过期: 序号{request.seq}，已保存的序号{answer_seq}")
+
+        return ExamResponse(
+            message='答卷保存成功',
+            data={'id': exam.id, 'answer_seq': answer_seq, 'question_ids': list(changes)}
+        )
+
+    except BusinessException:
+        raise
+
+    except Exception as e:
+        logger.exception(f"增量保存答卷失败: {e}")
+        raise HTTPException(status_code=500, detail="保存答卷失败，请稍后重试")
+
+
+@exam_router.get("/question-accuracy")
+async def get_question_accuracy(
+    question_ids: str = Query(..., description="问题ID，逗号分隔"),
+    current_user_id: str = Depends(get_current_user_id)
+):
+    """按问题统计答题数、正确率和平均耗时"""
+    try:
+        ids = [question_id.strip() for question_id in question_ids.split(',') if question_id.strip()]
+        if not ids:
+            raise ValidationException("question_ids", "不能为空")
+        stats = await exam_dao.get_question_accuracy(ids)
+        return ExamResponse(
+            message='获取问题正确率成功',
+            data={'questions': list(stats.values())}
+        )
+
+    except BusinessException:
+        raise
+
+    except Exception as e:
+        logger.exception(f"获取问题正确率失败: {e}")
+        raise HTTPException(status_code=500, detail="获取问题正确率失败，请稍后重试")
+
+
 @exam_router.delete("/delete")
 async def delete_exam(id: str = Query(..., description="考试ID"), current_user_id: str = Depends(get_current_user_id)):
     """删除考试（软删除）"""
     try:
-        # 验证考试是否存在
-        exam = await exam_dao.get_by_id(id)
-        if not exam:
+        # 软删除，没有删除任何行时考试不存在
+        deleted = await exam_dao.soft_delete_where({'id': id})
+        if not deleted:
             raise DataNotFoundException("考试", id)
 
-        # 软删除
-        exam.is_deleted = True
-        await exam_dao.update(exam)
-
         return ExamResponse(message='考试删除成功')
 
     except BusinessException:
@@ -126,17 +205,15 @@ async def delete_exam(id: str = Query(..., description="考试ID"), current_user
 async def get_exam(id: str = Query(..., description="考试ID"), current_user_id: str = Depends(get_current_user_id)):
     """获取单个考试详情"""
     try:
-        # 获取考试详细信息
-        exam = await exam_dao.get_by_id(id)
+        # 获取考试详细信息，问题列表一次查询按顺序加载，答案按答卷中的顺序加载
+        exam = await exam_dao.get_exam_with_answers(id)
         if not exam:
             raise DataNotFoundException("考试", id)
 
-        # 构建返回数据
+        # 构建返回数据，旧版本的整份答卷仍在answer_json中
         exam_data = exam.to_dict()
-        if exam.question_ids and len(exam.question_ids) > 0:
-            question_id_list = exam.question_ids.split(',')
-            questions = await question_dao.search_by_kwargs({'id': {'$in': question_id_list}})
-            exam_data['questions'] = [q.to_dict() for q in questions]
+        exam_data['questions'] = [q.to_dict() for q in exam.get_questions_list()]
+        exam_data['answers'] = [a.to_dict() for a in exam.get_answers()]
 
     except BusinessException:
         raise
@@ -145,7 +222,6 @@ async def get_exam(id: str = Query(..., description="考试ID"), current_user_id
         logger.exception(f"获取考试详情失败: {e}")
         raise HTTPException(status_code=500, detail="获取考试详情失败，请稍后重试")
 
-    exam_data['questions'].sort(key=lambda x: question_id_list.index(x['id']))
     return ExamResponse(
         message='获取考试详情成功',
         data=exam_data
@@ -156,6 +232,8 @@ async def get_exam(id: str = Query(..., description="考试ID"), current_user_id
 async def list_exams(
     page: int = Query(1, description="页码"),
     page_size: int = Query(10, description="每页数量"),
+    cursor: Optional[str] = Query(None, description="上一页返回的next_cursor，传入时忽略page"),
+    fields: Optional[str] = Query(None, description="返回的字段，逗号分隔，默认不返回答卷"),
     current_user_id: str = Depends(get_current_user_id),
     request: Request = None
 ):
@@ -169,9 +247,12 @@ async def list_exams(
         # kwargs = {'is_deleted': False, 'examinee_id': current_user_id}
         kwargs = {'is_deleted': False}
         
-        # 解析动态过滤参数
+        # 获取排序参数
+        order_by = request.query_params.get('order_by', '-plan_starttime')
+
+        # 解析动态过滤参数，只允许考试过滤模式中声明的字段、操作符和排序
         dynamic_filters = parse_dynamic_filters(request)
-        kwargs.update(dynamic_filters)
+        kwargs.update(exam_dao.filter_schema.validate(dynamic_filters, order_by))
         
         # # 添加基本过滤条件
         # if goal_id:
@@ -188,12 +269,11 @@ async def list_exams(
         #     # 只有结束时间
         #     kwargs['plan_starttime'] = {"$lte": plan_starttime_to}
 
-        # 获取排序参数
-        order_by = request.query_params.get('order_by', '-plan_starttime')
-        
-        # 查询考试列表
-        exams = await exam_dao.search_by_kwargs(kwargs, skip, limit, order_by=order_by)
-        total = await exam_dao.count_by_kwargs(kwargs)
+        # 查询考试列表和总数
+        exams, total = await exam_dao.search_with_total(
+            kwargs, skip, limit, order_by=order_by, cursor=cursor, count_mode=settings.LIST_COUNT_MODE,
+            fields=parse_fields(fields, Exam.get_list_fields())
+        )
 
         # 转换为字典格式
         exam_list = [exam.to_dict() for exam in exams]
@@ -205,10 +285,13 @@ async def list_exams(
                 'total': total,
                 'page': page,
                 'page_size': page_size,
-                'pages': (total + page_size - 1) // page_size
+                'pages': (total + page_size - 1) // page_size,
+                'next_cursor': exam_dao.next_cursor(Exam, exams, limit, order_by)
             }
         )
 
+    except ValueError as e:
+        raise ValidationException("query", str(e))
     except Exception as e:
         logger.exception(f"获取考试列表失败: {e}")
         raise HTTPException(status_code=500, detail="获取考试列表失败，请稍后重试")
@@ -225,9 +308,12 @@ async def update_exam(request: UpdateExamRequest, current_user_id: str = Depends
 
         # 更新考试
         request_exam = Exam.from_dict(request.dict())
-        for key, value in request_exam.model_dump().items():
+        for key in request_exam.model_fields_set:
+            value = getattr(request_exam, key)
             if value is not None:
                 setattr(exam, key, value)
+        if request.question_ids is not None:
+            exam.set_question_ids(request.question_ids)
         updated_exam = await exam_dao.update(exam)
 
 
@@ -13,6 +13,7 @@ from dao.goal_dao import goal_dao
 from dao.user_dao import user_dao
 from utils.jwt_utils import verify_token, get_current_user_id
 from utils.exceptions import DataNotFoundException, ValidationException, BusinessException
+from config.settings import settings
 
 logger = logging.getLogger(__name__)
 
@@ -91,6 +92,7 @@ async def list_goals_api(
     creator_id: Optional[str] = Query(None, description="创建人ID过滤"),
     page: int = Query(1, description="页码，默认1"),
     page_size: int = Query(10, description="每页数量，默认10"),
+    cursor: Optional[str] = Query(None, description="上一页返回的next_cursor，传入时忽略page"),
     current_user_id: str = Depends(get_current_user_id)
 ):
     """
@@ -102,6 +104,7 @@ async def list_goals_api(
     - creator_id: 创建人ID过滤（可选）
     - page: 页码，默认1
     - page_size: 每页数量，默认10
+    - cursor: 游标分页，传入上一页返回的next_cursor（可选）
     """
     try:
         # 计算分页参数
@@ -114,9 +117,11 @@ async def list_goals_api(
             filters["name"] = name
         if creator_id is not None:
             filters["creator_id"] = creator_id
+        filters = goal_dao.filter_schema.validate(filters)
 
-        goals = await goal_dao.search_by_kwargs(filters, skip=skip, limit=limit)
-        total = await goal_dao.count_by_kwargs(filters)
+        goals, total = await goal_dao.search_with_total(
+            filters, skip=skip, limit=limit, cursor=cursor, count_mode=settings.LIST_COUNT_MODE
+        )
 
         # 转换为响应格式
         goal_responses = [g.to_dict() for g in goals]
@@ -128,10 +133,13 @@ async def list_goals_api(
                 'total': total,
                 'page': page,
                 'page_size': page_size,
-                'pages': (total + page_size - 1) // page_size
+                'pages': (total + page_size - 1) // page_size,
+                'next_cursor': goal_dao.next_cursor(Goal, goals, limit)
             }
         )
 
+    except ValueError as e:
+        raise ValidationException("query", str(e))
     except Exception as e:
         logger.error(f"获取目标列表失败: {e}")
         raise HTTPException(status_code=500, detail=f"获取目标列表失败: {str(e)}")
@@ -13,6 +13,8 @@ from dao.user_dao import user_dao
 from entity.question import Question, QuestionType, Subject, create_question
 from utils.jwt_utils import verify_token, get_current_user_id
 from utils.exceptions import DataNotFoundException, ValidationException, BusinessException
+from utils.api_helper import parse_fields
+from config.settings import settings
 
 logger = logging.getLogger(__name__)
 
@@ -234,8 +236,11 @@ async def list_questions_api(
     question_type: Optional[str] = Query(None, description="问题类型筛选"),
     creator_id: Optional[str] = Query(None, description="创建人ID筛选"),
     is_active: Optional[bool] = Query(None, description="是否激活筛选"),
+    keyword: Optional[str] = Query(None, description="题干、材料全文搜索关键词"),
     page: int = Query(1, description="页码，默认1"),
     page_size: int = Query(10, description="每页数量，默认10"),
+    cursor: Optional[str] = Query(None, description="上一页返回的next_cursor，传入时忽略page"),
+    fields: Optional[str] = Query(None, description="返回的字段，逗号分隔，默认不返回材料"),
     current_user_id: str = Depends(get_current_user_id)
 ):
     """
@@ -246,8 +251,11 @@ async def list_questions_api(
     - type: 问题类型筛选（可选）
     - creator_id: 创建人ID筛选（可选）
     - is_active: 是否激活筛选（可选）
+    - keyword: 全文搜索题干和材料，结果按相关度排序，此时不支持游标分页（可选）
     - page: 页码，默认1
     - page_size: 每页数量，默认10
+    - cursor: 游标分页，传入上一页返回的next_cursor（可选）
+    - fields: 返回的字段，逗号分隔，如 id,title,subject；默认返回除材料(material)以外的字段（可选）
     """
     try:
         # 计算分页参数
@@ -264,12 +272,15 @@ async def list_questions_api(
             filters["creator_id"] = creator_id
         if is_active is not None:
             filters["is_active"] = is_active
-
-        # 查询问题列表
-        questions = await question_dao.search_by_kwargs(filters, skip=skip, limit=limit)
-
-        # 统计总数
-        total = await question_dao.count_by_kwargs(filters)
+        if keyword:
+            filters["title"] = {"$match": keyword}
+        filters = question_dao.filter_schema.validate(filters)
+
+        # 查询问题列表和总数
+        questions, total = await question_dao.search_with_total(
+            filters, skip=skip, limit=limit, cursor=cursor, count_mode=settings.LIST_COUNT_MODE,
+            fields=parse_fields(fields, Question.get_list_fields())
+        )
 
         # 转换为响应格式
         question_responses = [q.to_dict() for q in questions]
@@ -281,10 +292,13 @@ async def list_questions_api(
                 'total': total,
                 'page': page,
                 'page_size': page_size,
-                'pages': (total + page_size - 1) // page_size
+                'pages': (total + page_size - 1) // page_size,
+                'next_cursor': None if keyword else question_dao.next_cursor(Question, questions, limit)
             }
         )
 
+    except ValueError as e:
+        raise ValidationException("query", str(e))
     except Exception as e:
         logger.exception(f"获取问题列表失败: {e}")
         raise HTTPException(status_code=500, detail=f"获取问题列表失败: {str(e)}")
@@ -331,12 +345,13 @@ async def batch_create_questions_api(request: QuestionBatchCreateRequest, curren
         questions = []
         errors = []
 
+        # 一次查询验证所有创建人是否存在
+        _, missing_creator_ids = await user_dao.get_many([q.creator_id for q in request.questions])
         for index, question_data in enumerate(request.questions):
-            # 验证创建人是否存在
-            creator = await user_dao.get_by_id(question_data.creator_id)
-            if not creator:
+            if question_data.creator_id in missing_creator_ids:
                 raise DataNotFoundException(f"第{index+1}个问题创建人", question_data.creator_id)
 
+        for question_data in request.questions:
             # 创建问题
             question = create_question(
                 subject=question_data.subject,
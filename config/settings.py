@@ -3,7 +3,7 @@
 """
 
 import os
-from typing import Optional
+from typing import Literal, Optional
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 
@@ -35,6 +35,66 @@ class Settings(BaseSettings):
     # 数据库配置（如果需要）
     DATABASE_URL: str = None
 
+    # 数据库连接池：常驻连接数、高峰时额外允许的连接数、获取连接的超时秒数、连接回收秒数，
+    # 以及启动时预先建立的连接数
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 300
+    DB_POOL_WARMUP: int = 5
+
+    # SQLite部署(DATABASE_URL=sqlite+aiosqlite:///path/to/db)的连接参数：日志模式、同步级别、
+    # 内存映射大小(字节)、锁等待超时(毫秒)；写操作在进程内排队，同一时间只有一个写事务
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_MMAP_SIZE: int = 268435456
+    SQLITE_BUSY_TIMEOUT: int = 5000
+
+    # 只读库：多个地址用逗号分隔，未配置时读写都使用DATABASE_URL；
+    # 选择策略为round_robin(轮询)或least_busy(使用中连接最少)，其他值启动时报错。
+    # 本地测试可以把只读库指向同一个SQLite文件或它的副本
+    DATABASE_READ_URLS: Optional[str] = None
+    DATABASE_READ_STRATEGY: Literal["round_robin", "least_busy"] = "round_robin"
+
+    # 列表接口总数统计方式: exact / cached / estimate，以及cached模式的缓存秒数
+    LIST_COUNT_MODE: str = "exact"
+    COUNT_CACHE_TTL: int = 30
+
+    # 批量创建时每条INSERT语句最多包含的行数
+    BATCH_INSERT_CHUNK_SIZE: int = 500
+    # 流式读取(stream_by_kwargs)时每块的行数
+    STREAM_CHUNK_SIZE: int = 500
+
+    # 实体缓存：按ID读取的实体在进程内缓存，ttl为秒
+    ENTITY_CACHE_ENABLED: bool = True
+    ENTITY_CACHE_MAX_SIZE: int = 10000
+    ENTITY_CACHE_TTL: int = 60
+
+    # 搜索时检查过滤与排序组合是否有可用索引，没有则记录警告
+    INDEX_CHECK_ENABLED: bool = True
+
+    # 调试模式下统计每个请求执行的SQL语句，同一形状的语句执行次数达到阈值时记录N+1查询警告
+    N_PLUS_ONE_THRESHOLD: int = 5
+
+    # 慢查询日志：DAO查询耗时超过阈值(毫秒)时记录并获取执行计划，进程内最多保留SLOW_QUERY_LOG_SIZE条
+    SLOW_QUERY_LOG_ENABLED: bool = True
+    SLOW_QUERY_THRESHOLD_MS: int = 500
+    SLOW_QUERY_LOG_SIZE: int = 200
+    SLOW_QUERY_EXPLAIN: bool = True
+    # 可以查看和清空慢查询记录的管理员用户ID，逗号分隔；记录中包含其他用户的SQL和参数，未配置时所有用户都不能访问
+    ADMIN_USER_IDS: Optional[str] = None
+
+    # 会话配置：AI对话时加载的历史消息窗口大小
+    SESSION_MESSAGE_WINDOW: int = 50
+
+    # 会话归档：最后活动时间超过保留天数的会话连同消息压缩后移到session_archive表，按ID读取时自动恢复。
+    # 闲聊会话的保留天数较短；后台任务每SESSION_ARCHIVE_INTERVAL秒执行一次，每个事务最多归档SESSION_ARCHIVE_BATCH_SIZE个会话
+    SESSION_ARCHIVE_ENABLED: bool = True
+    SESSION_ARCHIVE_AFTER_DAYS: int = 90
+    SESSION_ARCHIVE_GOSSIP_AFTER_DAYS: int = 14
+    SESSION_ARCHIVE_INTERVAL: int = 3600
+    SESSION_ARCHIVE_BATCH_SIZE: int = 200
+
     # easyocr指定保存下载model的路径
     EASYOCR_MODULE_PATH: str = None
 
@@ -1,90 +1,317 @@
 from abc import ABC, abstractmethod
-from dao.database import get_async_session_maker
-from typing import List, Union, Dict, Any
-from sqlalchemy import func
-from sqlmodel import select, update, delete
+from dao.database import get_async_session_maker, get_read_session_maker, get_write_lock
+from dao.cache import entity_cache
+from dao.unit_of_work import get_current_unit_of_work, mark_written, should_read_primary
+from dao.index_check import check_index_coverage
+from dao.filter_schema import build_condition, get_columns, parse_filter_value
+from dao.slow_query import slow_query_log
+from entity.fulltext import fulltext_score
+from config.settings import settings
+from typing import List, Union, Dict, Any, Tuple, Optional, AsyncIterator, Callable, Awaitable
+from sqlalchemy import func, and_, or_
+from sqlmodel import select, insert, update, delete, text
+from sqlalchemy import inspect as sa_inspect
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+from contextlib import asynccontextmanager, nullcontext
+from collections import OrderedDict
 from datetime import datetime, timezone
+from enum import Enum
+import base64
+import json
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
 class BaseDao(ABC):
-    def __init__(self):
-        self.session_maker = None
+    # 总数缓存: (实体类名, 过滤条件) -> (过期时间, 总数)，所有DAO共享，超过容量时淘汰最久未使用的
+    _count_cache: 'OrderedDict[Tuple[str, str], Tuple[float, int]]' = OrderedDict()
+    COUNT_CACHE_MAX_SIZE = 1024
 
     async def _get_session_maker(self):
-        """获取异步会话工厂"""
-        if self.session_maker is None:
-            self.session_maker = await get_async_session_maker()
-        return self.session_maker
+        """获取异步会话工厂，每次从dao.database获取，引擎重新创建后使用新的会话工厂"""
+        return await get_async_session_maker()
+
+    def _get_read_session_maker(self):
+        """只读查询可以使用的只读库会话工厂，没有配置只读库或需要读主库时返回None"""
+        if should_read_primary():
+            return None
+        return get_read_session_maker()
+
+    @asynccontextmanager
+    async def _session_scope(self, savepoint: bool = False, read_only: bool = False, primary: bool = False) -> AsyncIterator[AsyncSession]:
+        """
+        获取数据库会话: 在工作单元中时使用工作单元的会话，否则打开新会话
+
+        Args:
+            savepoint: 在工作单元中时是否使用保存点，用于捕获数据库异常后还要继续的操作，
+                出错时只回滚保存点，不影响工作单元的事务
+            read_only: 是否只读查询，只读查询在配置了只读库时使用只读库；
+                SQLite部署时非只读的会话需要排队获取写锁，在工作单元中持有到事务结束
+            primary: 只读查询是否必须读主库(如写入缓存的数据)，仍然不获取写锁
+        """
+        read_session_maker = self._get_read_session_maker() if read_only and not primary else None
+        write_lock = None if read_only else get_write_lock()
+        uow = get_current_unit_of_work()
+        if uow is None:
+            session_maker = read_session_maker or await self._get_session_maker()
+            async with write_lock or nullcontext():
+                async with session_maker() as session:
+                    yield session
+            return
+        if write_lock is not None:
+            await uow.acquire_write_lock(write_lock)
+        session = uow.get_read_session(read_session_maker) if read_session_maker else uow.session
+        try:
+            if savepoint:
+                async with session.begin_nested():
+                    yield session
+            else:
+                yield session
+        finally:
+            # 与单独的会话关闭后一致，返回的实体不再由会话持有
+            session.expunge_all()
+
+    async def _commit(self, session: AsyncSession) -> None:
+        """提交写操作，在工作单元中只flush，由工作单元统一提交"""
+        mark_written()
+        if get_current_unit_of_work() is None:
+            await session.commit()
+        else:
+            await session.flush()
+
+    async def _timed_execute(self, session: AsyncSession, statement, operation: str, filters: Optional[dict] = None):
+        """执行查询，耗时超过阈值时记录到慢查询日志"""
+        start = time.perf_counter()
+        result = await session.execute(statement)
+        slow_query_log.record(session.bind, statement, time.perf_counter() - start, operation, filters)
+        return result
+
+    def _invalidate_cache(self, Clazz: 'BaseModel', ids: List[str]) -> None:
+        """使实体缓存失效，在工作单元中时事务结束后再失效一次"""
+        entity_cache.invalidate(Clazz, ids)
+        uow = get_current_unit_of_work()
+        if uow is not None:
+            uow.touch(Clazz, ids)
 
     async def create(self, model: 'BaseModel'):
         try:
-            session_maker = await self._get_session_maker()
-            async with session_maker() as session:
+            async with self._session_scope() as session:
                 session.add(model)
-                await session.commit()
+                await self._commit(session)
                 await session.refresh(model)
                 return model
         except Exception as e:
             logger.error(f"创建{model.__class__.__name__}失败: {e}")
             raise
 
-    async def update(self, model: 'BaseModel'):
+    def _get_dirty_values(self, model: 'BaseModel') -> Dict[str, Any]:
+        """
+        获取有改动的字段值
+
+        - 从数据库加载的实体: 使用SQLAlchemy记录的属性修改历史
+        - 新构造的实体(如由请求参数构造): 使用构造时显式传入的字段
+        """
+        state = sa_inspect(model)
+        column_keys = [attr.key for attr in state.mapper.column_attrs]
+        if state.transient or state.pending:
+            dirty_keys = [key for key in column_keys if key in model.model_fields_set]
+        else:
+            dirty_keys = [key for key in column_keys if state.attrs[key].history.has_changes()]
+        return {key: getattr(model, key) for key in dirty_keys if key != 'id'}
+
+    def _mark_clean(self, model: 'BaseModel', values: Dict[str, Any]) -> None:
+        """更新成功后清除已写入字段的修改记录"""
+        state = sa_inspect(model)
+        if state.transient or state.pending:
+            return
+        for key, value in values.items():
+            set_committed_value(model, key, value)
+
+    async def update(self, model: 'BaseModel', refresh: Optional[bool] = None):
+        """
+        更新实体，只写入有改动的字段
+
+        Args:
+            model: 要更新的实体
+            refresh: 是否返回数据库中的完整数据：
+                - None: 仅当model不是从数据库加载的(只包含部分字段)时刷新
+                - True: 数据库支持时通过UPDATE ... RETURNING返回，否则重新查询
+                - False: 不重新读取，直接返回model
+
+        Returns:
+            更新后的实体
+        """
+        return await self._update(model, refresh)
+
+    async def _update(self, model: 'BaseModel', refresh: Optional[bool] = None, write_related: Optional[Callable[[AsyncSession], Awaitable[None]]] = None):
+        """
+        更新实体，参数同update
+
+        Args:
+            write_related: 写入关联数据的函数，接收数据库会话，在同一事务中先于实体行执行；
+                传入时即使实体字段没有改动也更新updated_at
+        """
+        Clazz = model.__class__
+        if refresh is None:
+            refresh = sa_inspect(model).transient
         try:
-            session_maker = await self._get_session_maker()
-            print('update model:', model.model_dump())
-            async with session_maker() as session:
-                # 添加更新时间
-                model.updated_at = datetime.now(timezone.utc)
+            values = self._get_dirty_values(model)
+            if not values and write_related is None:
+                return await self.get_by_id(model.id) if refresh else model
+
+            # 添加更新时间
+            model.updated_at = datetime.now(timezone.utc)
+            values['updated_at'] = model.updated_at
+
+            async with self._session_scope() as session:
+                if write_related is not None:
+                    await write_related(session)
                 statement = (
-                    update(model.__class__)
-                    .where(model.__class__.id == model.id)
-                    .values(**model.model_dump())
+                    update(Clazz)
+                    .where(Clazz.id == model.id)
+                    .values(**values)
                 )
-                await session.execute(statement)
-                await session.commit()
-                return await self.get_by_id(model.id)
+                use_returning = refresh and session.bind.dialect.update_returning
+                if use_returning:
+                    statement = statement.returning(Clazz)
+                result = await session.execute(statement)
+                updated = result.scalar_one_or_none() if use_returning else None
+                await self._commit(session)
+            self._invalidate_cache(Clazz, [model.id])
+            self._mark_clean(model, values)
+
+            if use_returning:
+                return updated
+            return await self.get_by_id(model.id) if refresh else model
         except Exception as e:
-            logger.error(f"更新{model.__class__.__name__}失败: {e}")
+            logger.error(f"更新{Clazz.__name__}失败: {e}")
             raise
 
     async def delete(self, model: 'BaseModel'):
         try:
-            session_maker = await self._get_session_maker()
-            async with session_maker() as session:
+            async with self._session_scope() as session:
                 statement = (
                     update(model.__class__)
                     .where(model.__class__.id == model.id)
                     .values(is_deleted=True, updated_at=datetime.now(timezone.utc))
                 )
                 await session.execute(statement)
-                await session.commit()
-                return True
+                await self._commit(session)
+            self._invalidate_cache(model.__class__, [model.id])
+            return True
         except Exception as e:
             logger.error(f"删除{model.__class__.__name__}失败: {e}")
             raise
 
-    async def batch_create(self, models: List['BaseModel']):
+    async def _update_where(self, Clazz: 'BaseModel', kwargs: dict, values: Dict[str, Any]) -> int:
+        """
+        按过滤条件批量更新，一条UPDATE语句完成，并使受影响实体的缓存失效
+
+        数据库支持UPDATE ... RETURNING时同一条语句返回受影响的ID；
+        否则(MySQL)先加锁读取受影响的ID，再按同样的条件更新
+
+        Args:
+            Clazz: 实体类
+            kwargs: 过滤条件字典，格式同_search_by_kwargs，不能为空；已删除的数据不会被更新
+            values: 要更新的字段值，updated_at自动更新
+
+        Returns:
+            int: 更新的行数
+        """
+        if not kwargs:
+            raise ValueError("批量更新需要过滤条件")
+        columns = get_columns(Clazz)
+        invalid_keys = [key for key in values if key not in columns or key == 'id']
+        if invalid_keys:
+            raise ValueError(f"{Clazz.__name__}不能更新的字段: {invalid_keys}")
+        if not values:
+            return 0
+        values = dict(values)
+        if 'updated_at' in columns:
+            values.setdefault('updated_at', datetime.now(timezone.utc))
+        filters = self._build_filters(Clazz, kwargs)
+
         try:
-            session_maker = await self._get_session_maker()
-            async with session_maker() as session:
-                session.add_all(models)
-                await session.commit()
-                for model in models:
-                    await session.refresh(model)
-                return models
+            async with self._session_scope() as session:
+                statement = (
+                    update(Clazz)
+                    .where(*filters)
+                    .values(**values)
+                    .execution_options(synchronize_session=False)
+                )
+                if session.bind.dialect.update_returning:
+                    result = await session.execute(statement.returning(Clazz.id))
+                    ids = list(result.scalars().all())
+                else:
+                    id_statement = select(Clazz.id).where(*filters).with_for_update()
+                    ids = list((await session.execute(id_statement)).scalars().all())
+                    if ids:
+                        await session.execute(statement)
+                await self._commit(session)
+        except Exception as e:
+            logger.error(f"批量更新{Clazz.__name__}失败: {e}")
+            raise
+        self._invalidate_cache(Clazz, ids)
+        return len(ids)
+
+    async def _soft_delete_where(self, Clazz: 'BaseModel', kwargs: dict) -> int:
+        """
+        按过滤条件批量软删除，一条UPDATE语句完成
+
+        Args:
+            Clazz: 实体类
+            kwargs: 过滤条件字典，格式同_search_by_kwargs，不能为空
+
+        Returns:
+            int: 删除的行数
+        """
+        return await self._update_where(Clazz, kwargs, {'is_deleted': True})
+
+    async def batch_create(self, models: List['BaseModel'], chunk_size: Optional[int] = None):
+        """
+        批量创建实体，使用多行INSERT按块写入
+
+        id、created_at等字段已在客户端生成，写入后不再逐条refresh，
+        直接返回传入的实体
+
+        Args:
+            models: 要创建的实体列表，需为同一实体类
+            chunk_size: 每条INSERT语句最多包含的行数，默认使用配置BATCH_INSERT_CHUNK_SIZE
+
+        Returns:
+            创建后的实体列表
+        """
+        if not models:
+            return []
+        Clazz = models[0].__class__
+        chunk_size = chunk_size or settings.BATCH_INSERT_CHUNK_SIZE
+        column_keys = [attr.key for attr in sa_inspect(Clazz).column_attrs]
+        try:
+            async with self._session_scope() as session:
+                for start in range(0, len(models), chunk_size):
+                    chunk = models[start:start + chunk_size]
+                    rows = [{key: getattr(model, key) for key in column_keys} for model in chunk]
+                    await session.execute(insert(Clazz), rows)
+                await self._commit(session)
         except Exception as e:
-            logger.error(f"批量创建{models[0].__class__.__name__}失败: {e}")
+            logger.error(f"批量创建{Clazz.__name__}失败: {e}")
             raise
+        self._invalidate_cache(Clazz, [model.id for model in models])
+
+        # 与create返回的实体一致，作为已持久化的实体继续使用
+        for model in models:
+            make_transient_to_detached(model)
+        return models
 
     @abstractmethod
     async def get_by_id(self, id: str) -> 'BaseModel':
         pass
 
     @abstractmethod
-    async def search_by_kwargs(self, kwargs: dict, skip: int = 0, limit: int = 100) -> List['BaseModel']:
+    async def search_by_kwargs(self, kwargs: dict, skip: int = 0, limit: int = 100, order_by: Union[str, List[str], None] = None, cursor: Optional[str] = None, fields: Optional[List[str]] = None) -> List['BaseModel']:
         pass
 
     @abstractmethod
@@ -92,16 +319,183 @@ class BaseDao(ABC):
         pass
 
     async def _get_by_id(self, Clazz: 'BaseModel', id: str) -> 'BaseModel':
+        """根据ID获取实体，优先读取实体缓存；关闭实体缓存时与其他只读查询一样可以使用只读库"""
+        if get_current_unit_of_work() is not None:
+            # 工作单元的事务中可能读到未提交的数据，只读缓存，不写入
+            model = entity_cache.get(Clazz, id)
+            return model if model is not None else await self._load_by_id(Clazz, id)
+        if not entity_cache.enabled:
+            return await self._load_by_id(Clazz, id)
+        # 写入缓存的数据从主库读取，避免只读库的复制延迟把旧数据写入缓存
+        return await entity_cache.get_or_load(Clazz, id, lambda: self._load_by_id(Clazz, id, primary=True))
+
+    async def _load_by_id(self, Clazz: 'BaseModel', id: str, primary: bool = False) -> 'BaseModel':
+        """从数据库根据ID获取实体，primary为True时从主库读取"""
         try:
-            session_maker = await self._get_session_maker()
-            async with session_maker() as session:
+            async with self._session_scope(read_only=True, primary=primary) as session:
                 statement = select(Clazz).where(Clazz.id == id, Clazz.is_deleted == False)
-                result = await session.execute(statement)
+                result = await self._timed_execute(session, statement, f"{Clazz.__name__}.get_by_id")
                 return result.scalar_one_or_none()
         except Exception as e:
             logger.error(f"获取{Clazz.__name__}的id={id}失败: {e}")
             raise
 
+    async def _get_many(self, Clazz: 'BaseModel', ids: List[str], preserve_order: bool = True) -> Tuple[List['BaseModel'], List[str]]:
+        """
+        根据ID列表批量获取，使用一次IN查询代替逐个查询
+
+        Args:
+            Clazz: 实体类
+            ids: ID列表
+            preserve_order: 是否按ids的顺序返回
+
+        Returns:
+            tuple: (实体列表, 不存在的ID列表)
+        """
+        unique_ids = list(dict.fromkeys(ids))
+        if not unique_ids:
+            return [], []
+        try:
+            async with self._session_scope(read_only=True) as session:
+                statement = select(Clazz).where(Clazz.id.in_(unique_ids), Clazz.is_deleted == False)
+                result = await session.execute(statement)
+                models = result.scalars().all()
+        except Exception as e:
+            logger.error(f"批量获取{Clazz.__name__}失败: {e}")
+            raise
+
+        models_by_id = {model.id: model for model in models}
+        missing_ids = [id for id in unique_ids if id not in models_by_id]
+        if missing_ids:
+            logger.warning(f"批量获取{Clazz.__name__}时部分ID不存在: {missing_ids}")
+        if preserve_order:
+            models = [models_by_id[id] for id in ids if id in models_by_id]
+        return models, missing_ids
+
+    async def _load_question_ids(self, owner_attr, owner_ids: List[str]) -> Dict[str, List[str]]:
+        """
+        从问题关联表(exam_question/paper_question)批量读取按位置排序的问题ID
+
+        Args:
+            owner_attr: 关联表中指向所属实体的字段，如ExamQuestion.exam_id
+            owner_ids: 所属实体ID列表
+
+        Returns:
+            Dict: 所属实体ID -> 问题ID列表
+        """
+        question_ids = {owner_id: [] for owner_id in owner_ids}
+        if not owner_ids:
+            return question_ids
+        LinkClazz = owner_attr.class_
+        try:
+            async with self._session_scope(read_only=True) as session:
+                statement = (
+                    select(owner_attr, LinkClazz.question_id)
+                    .where(owner_attr.in_(owner_ids))
+                    .order_by(owner_attr, LinkClazz.position)
+                )
+                for owner_id, question_id in (await session.execute(statement)).all():
+                    question_ids[owner_id].append(question_id)
+            return question_ids
+        except Exception as e:
+            logger.error(f"获取{LinkClazz.__tablename__}关联的问题失败: {e}")
+            raise
+
+    async def _attach_question_ids(self, owner_attr, models: List['BaseModel']) -> List['BaseModel']:
+        """为实体列表加载问题ID列表，一次查询"""
+        question_ids = await self._load_question_ids(owner_attr, [model.id for model in models])
+        for model in models:
+            model.set_loaded_question_ids(question_ids[model.id])
+        return models
+
+    async def _save_question_ids(self, session: AsyncSession, owner_attr, model: 'BaseModel') -> None:
+        """在session的事务中用实体当前的问题ID列表替换关联表中的记录"""
+        LinkClazz = owner_attr.class_
+        await session.execute(delete(LinkClazz).where(owner_attr == model.id))
+        rows = [
+            {owner_attr.key: model.id, 'position': position, 'question_id': question_id}
+            for position, question_id in enumerate(model.get_question_ids())
+        ]
+        if rows:
+            await session.execute(insert(LinkClazz), rows)
+
+    async def _create_with_question_ids(self, owner_attr, model: 'BaseModel') -> 'BaseModel':
+        """创建实体，并在同一事务中写入问题关联"""
+        try:
+            async with self._session_scope() as session:
+                session.add(model)
+                await session.flush()
+                await self._save_question_ids(session, owner_attr, model)
+                await self._commit(session)
+                await session.refresh(model)
+            model.mark_question_ids_saved()
+            return model
+        except Exception as e:
+            logger.error(f"创建{model.__class__.__name__}失败: {e}")
+            raise
+
+    async def _update_with_question_ids(self, owner_attr, model: 'BaseModel', refresh: Optional[bool] = None) -> 'BaseModel':
+        """更新实体，问题ID列表有修改时在同一事务中替换问题关联"""
+        question_ids_changed = model.is_question_ids_changed()
+
+        async def write_question_ids(session: AsyncSession) -> None:
+            await self._save_question_ids(session, owner_attr, model)
+
+        question_ids = model.get_question_ids()
+        updated = await self._update(model, refresh, write_question_ids if question_ids_changed else None)
+        if question_ids_changed:
+            model.mark_question_ids_saved()
+        if updated is not model and updated is not None:
+            updated.set_loaded_question_ids(question_ids)
+        return updated
+
+    async def _get_with_questions(self, Clazz: 'BaseModel', owner_attr, QuestionClazz: 'BaseModel', id: str) -> Optional['BaseModel']:
+        """
+        一次关联查询获取实体及其按位置排序的问题列表
+
+        Args:
+            Clazz: 实体类(Exam/Paper)
+            owner_attr: 关联表中指向实体的字段，如ExamQuestion.exam_id
+            QuestionClazz: 问题实体类，关联表的question_id指向它
+            id: 实体ID
+        """
+        LinkClazz = owner_attr.class_
+        try:
+            async with self._session_scope(read_only=True) as session:
+                statement = (
+                    select(Clazz, LinkClazz.question_id, QuestionClazz)
+                    .outerjoin(LinkClazz, owner_attr == Clazz.id)
+                    .outerjoin(QuestionClazz, and_(QuestionClazz.id == LinkClazz.question_id, QuestionClazz.is_deleted == False))
+                    .where(Clazz.id == id, Clazz.is_deleted == False)
+                    .order_by(LinkClazz.position)
+                )
+                rows = (await session.execute(statement)).all()
+        except Exception as e:
+            logger.error(f"获取{Clazz.__name__}及问题失败 (ID: {id}): {e}")
+            raise
+
+        if not rows:
+            return None
+        model = rows[0][0]
+        question_ids = [question_id for _, question_id, _ in rows if question_id is not None]
+        missing_ids = [question_id for _, question_id, question in rows if question_id is not None and question is None]
+        if missing_ids:
+            logger.warning(f"{Clazz.__name__}{id}引用的问题不存在: {missing_ids}")
+        model.set_loaded_question_ids(question_ids)
+        model.set_questions([question for _, _, question in rows if question is not None])
+        return model
+
+    async def _get_ids_by_question(self, owner_attr, question_id: str) -> List[str]:
+        """通过关联表反查包含某个问题的实体ID"""
+        LinkClazz = owner_attr.class_
+        try:
+            async with self._session_scope(read_only=True) as session:
+                statement = select(owner_attr).where(LinkClazz.question_id == question_id).distinct()
+                return list((await session.execute(statement)).scalars().all())
+        except Exception as e:
+            logger.error(f"反查包含问题{question_id}的{LinkClazz.__tablename__}失败: {e}")
+            raise
+
     def _parse_filter_value(self, value: Any) -> tuple:
         """
         解析过滤值，支持简化的比较操作符
@@ -109,24 +503,16 @@ class BaseDao(ABC):
         Args:
             value: 过滤值，可以是：
                 - 普通值: 表示相等比较 (key=value)
-                - 字典: 如 {"$gt": 5}, {"$like": "abc"}, {"$in": [1,2,3]}
+                - 字典: 如 {"$gt": 5}, {"$like": "abc"}, {"$in": [1,2,3]}, {"$match": "一元二次方程"}
         
         Returns:
             tuple: (操作符, 值)
         """
-        if isinstance(value, dict):
-            # 字典格式: {"$gt": 5}, {"$like": "abc"}
-            if len(value) != 1:
-                raise ValueError(f"过滤条件字典只能包含一个键值对: {value}")
-            op, val = next(iter(value.items()))
-            return op, val
-        else:
-            # 普通值，默认为相等比较
-            return '$eq', value
+        return parse_filter_value(value)
 
     def _build_filter_condition(self, attr, op: str, value: Any):
         """
-        根据操作符构建过滤条件
+        根据操作符构建过滤条件，操作符见dao.filter_schema.FILTER_OPERATORS
         
         Args:
             attr: SQLModel字段属性
@@ -136,56 +522,58 @@ class BaseDao(ABC):
         Returns:
             SQLAlchemy过滤条件
         """
-        if op == '$eq':
-            return attr == value
-        elif op == '$ne':
-            return attr != value
-        elif op == '$gt':
-            return attr > value
-        elif op == '$gte':
-            return attr >= value
-        elif op == '$lt':
-            return attr < value
-        elif op == '$lte':
-            return attr <= value
-        elif op == '$like':
-            return attr.contains(value)
-        elif op == '$in':
-            return attr.in_(value)
-        elif op == '$nin':
-            return ~attr.in_(value)
-        elif op == '$between':
-            if len(value) != 2:
-                raise ValueError("between条件需要两个值")
-            return attr.between(value[0], value[1])
-        else:
-            raise ValueError(f"不支持的操作符: {op}")
+        return build_condition(attr, op, value)
 
-    def _parse_order_by(self, Clazz: 'BaseModel', order_by: Union[str, List[str], None]) -> List:
+    def _build_filters(self, Clazz: 'BaseModel', kwargs: dict) -> List:
         """
-        解析排序参数
-        
+        根据过滤条件字典构建SQLAlchemy过滤条件列表，默认排除已删除数据
+
         Args:
             Clazz: 实体类
-            order_by: 排序参数，可以是：
-                - None: 不排序
-                - str: 单个排序字段，如 "created_at" 或 "-created_at"
-                - List[str]: 多个排序字段，如 ["created_at", "-updated_at"]
-        
+            kwargs: 过滤条件字典
+        """
+        filters = [Clazz.is_deleted == False]
+        columns = get_columns(Clazz)
+
+        for key, value in kwargs.items():
+            attr = columns.get(key)
+            if attr is not None:
+                try:
+                    op, val = self._parse_filter_value(value)
+                    condition = self._build_filter_condition(attr, op, val)
+                    filters.append(condition)
+                except ValueError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"解析过滤条件失败 {key}={value}: {e}")
+                    # 如果解析失败，尝试作为普通相等条件处理
+                    filters.append(attr == value)
+            else:
+                raise ValueError(f"Invalid filter column: {key}")
+
+        return filters
+
+    def _parse_order_fields(self, Clazz: 'BaseModel', order_by: Union[str, List[str], None]) -> List[Tuple[str, Any, bool]]:
+        """
+        解析排序参数为(字段名, 字段属性, 是否降序)列表，并在末尾追加id作为唯一排序键，
+        保证排序稳定，也是游标分页的基础
+
+        Args:
+            Clazz: 实体类
+            order_by: 排序参数，同_parse_order_by
+
         Returns:
-            List: SQLAlchemy排序条件列表
+            List: (字段名, 字段属性, 是否降序)列表
         """
         if not order_by:
-            return []
-        
-        order_conditions = []
-        
-        # 处理单个字符串
-        if isinstance(order_by, str):
+            order_fields = []
+        elif isinstance(order_by, str):
+            # 处理单个字符串
             order_fields = [order_by]
         else:
-            order_fields = order_by
-        
+            order_fields = list(order_by)
+
+        parsed = []
         for field in order_fields:
             # 检查是否有降序标识符
             if field.startswith('-'):
@@ -194,69 +582,365 @@ class BaseDao(ABC):
             else:
                 field_name = field
                 is_desc = False
-            
+
             # 获取字段属性
-            attr = getattr(Clazz, field_name, None)
+            attr = get_columns(Clazz).get(field_name)
             if attr is None:
                 raise ValueError(f"Invalid order column: {field_name}")
-            
-            # 构建排序条件
-            if is_desc:
-                order_conditions.append(attr.desc())
-            else:
-                order_conditions.append(attr.asc())
+            parsed.append((field_name, attr, is_desc))
+
+        if 'id' not in [field_name for field_name, _, _ in parsed]:
+            parsed.append(('id', Clazz.id, False))
+        return parsed
+
+    def _parse_order_by(self, Clazz: 'BaseModel', order_by: Union[str, List[str], None]) -> List:
+        """
+        解析排序参数
         
-        return order_conditions
+        Args:
+            Clazz: 实体类
+            order_by: 排序参数，可以是：
+                - None: 只按id排序
+                - str: 单个排序字段，如 "created_at" 或 "-created_at"
+                - List[str]: 多个排序字段，如 ["created_at", "-updated_at"]
+        
+        Returns:
+            List: SQLAlchemy排序条件列表，末尾总是包含id
+        """
+        return [
+            attr.desc() if is_desc else attr.asc()
+            for _, attr, is_desc in self._parse_order_fields(Clazz, order_by)
+        ]
+
+    def _get_relevance(self, Clazz: 'BaseModel', kwargs: dict):
+        """过滤条件中包含全文搜索($match)时返回相关度表达式，否则返回None"""
+        for key, value in kwargs.items():
+            if isinstance(value, dict) and '$match' in value:
+                return fulltext_score(Clazz, key, value['$match'])
+        return None
+
+    def _build_order_clauses(self, Clazz: 'BaseModel', kwargs: dict, order_by: Union[str, List[str], None], cursor: Optional[str] = None) -> List:
+        """
+        构建搜索的排序条件，全文搜索且未指定排序时按相关度从高到低排序
+
+        相关度不是实体字段，按相关度排序时不支持游标分页
+        """
+        relevance = self._get_relevance(Clazz, kwargs) if not order_by else None
+        if relevance is None:
+            return self._parse_order_by(Clazz, order_by)
+        if cursor:
+            raise ValueError("全文搜索按相关度排序时不支持游标分页")
+        return [relevance.desc(), Clazz.id.asc()]
+
+    @staticmethod
+    def _cursor_order_key(order_fields: List[Tuple[str, Any, bool]]) -> List[str]:
+        """游标中记录的排序定义，用于校验游标与排序参数一致"""
+        return [f"-{field_name}" if is_desc else field_name for field_name, _, is_desc in order_fields]
+
+    @staticmethod
+    def _encode_cursor_value(value: Any) -> Any:
+        if isinstance(value, datetime):
+            return {"$dt": value.isoformat()}
+        if isinstance(value, Enum):
+            return value.value
+        return value
+
+    @staticmethod
+    def _decode_cursor_value(value: Any) -> Any:
+        if isinstance(value, dict) and "$dt" in value:
+            return datetime.fromisoformat(value["$dt"])
+        return value
+
+    def encode_cursor(self, Clazz: 'BaseModel', model: 'BaseModel', order_by: Union[str, List[str], None] = None) -> str:
+        """
+        把一行数据的排序键编码为不透明的游标字符串
+
+        Args:
+            Clazz: 实体类
+            model: 当前页的最后一行
+            order_by: 排序参数
+        """
+        order_fields = self._parse_order_fields(Clazz, order_by)
+        payload = {
+            "o": self._cursor_order_key(order_fields),
+            "v": [self._encode_cursor_value(getattr(model, field_name)) for field_name, _, _ in order_fields],
+        }
+        raw = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, Clazz: 'BaseModel', cursor: str, order_by: Union[str, List[str], None] = None) -> List[Any]:
+        """
+        解析游标，返回排序键的值列表
+
+        Raises:
+            ValueError: 游标无效或与排序参数不一致
+        """
+        order_fields = self._parse_order_fields(Clazz, order_by)
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            payload = json.loads(raw.decode('utf-8'))
+            order_key, values = payload["o"], payload["v"]
+        except Exception:
+            raise ValueError(f"Invalid cursor: {cursor}")
+        if order_key != self._cursor_order_key(order_fields) or len(values) != len(order_fields):
+            raise ValueError("Cursor does not match order_by")
+        return [self._decode_cursor_value(value) for value in values]
+
+    def next_cursor(self, Clazz: 'BaseModel', models: List['BaseModel'], limit: int, order_by: Union[str, List[str], None] = None) -> Optional[str]:
+        """
+        根据当前页数据生成下一页游标，数据不足一页时说明已到末尾，返回None
+        """
+        if not models or len(models) < limit:
+            return None
+        return self.encode_cursor(Clazz, models[-1], order_by)
+
+    def _build_keyset_condition(self, order_fields: List[Tuple[str, Any, bool]], values: List[Any]):
+        """
+        构建search_after条件: 排在游标所在行之后的数据
+        (k1 > v1) OR (k1 = v1 AND k2 > v2) OR ...，降序字段使用 <，
+        NULL按最小值处理(与MySQL/SQLite的排序一致)
+        """
+        conditions = []
+        for i, (_, attr, is_desc) in enumerate(order_fields):
+            value = values[i]
+            equals = [
+                prev_attr.is_(None) if prev_value is None else prev_attr == prev_value
+                for (_, prev_attr, _), prev_value in zip(order_fields[:i], values[:i])
+            ]
+            if value is None:
+                after = attr.is_not(None) if not is_desc else None
+            elif is_desc:
+                after = or_(attr < value, attr.is_(None))
+            else:
+                after = attr > value
+            if after is not None:
+                conditions.append(and_(*equals, after))
+        return or_(*conditions)
+
+    def _build_load_options(self, Clazz: 'BaseModel', fields: Optional[List[str]], order_fields: List[Tuple[str, Any, bool]]) -> List:
+        """
+        按字段投影只查询需要的列，其余列延迟加载(不在SQL中查询)
+
+        id和排序字段总是加载，用于生成游标
+
+        Args:
+            Clazz: 实体类
+            fields: 需要加载的字段名列表，None表示加载全部字段
+            order_fields: _parse_order_fields的结果
+        """
+        if fields is None:
+            return []
+        column_keys = [attr.key for attr in sa_inspect(Clazz).column_attrs]
+        invalid = [field for field in fields if field not in column_keys]
+        if invalid:
+            raise ValueError(f"{Clazz.__name__}没有字段: {', '.join(invalid)}")
+        keys = list(dict.fromkeys(['id', *fields, *[name for name, _, _ in order_fields]]))
+        return [load_only(*[getattr(Clazz, key) for key in keys])]
 
-    async def _search_by_kwargs(self, Clazz: 'BaseModel', kwargs: dict, skip: int = 0, limit: int = 100, order_by: Union[str, List[str], None] = None) -> List['BaseModel']:
+    async def _search_by_kwargs(self, Clazz: 'BaseModel', kwargs: dict, skip: int = 0, limit: int = 100, order_by: Union[str, List[str], None] = None, cursor: Optional[str] = None, fields: Optional[List[str]] = None) -> List['BaseModel']:
         """
         根据关键字搜索，支持多种比较操作符和排序
         
         Args:
             Clazz: 实体类
             kwargs: 过滤条件字典
-            skip: 跳过数量
+            skip: 跳过数量，传入cursor时忽略
             limit: 返回数量限制
             order_by: 排序参数，可以是：
-                - None: 不排序
+                - None: 只按id排序
                 - str: 单个排序字段，如 "created_at" 或 "-created_at"
                 - List[str]: 多个排序字段，如 ["created_at", "-updated_at"]
+            cursor: 上一页返回的游标，传入时按排序键定位(search_after)，不再使用offset
+            fields: 只加载的字段名列表，其余字段不查询，None表示加载全部字段；
+                列表接口可传入Clazz.get_list_fields()，跳过声明为延迟加载的大字段
         """
-        filters = [Clazz.is_deleted == False]
-        
-        for key, value in kwargs.items():
-            attr = getattr(Clazz, key, None)
-            if attr is not None:
-                try:
-                    op, val = self._parse_filter_value(value)
-                    condition = self._build_filter_condition(attr, op, val)
-                    filters.append(condition)
-                except Exception as e:
-                    logger.warning(f"解析过滤条件失败 {key}={value}: {e}")
-                    # 如果解析失败，尝试作为普通相等条件处理
-                    filters.append(attr == value)
-            else:
-                raise ValueError(f"Invalid filter column: {key}")
+        filters = self._build_filters(Clazz, kwargs)
+        order_fields = self._parse_order_fields(Clazz, order_by)
+        load_options = self._build_load_options(Clazz, fields, order_fields)
+        if settings.INDEX_CHECK_ENABLED:
+            check_index_coverage(Clazz, kwargs, [name for name, _, _ in order_fields])
+        order_clauses = self._build_order_clauses(Clazz, kwargs, order_by, cursor)
+        if cursor:
+            values = self.decode_cursor(Clazz, cursor, order_by)
+            filters.append(self._build_keyset_condition(order_fields, values))
+            skip = 0
         
         try:
-            session_maker = await self._get_session_maker()
-            async with session_maker() as session:
-                statement = select(Clazz).where(*filters)
+            async with self._session_scope(read_only=True) as session:
+                statement = select(Clazz).options(*load_options).where(*filters)
                 
                 # 添加排序
-                order_conditions = self._parse_order_by(Clazz, order_by)
-                if order_conditions:
-                    statement = statement.order_by(*order_conditions)
+                statement = statement.order_by(*order_clauses)
                 
                 # 添加分页
-                statement = statement.offset(skip).limit(limit)
+                if skip:
+                    statement = statement.offset(skip)
+                statement = statement.limit(limit)
                 
-                result = await session.execute(statement)
+                result = await self._timed_execute(session, statement, f"{Clazz.__name__}.search_by_kwargs", kwargs)
                 return result.scalars().all()
         except Exception as e:
             logger.error(f"搜索失败: {e}")
             raise
 
+    async def _stream_by_kwargs(self, Clazz: 'BaseModel', kwargs: dict, order_by: Union[str, List[str], None] = None, chunk_size: Optional[int] = None) -> AsyncIterator[List['BaseModel']]:
+        """
+        按关键字流式读取全部匹配的实体，使用服务端游标分块返回，内存占用与表大小无关
+
+        适用于导出、向量回填等需要遍历整张表的任务，过滤条件和排序同_search_by_kwargs；
+        遍历中途退出时用contextlib.aclosing包装，以便及时归还数据库连接；
+        子类包装本方法时同样要用aclosing关闭内层的迭代器
+
+        Args:
+            Clazz: 实体类
+            kwargs: 过滤条件字典
+            order_by: 排序参数
+            chunk_size: 每块的实体数量，默认使用配置STREAM_CHUNK_SIZE
+
+        Yields:
+            List: 一块实体，已与会话分离
+        """
+        chunk_size = chunk_size or settings.STREAM_CHUNK_SIZE
+        filters = self._build_filters(Clazz, kwargs)
+        order_clauses = self._build_order_clauses(Clazz, kwargs, order_by)
+        try:
+            session_maker = self._get_read_session_maker() or await self._get_session_maker()
+            async with session_maker() as session:
+                statement = (
+                    select(Clazz)
+                    .where(*filters)
+                    .order_by(*order_clauses)
+                    .execution_options(yield_per=chunk_size)
+                )
+                result = await session.stream_scalars(statement)
+                async for partition in result.partitions():
+                    models = list(partition)
+                    # 已返回的实体不再由会话持有
+                    for model in models:
+                        session.expunge(model)
+                    yield models
+        except Exception as e:
+            logger.error(f"流式读取{Clazz.__name__}失败: {e}")
+            raise
+
+    async def _search_with_total(self, Clazz: 'BaseModel', kwargs: dict, skip: int = 0, limit: int = 100, order_by: Union[str, List[str], None] = None, cursor: Optional[str] = None, count_mode: str = 'exact', fields: Optional[List[str]] = None) -> Tuple[List['BaseModel'], int]:
+        """
+        一次查询同时返回当前页数据和总数，过滤条件只构建一次，只使用一个会话
+
+        Args:
+            Clazz: 实体类
+            kwargs: 过滤条件字典
+            skip, limit, order_by, cursor: 同_search_by_kwargs
+            count_mode: 总数统计方式：
+                - exact: 精确总数，通过COUNT(*) OVER()与数据在同一条语句中返回
+                - cached: 使用COUNT_CACHE_TTL秒内缓存的总数，缓存失效时按exact统计
+                - estimate: 无过滤条件时使用数据库统计信息中的估算行数减去已删除行数(仅MySQL)，否则按cached处理
+            fields: 同_search_by_kwargs
+
+        Returns:
+            tuple: (实体列表, 总数)
+        """
+        if count_mode not in ('exact', 'cached', 'estimate'):
+            raise ValueError(f"不支持的count_mode: {count_mode}")
+        filters = self._build_filters(Clazz, kwargs)
+        order_fields = self._parse_order_fields(Clazz, order_by)
+        load_options = self._build_load_options(Clazz, fields, order_fields)
+        if settings.INDEX_CHECK_ENABLED:
+            check_index_coverage(Clazz, kwargs, [name for name, _, _ in order_fields])
+        order_clauses = self._build_order_clauses(Clazz, kwargs, order_by, cursor)
+        page_filters = list(filters)
+        if cursor:
+            values = self.decode_cursor(Clazz, cursor, order_by)
+            page_filters.append(self._build_keyset_condition(order_fields, values))
+            skip = 0
+        cache_key = (Clazz.__name__, json.dumps(kwargs, sort_keys=True, ensure_ascii=False, default=str))
+
+        try:
+            async with self._session_scope(read_only=True) as session:
+                total = None
+                if count_mode == 'estimate' and not kwargs:
+                    total = await self._estimate_count(session, Clazz)
+                if total is None and count_mode != 'exact':
+                    total = self._get_cached_count(cache_key)
+
+                # 游标分页时窗口函数只能统计游标之后的行，总数需要单独统计
+                with_window = total is None and not cursor
+                if with_window:
+                    statement = select(Clazz, func.count().over().label('total')).options(*load_options).where(*page_filters)
+                else:
+                    statement = select(Clazz).options(*load_options).where(*page_filters)
+                statement = statement.order_by(*order_clauses)
+                if skip:
+                    statement = statement.offset(skip)
+                statement = statement.limit(limit)
+                result = await self._timed_execute(session, statement, f"{Clazz.__name__}.search_with_total", kwargs)
+
+                if with_window:
+                    rows = result.all()
+                    models = [row[0] for row in rows]
+                    if rows:
+                        total = rows[0][1]
+                    elif not skip:
+                        total = 0
+                else:
+                    models = result.scalars().all()
+
+                if total is None:
+                    # 页码超出范围或游标分页，在同一会话中补充统计
+                    statement = select(func.count()).select_from(Clazz).where(*filters)
+                    total = (await self._timed_execute(session, statement, f"{Clazz.__name__}.count_by_kwargs", kwargs)).scalar()
+
+                if count_mode == 'estimate' and models:
+                    # 估算值不能少于已经看到的行数
+                    total = max(total, skip + len(models))
+                if count_mode != 'exact':
+                    self._set_cached_count(cache_key, total)
+                return models, total
+        except Exception as e:
+            logger.error(f"搜索失败: {e}")
+            raise
+
+    def _get_cached_count(self, key: Tuple[str, str]) -> Optional[int]:
+        """读取未过期的缓存总数"""
+        cached = self._count_cache.get(key)
+        if cached is None:
+            return None
+        if cached[0] <= time.monotonic():
+            self._count_cache.pop(key, None)
+            return None
+        self._count_cache.move_to_end(key)
+        return cached[1]
+
+    def _set_cached_count(self, key: Tuple[str, str], total: int) -> None:
+        """缓存总数，超过容量时逐个淘汰最久未使用的"""
+        self._count_cache[key] = (time.monotonic() + settings.COUNT_CACHE_TTL, total)
+        self._count_cache.move_to_end(key)
+        while len(self._count_cache) > self.COUNT_CACHE_MAX_SIZE:
+            self._count_cache.popitem(last=False)
+
+    async def _estimate_count(self, session: AsyncSession, Clazz: 'BaseModel') -> Optional[int]:
+        """
+        读取MySQL统计信息中的表行数估算值，其他数据库返回None
+
+        统计信息包含软删除的行，减去已删除的行数；已删除行数按COUNT_CACHE_TTL缓存
+        """
+        if session.bind.dialect.name != 'mysql':
+            return None
+        statement = text(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name"
+        )
+        table_rows = (await session.execute(statement, {"table_name": Clazz.__tablename__})).scalar()
+        if table_rows is None:
+            return None
+        deleted_key = (Clazz.__name__, '$deleted')
+        deleted = self._get_cached_count(deleted_key)
+        if deleted is None:
+            statement = select(func.count()).select_from(Clazz).where(Clazz.is_deleted == True)
+            deleted = (await self._timed_execute(session, statement, f"{Clazz.__name__}.count_deleted")).scalar()
+            self._set_cached_count(deleted_key, deleted)
+        return max(table_rows - deleted, 0)
+
     async def _count_by_kwargs(self, Clazz: 'BaseModel', kwargs: dict) -> int:
         """
         根据关键字统计数量，支持多种比较操作符
@@ -265,27 +949,12 @@ class BaseDao(ABC):
             Clazz: 实体类
             kwargs: 过滤条件字典
         """
-        filters = [Clazz.is_deleted == False]
-        
-        for key, value in kwargs.items():
-            attr = getattr(Clazz, key, None)
-            if attr is not None:
-                try:
-                    op, val = self._parse_filter_value(value)
-                    condition = self._build_filter_condition(attr, op, val)
-                    filters.append(condition)
-                except Exception as e:
-                    logger.warning(f"解析过滤条件失败 {key}={value}: {e}")
-                    # 如果解析失败，尝试作为普通相等条件处理
-                    filters.append(attr == value)
-            else:
-                raise ValueError(f"Invalid filter column: {key}")
+        filters = self._build_filters(Clazz, kwargs)
         
         try:
-            session_maker = await self._get_session_maker()
-            async with session_maker() as session:
+            async with self._session_scope(read_only=True) as session:
                 statement = select(func.count()).select_from(Clazz).where(*filters)
-                result = await session.execute(statement)
+                result = await self._timed_execute(session, statement, f"{Clazz.__name__}.count_by_kwargs", kwargs)
                 return result.scalar()
         except Exception as e:
             logger.error(f"统计数量失败: {e}")
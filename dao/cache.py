@@ -0,0 +1,165 @@
+"""
+实体缓存 - 进程内LRU缓存，用于DAO按ID读取实体
+"""
+
+import asyncio
+import copy
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import make_transient_to_detached
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[str, str]
+
+
+class EntityCache:
+    """
+    按(实体类, ID)缓存实体的LRU缓存，带过期时间和容量上限
+
+    - 缓存的是实体的列值，每次命中都重新构造实体，调用方修改返回的实体不会影响缓存
+    - 同一个key的并发未命中只会查询一次数据库，其余请求等待同一个结果
+    - 写操作需调用invalidate使缓存失效；缓存只在当前进程内有效，
+      多进程部署时其他进程最多在ttl秒后读到新数据
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 60, enabled: bool = True):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.enabled = enabled
+        self._entries: 'OrderedDict[CacheKey, Tuple[float, Dict[str, Any]]]' = OrderedDict()
+        self._inflight: Dict[CacheKey, asyncio.Future] = {}
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0,
+        }
+
+    @staticmethod
+    def _key(Clazz: type, id: str) -> CacheKey:
+        return (Clazz.__name__, id)
+
+    @staticmethod
+    def _dump(model: Any) -> Dict[str, Any]:
+        """取出实体的列值"""
+        return {attr.key: getattr(model, attr.key) for attr in sa_inspect(model.__class__).column_attrs}
+
+    @staticmethod
+    def _build(Clazz: type, values: Dict[str, Any]) -> Any:
+        """由列值重新构造实体，状态与从数据库加载后关闭会话的实体一致"""
+        model = Clazz(**copy.deepcopy(values))
+        make_transient_to_detached(model)
+        return model
+
+    def get(self, Clazz: type, id: str) -> Optional[Any]:
+        """读取缓存，未命中或已过期返回None"""
+        key = self._key(Clazz, id)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expire_at, values = entry
+        if expire_at <= time.monotonic():
+            del self._entries[key]
+            self._stats['expirations'] += 1
+            return None
+        self._entries.move_to_end(key)
+        return self._build(Clazz, values)
+
+    def set(self, model: Any) -> None:
+        """写入缓存，超出容量时淘汰最久未使用的实体"""
+        key = self._key(model.__class__, model.id)
+        self._entries[key] = (time.monotonic() + self.ttl, self._dump(model))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    async def get_or_load(self, Clazz: type, id: str, loader: Callable[[], Awaitable[Optional[Any]]]) -> Optional[Any]:
+        """
+        读取实体，未命中时调用loader从数据库加载并写入缓存
+
+        Args:
+            Clazz: 实体类
+            id: 实体ID
+            loader: 加载实体的协程函数，实体不存在时返回None(不缓存)
+
+        Returns:
+            实体对象
+        """
+        if not self.enabled:
+            return await loader()
+
+        model = self.get(Clazz, id)
+        if model is not None:
+            self._stats['hits'] += 1
+            return model
+
+        key = self._key(Clazz, id)
+        future = self._inflight.get(key)
+        if future is not None:
+            # 已有相同的查询在进行中，等待其结果
+            self._stats['coalesced'] += 1
+            values = await asyncio.shield(future)
+            return self._build(Clazz, values) if values is not None else None
+
+        self._stats['misses'] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            model = await loader()
+        except BaseException as e:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+            future.set_exception(e)
+            # 没有其他等待者时避免"exception was never retrieved"警告
+            future.exception()
+            raise
+
+        values = self._dump(model) if model is not None else None
+        # 加载期间如果实体被修改(invalidate已移除inflight)，不写入旧数据
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+            if model is not None:
+                self.set(model)
+        future.set_result(values)
+        return model
+
+    def invalidate(self, Clazz: type, ids: Iterable[str]) -> None:
+        """使指定实体的缓存失效"""
+        for id in ids:
+            key = self._key(Clazz, id)
+            self._inflight.pop(key, None)
+            if self._entries.pop(key, None) is not None:
+                self._stats['invalidations'] += 1
+
+    def clear(self) -> None:
+        """清空缓存"""
+        self._entries.clear()
+        self._inflight.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        lookups = self._stats['hits'] + self._stats['misses'] + self._stats['coalesced']
+        return {
+            'enabled': self.enabled,
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'ttl': self.ttl,
+            **self._stats,
+            'hit_rate': round(self._stats['hits'] / lookups, 4) if lookups else 0.0,
+        }
+
+
+# 创建全局缓存实例，所有DAO共享
+entity_cache = EntityCache(
+    max_size=settings.ENTITY_CACHE_MAX_SIZE,
+    ttl=settings.ENTITY_CACHE_TTL,
+    enabled=settings.ENTITY_CACHE_ENABLED,
+)
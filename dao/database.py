@@ -1,62 +1,293 @@
 """
 数据库连接和会话管理 - 异步版本
+
+整个进程只使用一个主库引擎: 应用启动时由lifespan调用init_engine创建并预热连接池，
+关闭时调用dispose_engine释放；脚本中直接使用时在第一次获取引擎时创建。
+配置了DATABASE_READ_URLS时同时为每个只读库创建一个引擎，DAO的只读查询从中选择一个执行
+
+DATABASE_URL为sqlite+aiosqlite时使用SQLite部署配置: 每个连接设置WAL等PRAGMA，
+写操作通过进程内的写锁排队，避免多个写事务争用数据库锁
 """
 
 import asyncio
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import sessionmaker
+import itertools
+import time
+from contextlib import AsyncExitStack
+from typing import Any, Dict, List, Optional
+from sqlalchemy import event, exc as sa_exc, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlmodel import SQLModel
 from config.settings import settings
+from dao.query_stats import instrument_engine
 import logging
 
 logger = logging.getLogger(__name__)
 
-# 异步数据库引擎
-async_engine = None
+# 异步数据库引擎和会话工厂
+async_engine: Optional[AsyncEngine] = None
+async_session_maker: Optional[async_sessionmaker] = None
+# 只读库引擎和对应的会话工厂，未配置时为空
+read_engines: List[AsyncEngine] = []
+read_session_makers: List[async_sessionmaker] = []
+_read_counter = itertools.count()
+# SQLite的写锁，同一时间只允许一个写事务，其他数据库为None
+_write_lock: Optional[asyncio.Lock] = None
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """记录获取连接耗时和超时次数的连接池"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_count = 0
+        self.checkout_timeouts = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except sa_exc.TimeoutError:
+            self.checkout_timeouts += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.checkout_count += 1
+            self.total_wait_time += elapsed
+            self.max_wait_time = max(self.max_wait_time, elapsed)
 
+    def get_stats(self) -> Dict[str, Any]:
+        """获取连接池统计信息"""
+        return {
+            'pool_size': self.size(),
+            'checked_in': self.checkedin(),
+            'checked_out': self.checkedout(),
+            'overflow': self.overflow(),
+            'max_overflow': self._max_overflow,
+            'timeout': self.timeout(),
+            'checkouts': self.checkout_count,
+            'checkout_timeouts': self.checkout_timeouts,
+            'avg_wait_ms': round(self.total_wait_time / self.checkout_count * 1000, 3) if self.checkout_count else 0.0,
+            'max_wait_ms': round(self.max_wait_time * 1000, 3),
+        }
+
+
+def _pool_options(database_url: str) -> Dict[str, Any]:
+    """连接池参数，SQLite内存数据库只有一个连接，使用驱动默认的连接池"""
+    url = make_url(database_url)
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        return {}
+    return {
+        'poolclass': TimedQueuePool,
+        'pool_size': settings.DB_POOL_SIZE,
+        'max_overflow': settings.DB_MAX_OVERFLOW,
+        'pool_timeout': settings.DB_POOL_TIMEOUT,
+        'pool_recycle': settings.DB_POOL_RECYCLE,
+        'pool_pre_ping': True,
+    }
+
+
+def is_sqlite_url(database_url: str) -> bool:
+    """是否SQLite数据库地址"""
+    return make_url(database_url).get_backend_name() == 'sqlite'
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """新建SQLite连接时设置PRAGMA"""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT)}")
+    finally:
+        cursor.close()
+
+
+def configure_sqlite_engine(engine: AsyncEngine) -> None:
+    """为SQLite引擎注册设置PRAGMA的事件"""
+    event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+
+
+def create_async_database_engine() -> AsyncEngine:
+    """创建异步数据库引擎和会话工厂，已创建时直接返回已有的引擎"""
+    global async_engine, async_session_maker, _write_lock
+    if async_engine is not None:
+        return async_engine
 
-def create_async_database_engine():
-    """创建异步数据库引擎"""
-    global async_engine, async_session_maker
     database_url = settings.DATABASE_URL
-    
     logger.info("创建数据库连接管理引擎")
-    
+
     async_engine = create_async_engine(
         database_url,
         echo=settings.API_DEBUG,  # 在调试模式下显示SQL语句
-        pool_pre_ping=True,
-        pool_recycle=300,
+        **_pool_options(database_url),
     )
-    
+    instrument_engine(async_engine)
+    if is_sqlite_url(database_url):
+        configure_sqlite_engine(async_engine)
+        _write_lock = asyncio.Lock()
+
     async_session_maker = async_sessionmaker(
-        async_engine, 
-        class_=AsyncSession, 
+        async_engine,
+        class_=AsyncSession,
         expire_on_commit=False
     )
-    
+
+    for read_url in get_read_urls():
+        logger.info("创建只读库连接管理引擎")
+        read_engine = create_async_engine(
+            read_url,
+            echo=settings.API_DEBUG,
+            **_pool_options(read_url),
+        )
+        instrument_engine(read_engine)
+        if is_sqlite_url(read_url):
+            configure_sqlite_engine(read_engine)
+        read_engines.append(read_engine)
+        read_session_makers.append(async_sessionmaker(
+            read_engine,
+            class_=AsyncSession,
+            expire_on_commit=False
+        ))
+
     return async_engine
 
 
-def get_async_engine():
+def get_read_urls() -> List[str]:
+    """配置的只读库地址列表"""
+    if not settings.DATABASE_READ_URLS:
+        return []
+    return [url.strip() for url in settings.DATABASE_READ_URLS.split(',') if url.strip()]
+
+
+def select_read_index(engines: List[AsyncEngine], strategy: str) -> int:
+    """
+    选择一个只读库
+
+    Args:
+        engines: 只读库引擎列表
+        strategy: round_robin(轮询) 或 least_busy(当前使用中连接最少)
+
+    Returns:
+        int: 选中的只读库下标
+    """
+    if strategy not in ('round_robin', 'least_busy'):
+        raise ValueError(f"不支持的只读库选择策略: {strategy}")
+    if strategy == 'least_busy':
+        def checked_out(i: int) -> int:
+            pool = engines[i].sync_engine.pool
+            return pool.checkedout() if hasattr(pool, 'checkedout') else 0
+        return min(range(len(engines)), key=checked_out)
+    return next(_read_counter) % len(engines)
+
+
+def get_read_session_maker() -> Optional[async_sessionmaker]:
+    """选择一个只读库的会话工厂，未配置只读库时返回None"""
+    get_async_engine()
+    if not read_session_makers:
+        return None
+    return read_session_makers[select_read_index(read_engines, settings.DATABASE_READ_STRATEGY)]
+
+
+def get_write_lock() -> Optional[asyncio.Lock]:
+    """SQLite部署时串行化写事务的锁，其他数据库返回None"""
+    get_async_engine()
+    return _write_lock
+
+
+def get_async_engine() -> AsyncEngine:
     """获取异步数据库引擎"""
-    global async_engine
     if async_engine is None:
-        async_engine = create_async_database_engine()
+        return create_async_database_engine()
     return async_engine
 
 
-async def get_async_session_maker():
+async def get_async_session_maker() -> async_sessionmaker:
     """获取异步会话工厂"""
-    global async_session_maker
     if async_session_maker is None:
-        await get_async_engine()
+        get_async_engine()
     return async_session_maker
 
 
+async def warm_up_pool(connections: Optional[int] = None) -> int:
+    """
+    预先建立连接池中的连接，避免启动后第一批请求承担建立连接的开销
+
+    Args:
+        connections: 每个引擎预先建立的连接数，默认使用配置DB_POOL_WARMUP，不超过连接池大小
+
+    Returns:
+        int: 实际预热的连接数
+    """
+    connections = connections if connections is not None else settings.DB_POOL_WARMUP
+    warmed = 0
+    for engine in [get_async_engine(), *read_engines]:
+        pool = engine.sync_engine.pool
+        if not isinstance(pool, TimedQueuePool):
+            continue
+        count = min(connections, pool.size())
+
+        async def open_connection(stack: AsyncExitStack) -> None:
+            conn = await stack.enter_async_context(engine.connect())
+            await conn.execute(text("SELECT 1"))
+
+        # 同时持有所有连接，确保建立的是不同的连接，退出时全部归还到连接池
+        async with AsyncExitStack() as stack:
+            await asyncio.gather(*[open_connection(stack) for _ in range(count)])
+        warmed += count
+    logger.info(f"数据库连接池预热完成: {warmed}个连接")
+    return warmed
+
+
+async def init_engine() -> AsyncEngine:
+    """应用启动时创建引擎、检查数据库连接并预热连接池"""
+    engine = get_async_engine()
+    logger.info("检查数据库连接")
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    await warm_up_pool()
+    return engine
+
+
+async def dispose_engine() -> None:
+    """应用关闭时释放引擎的所有连接"""
+    global async_engine, async_session_maker, _write_lock
+    if async_engine is not None:
+        await async_engine.dispose()
+        for read_engine in read_engines:
+            await read_engine.dispose()
+        logger.info("数据库连接已释放")
+    async_engine = None
+    async_session_maker = None
+    _write_lock = None
+    read_engines.clear()
+    read_session_makers.clear()
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """获取连接池统计信息，引擎还未创建时返回空字典"""
+    if async_engine is None:
+        return {}
+    stats = _get_engine_pool_stats(async_engine)
+    if read_engines:
+        stats['replicas'] = [_get_engine_pool_stats(read_engine) for read_engine in read_engines]
+    return stats
+
+
+def _get_engine_pool_stats(engine: AsyncEngine) -> Dict[str, Any]:
+    pool = engine.sync_engine.pool
+    if isinstance(pool, TimedQueuePool):
+        return pool.get_stats()
+    return {'status': pool.status()}
+
+
 async def create_db_and_tables():
     """创建数据库和表"""
-    engine = await get_async_engine()
+    engine = get_async_engine()
     async with engine.begin() as conn:
         await conn.run_sync(SQLModel.metadata.create_all)
     logger.info("数据库表创建完成")
@@ -74,6 +305,9 @@ async def init_database():
     """初始化数据库"""
     try:
         await create_db_and_tables()
+        # 已存在的表不会被create_all修改，结构变更通过迁移完成
+        from dao.migrations import run_migrations
+        await run_migrations()
         logger.info("数据库初始化成功")
     except Exception as e:
         logger.error(f"数据库初始化失败: {e}")
@@ -3,11 +3,17 @@
 """
 
 import logging
-from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any, Union
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Dict, Any, Union, Tuple, AsyncIterator
+from contextlib import aclosing
 from sqlmodel import select, update, delete
+from sqlalchemy import func, case
 from dao.base_dao import BaseDao
-from entity.exam import Exam, Answer
+from dao.filter_schema import FilterSchema
+from entity.exam import Exam, ExamStatus, Answer
+from entity.exam_question import ExamQuestion
+from entity.exam_answer import ExamAnswer
+from entity.question import Question
 from entity.paper import Paper
 from entity.user import User
 import json
@@ -18,23 +24,243 @@ logger = logging.getLogger(__name__)
 class ExamDAO(BaseDao):
     """考试数据访问对象"""
 
+    # 列表接口允许的过滤字段、操作符和排序字段
+    filter_schema = FilterSchema(
+        Exam,
+        fields={
+            'goal_id': ('$eq', '$in'),
+            'examinee_id': ('$eq', '$in'),
+            'status': ('$eq', '$ne', '$in'),
+            'title': ('$eq',),
+            'plan_starttime': ('$gt', '$gte', '$lt', '$lte', '$between'),
+        },
+        order_by=('plan_starttime',),
+    )
+
     async def get_by_id(self, exam_id: str) -> Optional[Exam]:
-        """根据ID获取考试"""
-        return await self._get_by_id(Exam, exam_id)
+        """根据ID获取考试，包括问题ID列表"""
+        exam = await self._get_by_id(Exam, exam_id)
+        if exam:
+            await self._attach_question_ids(ExamQuestion.exam_id, [exam])
+        return exam
+
+    async def create(self, model: Exam) -> Exam:
+        """创建考试，并在同一事务中写入问题列表"""
+        return await self._create_with_question_ids(ExamQuestion.exam_id, model)
+
+    async def update(self, model: Exam, refresh: Optional[bool] = None) -> Exam:
+        """更新考试，问题列表有修改时一并保存"""
+        return await self._update_with_question_ids(ExamQuestion.exam_id, model, refresh)
 
-    async def search_by_kwargs(self, kwargs: dict, skip: int = 0, limit: int = 100, order_by: Union[str, List[str], None] = None) -> List[Exam]:
+    async def search_by_kwargs(self, kwargs: dict, skip: int = 0, limit: int = 100, order_by: Union[str, List[str], None] = None, cursor: Optional[str] = None, fields: Optional[List[str]] = None) -> List[Exam]:
         """根据关键字搜索考试"""
-        return await self._search_by_kwargs(Exam, kwargs, skip, limit, order_by)
+        exams = await self._search_by_kwargs(Exam, kwargs, skip, limit, order_by, cursor, fields)
+        return await self._attach_question_ids(ExamQuestion.exam_id, exams)
+
+    async def search_with_total(self, kwargs: dict, skip: int = 0, limit: int = 100, order_by: Union[str, List[str], None] = None, cursor: Optional[str] = None, count_mode: str = 'exact', fields: Optional[List[str]] = None) -> Tuple[List[Exam], int]:
+        """根据关键字搜索考试并返回总数"""
+        exams, total = await self._search_with_total(Exam, kwargs, skip, limit, order_by, cursor, count_mode, fields)
+        return await self._attach_question_ids(ExamQuestion.exam_id, exams), total
+
+    async def update_where(self, kwargs: dict, values: Dict[str, Any]) -> int:
+        """按过滤条件批量更新考试，返回更新的行数"""
+        return await self._update_where(Exam, kwargs, values)
+
+    async def soft_delete_where(self, kwargs: dict) -> int:
+        """按过滤条件批量软删除考试，返回删除的行数"""
+        return await self._soft_delete_where(Exam, kwargs)
 
     async def count_by_kwargs(self, kwargs: dict) -> int:
         """根据关键字统计考试数量"""
         # 考试实体通常不需要模糊匹配，使用相等匹配
         return await self._count_by_kwargs(Exam, kwargs)
 
+    async def stream_by_kwargs(self, kwargs: dict, order_by: Union[str, List[str], None] = None, chunk_size: Optional[int] = None) -> AsyncIterator[List[Exam]]:
+        """流式读取全部匹配的考试，分块返回，每块一次查询加载问题ID列表"""
+        async with aclosing(self._stream_by_kwargs(Exam, kwargs, order_by, chunk_size)) as chunks:
+            async for exams in chunks:
+                yield await self._attach_question_ids(ExamQuestion.exam_id, exams)
+
+    async def get_exam_with_questions(self, exam_id: str) -> Optional[Exam]:
+        """根据ID获取考试，一次关联查询按顺序加载问题列表"""
+        return await self._get_with_questions(Exam, ExamQuestion.exam_id, Question, exam_id)
+
+    async def get_exam_ids_by_question(self, question_id: str) -> List[str]:
+        """获取包含某个问题的考试ID列表"""
+        return await self._get_ids_by_question(ExamQuestion.exam_id, question_id)
+
+    async def get_exam_with_answers(self, exam_id: str) -> Optional[Exam]:
+        """根据ID获取考试，加载问题列表和每个问题的答案，用于Exam.get_answer"""
+        exam = await self.get_exam_with_questions(exam_id)
+        if exam:
+            exam.set_loaded_answers(await self.get_answers(exam_id))
+        return exam
+
+    async def get_answers(self, exam_id: str, question_ids: Optional[List[str]] = None) -> List[ExamAnswer]:
+        """
+        按答卷中的顺序读取考试的答案
+
+        Args:
+            exam_id: 考试ID
+            question_ids: 只读取这些问题的答案，None表示读取全部
+        """
+        try:
+            async with self._session_scope(read_only=True) as session:
+                statement = select(ExamAnswer).where(ExamAnswer.exam_id == exam_id)
+                if question_ids is not None:
+                    statement = statement.where(ExamAnswer.question_id.in_(question_ids))
+                result = await session.execute(statement.order_by(ExamAnswer.position))
+                return result.scalars().all()
+        except Exception as e:
+            logger.error(f"读取考试答案失败 (exam_id: {exam_id}): {e}")
+            raise
+
+    async def save_answers(self, exam_id: str, answers: List[ExamAnswer]) -> List[ExamAnswer]:
+        """用新的答案替换考试的全部答案，在同一事务中完成"""
+        try:
+            async with self._session_scope() as session:
+                await session.execute(delete(ExamAnswer).where(ExamAnswer.exam_id == exam_id))
+                session.add_all(answers)
+                await self._commit(session)
+            return answers
+        except Exception as e:
+            logger.error(f"保存考试答案失败 (exam_id: {exam_id}): {e}")
+            raise
+
+    async def complete_with_answers(self, exam_id: str, answers: List[ExamAnswer]) -> int:
+        """
+        提交答卷: 用新的答案替换考试的全部答案并把考试标记为已完成，在同一事务中完成
+
+        先更新考试行(锁定考试行)并推进增量序号，与答卷增量互斥，
+        提交之前发出、之后才到达的增量因序号过期或考试已完成被拒绝
+
+        Returns:
+            int: 推进后的增量序号
+        """
+        try:
+            async with self._session_scope() as session:
+                statement = (
+                    update(Exam)
+                    .where(Exam.id == exam_id)
+                    .values(status=ExamStatus.completed, answer_json=None, answer_seq=Exam.answer_seq + 1, updated_at=datetime.now(timezone.utc))
+                    .execution_options(synchronize_session=False)
+                )
+                await session.execute(statement)
+                await session.execute(delete(ExamAnswer).where(ExamAnswer.exam_id == exam_id))
+                session.add_all(answers)
+                answer_seq = (await session.execute(select(Exam.answer_seq).where(Exam.id == exam_id))).scalar()
+                await self._commit(session)
+            self._invalidate_cache(Exam, [exam_id])
+            return answer_seq or 0
+        except Exception as e:
+            logger.error(f"提交考试答卷失败 (exam_id: {exam_id}): {e}")
+            raise
+
+    async def apply_answer_patch(self, exam_id: str, seq: int, changes: Dict[str, List[Tuple[str, Optional[str], Any]]], positions: Dict[str, int]) -> Tuple[bool, int, Optional[ExamStatus]]:
+        """
+        按序号应用答卷增量，只读取和写入增量涉及的问题的答案行
+
+        序号通过条件更新写入考试行: 只有大于已保存的序号且考试未完成时才应用，同时锁定考试行，
+        同一考试的并发增量按顺序应用，重复或过期的增量以及已完成考试的增量被拒绝
+
+        Args:
+            exam_id: 考试ID
+            seq: 增量序号
+            changes: parse_answer_patch的结果
+            positions: 问题ID -> 问题在考试中的位置，用于新建的答案行
+
+        Returns:
+            tuple: (是否已应用, 当前序号, 考试状态)
+        """
+        try:
+            async with self._session_scope() as session:
+                statement = (
+                    update(Exam)
+                    .where(Exam.id == exam_id, Exam.answer_seq < seq, Exam.status != ExamStatus.completed)
+                    .values(answer_seq=seq, updated_at=datetime.now(timezone.utc))
+                    .execution_options(synchronize_session=False)
+                )
+                if (await session.execute(statement)).rowcount == 0:
+                    row = (await session.execute(select(Exam.answer_seq, Exam.status).where(Exam.id == exam_id))).first()
+                    return (False, row.answer_seq or 0, row.status) if row else (False, 0, None)
+
+                statement = select(ExamAnswer).where(ExamAnswer.exam_id == exam_id, ExamAnswer.question_id.in_(list(changes)))
+                answers = {answer.question_id: answer for answer in (await session.execute(statement)).scalars()}
+                now = datetime.now(timezone.utc)
+                for question_id, operations in changes.items():
+                    answer = answers.get(question_id)
+                    if operations[0] == ('remove', None, None):
+                        operations = operations[1:]
+                        if answer is not None:
+                            if not operations:
+                                await session.delete(answer)
+                                continue
+                            answer.reset()
+                    if not operations:
+                        continue
+                    if answer is None:
+                        answer = ExamAnswer(exam_id=exam_id, question_id=question_id, position=positions.get(question_id, 0))
+                        session.add(answer)
+                    for op, field, value in operations:
+                        answer.apply_patch(op, field, value)
+                    answer.updated_at = now
+                await self._commit(session)
+            self._invalidate_cache(Exam, [exam_id])
+            return True, seq, None
+        except Exception as e:
+            logger.error(f"应用答卷增量失败 (exam_id: {exam_id}, seq: {seq}): {e}")
+            raise
+
+    async def get_question_accuracy(self, question_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        按问题统计未删除考试中的答题数、已批改数、正确数、正确率和平均耗时，一次分组查询，只扫描exam_answer的问题索引
+
+        Args:
+            question_ids: 问题ID列表
+
+        Returns:
+            dict: 问题ID -> 统计结果，没有答题记录的问题各项为0，正确率为None
+        """
+        unique_ids = list(dict.fromkeys(question_ids))
+        stats = {
+            question_id: {'question_id': question_id, 'answered': 0, 'graded': 0, 'correct': 0, 'accuracy': None, 'avg_time_spent': None}
+            for question_id in unique_ids
+        }
+        if not unique_ids:
+            return stats
+        try:
+            async with self._session_scope(read_only=True) as session:
+                statement = (
+                    select(
+                        ExamAnswer.question_id,
+                        func.count(),
+                        func.count(ExamAnswer.is_correct),
+                        func.sum(case((ExamAnswer.is_correct == True, 1), else_=0)),
+                        func.avg(ExamAnswer.time_spent),
+                    )
+                    .join(Exam, Exam.id == ExamAnswer.exam_id)
+                    .where(ExamAnswer.question_id.in_(unique_ids), Exam.is_deleted == False)
+                    .group_by(ExamAnswer.question_id)
+                )
+                rows = (await self._timed_execute(session, statement, "ExamAnswer.get_question_accuracy")).all()
+        except Exception as e:
+            logger.error(f"统计问题正确率失败: {e}")
+            raise
+
+        for question_id, answered, graded, correct, avg_time_spent in rows:
+            stats[question_id].update({
+                'answered': answered,
+                'graded': graded,
+                'correct': int(correct or 0),
+                'accuracy': round(int(correct or 0) / graded, 4) if graded else None,
+                'avg_time_spent': round(float(avg_time_spent), 1) if avg_time_spent is not None else None,
+            })
+        return stats
+
     async def get_exam_with_details(self, exam_id: str) -> Optional[Dict[str, Any]]:
         """根据ID获取考试详细信息（包括试卷和考生信息）"""
         try:
-            exam = await self.get_by_id(exam_id)
+            exam = await self.get_exam_with_answers(exam_id)
             if not exam:
                 return None
 
@@ -0,0 +1,190 @@
+"""
+过滤条件模式 - 声明实体允许的过滤字段、操作符和排序字段，导入时编译
+
+列表接口的查询参数先由FilterSchema校验: 只允许声明过的字段、操作符和排序字段，
+参数值按列类型转换，没有可用索引的过滤与排序组合直接拒绝，避免客户端按未建索引的列过滤或排序导致全表扫描。
+编译后构建过滤条件只需要查字典，不再每次反射实体类
+"""
+
+from datetime import datetime
+from enum import Enum
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Tuple, Union
+from dao.index_check import check_index_coverage
+from entity.fulltext import fulltext_match
+
+
+def _between(attr, value):
+    if len(value) != 2:
+        raise ValueError("between条件需要两个值")
+    return attr.between(value[0], value[1])
+
+
+# 操作符 -> 条件构建函数
+FILTER_OPERATORS: Dict[str, Callable[[Any, Any], Any]] = {
+    '$eq': lambda attr, value: attr == value,
+    '$ne': lambda attr, value: attr != value,
+    '$gt': lambda attr, value: attr > value,
+    '$gte': lambda attr, value: attr >= value,
+    '$lt': lambda attr, value: attr < value,
+    '$lte': lambda attr, value: attr <= value,
+    '$like': lambda attr, value: attr.contains(value),
+    '$in': lambda attr, value: attr.in_(value),
+    '$nin': lambda attr, value: ~attr.in_(value),
+    '$between': _between,
+    '$match': fulltext_match,
+}
+# 值为列表的操作符，列表中的每个值都按列类型转换
+LIST_OPS = ('$in', '$nin', '$between')
+# 值为搜索文本的操作符，不按列类型转换
+TEXT_OPS = ('$like', '$match')
+
+# 实体类 -> {字段名: 字段属性}
+_column_maps: Dict[type, Dict[str, Any]] = {}
+
+
+def get_columns(Clazz: type) -> Dict[str, Any]:
+    """实体的字段名 -> 字段属性，每个实体只反射一次"""
+    columns = _column_maps.get(Clazz)
+    if columns is None:
+        columns = {column.key: getattr(Clazz, column.key) for column in Clazz.__table__.columns}
+        _column_maps[Clazz] = columns
+    return columns
+
+
+def build_condition(attr, op: str, value: Any):
+    """根据操作符构建过滤条件"""
+    builder = FILTER_OPERATORS.get(op)
+    if builder is None:
+        raise ValueError(f"不支持的操作符: {op}")
+    return builder(attr, value)
+
+
+def parse_filter_value(value: Any) -> Tuple[str, Any]:
+    """过滤值解析为(操作符, 值)，普通值为相等比较，字典如 {"$gt": 5} 只能包含一个操作符"""
+    if isinstance(value, dict):
+        if len(value) != 1:
+            raise ValueError(f"过滤条件字典只能包含一个键值对: {value}")
+        return next(iter(value.items()))
+    return '$eq', value
+
+
+def _parse_bool(value: str) -> bool:
+    lowered = value.strip().lower()
+    if lowered in ('true', '1', 'yes'):
+        return True
+    if lowered in ('false', '0', 'no'):
+        return False
+    raise ValueError(f"无效的布尔值: {value}")
+
+
+def _parse_datetime(value: str) -> datetime:
+    return datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+
+
+def _build_coercer(column) -> Callable[[str], Any]:
+    """按列类型把查询参数中的字符串转换为对应类型的函数"""
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return str
+    if python_type is bool:
+        return _parse_bool
+    if issubclass(python_type, datetime):
+        return _parse_datetime
+    if issubclass(python_type, (Enum, int, float)):
+        return python_type
+    return str
+
+
+class FilterSchema:
+    """
+    实体列表查询允许的过滤与排序
+
+    用法:
+        filter_schema = FilterSchema(
+            Exam,
+            fields={'goal_id': ('$eq', '$in'), 'plan_starttime': ('$gte', '$lte')},
+            order_by=('plan_starttime',),
+        )
+        kwargs = filter_schema.validate(parse_dynamic_filters(request), order_by)
+    """
+
+    def __init__(self, Clazz: type, fields: Dict[str, Iterable[str]], order_by: Iterable[str] = (), require_index: bool = True):
+        """
+        Args:
+            Clazz: 实体类
+            fields: 允许过滤的字段 -> 允许的操作符
+            order_by: 允许排序的字段，id总是允许
+            require_index: 是否拒绝没有可用索引的过滤与排序组合
+        """
+        columns = get_columns(Clazz)
+        self.Clazz = Clazz
+        self.require_index = require_index
+        self._fields: Dict[str, Tuple[FrozenSet[str], Callable[[str], Any]]] = {}
+        for name, ops in fields.items():
+            if name not in columns:
+                raise ValueError(f"{Clazz.__name__}没有字段: {name}")
+            unknown_ops = set(ops) - FILTER_OPERATORS.keys()
+            if unknown_ops:
+                raise ValueError(f"不支持的操作符: {sorted(unknown_ops)}")
+            self._fields[name] = (frozenset(ops), _build_coercer(Clazz.__table__.c[name]))
+        self._order_fields = frozenset(order_by) | {'id'}
+        for name in self._order_fields:
+            if name not in columns:
+                raise ValueError(f"{Clazz.__name__}没有字段: {name}")
+
+    @staticmethod
+    def _coerce(op: str, value: Any, coerce: Callable[[str], Any]) -> Any:
+        if op in TEXT_OPS:
+            return str(value)
+        if op in LIST_OPS:
+            values = value.split(',') if isinstance(value, str) else value
+            return [coerce(item) if isinstance(item, str) else item for item in values]
+        return coerce(value) if isinstance(value, str) else value
+
+    def _parse_order_columns(self, order_by: Union[str, List[str], None]) -> List[str]:
+        if not order_by:
+            fields = []
+        elif isinstance(order_by, str):
+            fields = [order_by]
+        else:
+            fields = list(order_by)
+        names = [field[1:] if field.startswith('-') else field for field in fields]
+        for name in names:
+            if name not in self._order_fields:
+                raise ValueError(f"不允许按{name}排序")
+        return names if 'id' in names else names + ['id']
+
+    def validate(self, kwargs: dict, order_by: Union[str, List[str], None] = None) -> dict:
+        """
+        校验过滤条件和排序，并把参数值转换为列类型
+
+        Args:
+            kwargs: 过滤条件字典，格式同_search_by_kwargs
+            order_by: 排序参数，格式同_search_by_kwargs
+
+        Returns:
+            dict: 转换后的过滤条件字典
+
+        Raises:
+            ValueError: 字段、操作符或排序不允许，参数值无法转换，或组合没有可用索引
+        """
+        validated = {}
+        for key, value in kwargs.items():
+            spec = self._fields.get(key)
+            if spec is None:
+                raise ValueError(f"不允许按{key}过滤")
+            ops, coerce = spec
+            op, val = parse_filter_value(value)
+            if op not in ops:
+                raise ValueError(f"{key}不支持{op}过滤")
+            try:
+                val = self._coerce(op, val, coerce)
+            except ValueError as e:
+                raise ValueError(f"{key}的值无效: {val} ({e})")
+            validated[key] = val if op == '$eq' else {op: val}
+
+        order_columns = self._parse_order_columns(order_by)
+        if self.require_index and check_index_coverage(self.Clazz, validated, order_columns) is None:
+            raise ValueError(f"没有可用索引的查询条件: 过滤{sorted(validated)}, 排序{order_columns}")
+        return validated
@@ -1,21 +1,50 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union, Tuple, AsyncIterator
+from contextlib import aclosing
 from sqlmodel import select, update
 from entity.goal import Goal
 from dao.base_dao import BaseDao
+from dao.filter_schema import FilterSchema
 from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
 class GoalDAO(BaseDao):
+    # 列表接口允许的过滤字段、操作符和排序字段
+    filter_schema = FilterSchema(
+        Goal,
+        fields={
+            'name': ('$eq',),
+            'creator_id': ('$eq', '$in'),
+            'status': ('$eq', '$in'),
+        },
+    )
+
     async def get_by_id(self, id: str) -> Optional[Goal]:
         return await self._get_by_id(Goal, id)
 
-    async def search_by_kwargs(self, kwargs: dict, skip: int = 0, limit: int = 100) -> List[Goal]:
-        return await self._search_by_kwargs(Goal, kwargs, skip, limit)
+    async def search_by_kwargs(self, kwargs: dict, skip: int = 0, limit: int = 100, order_by: Union[str, List[str], None] = None, cursor: Optional[str] = None, fields: Optional[List[str]] = None) -> List[Goal]:
+        return await self._search_by_kwargs(Goal, kwargs, skip, limit, order_by, cursor, fields)
+
+    async def search_with_total(self, kwargs: dict, skip: int = 0, limit: int = 100, order_by: Union[str, List[str], None] = None, cursor: Optional[str] = None, count_mode: str = 'exact', fields: Optional[List[str]] = None) -> Tuple[List[Goal], int]:
+        return await self._search_with_total(Goal, kwargs, skip, limit, order_by, cursor, count_mode, fields)
+
+    async def update_where(self, kwargs: dict, values: Dict[str, Any]) -> int:
+        """按过滤条件批量更新目标，返回更新的行数"""
+        return await self._update_where(Goal, kwargs, values)
+
+    async def soft_delete_where(self, kwargs: dict) -> int:
+        """按过滤条件批量软删除目标，返回删除的行数"""
+        return await self._soft_delete_where(Goal, kwargs)
 
     async def count_by_kwargs(self, kwargs: dict) -> int:
         return await self._count_by_kwargs(Goal, kwargs)
 
+    async def stream_by_kwargs(self, kwargs: dict, order_by: Union[str, List[str], None] = None, chunk_size: Optional[int] = None) -> AsyncIterator[List[Goal]]:
+        """流式读取全部匹配的目标，分块返回"""
+        async with aclosing(self._stream_by_kwargs(Goal, kwargs, order_by, chunk_size)) as chunks:
+            async for goals in chunks:
+                yield goals
+
 # 全局DAO实例
 goal_dao = GoalDAO()
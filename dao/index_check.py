@@ -0,0 +1,154 @@
+"""
+索引覆盖检查 - 发现没有索引可用的搜索条件与排序组合
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 可以使用索引等值前缀的操作符
+EQUALITY_OPS = ('$eq', '$in')
+# 可以使用索引范围扫描的操作符，其他操作符($like为包含匹配，$ne/$nin)无法使用索引
+RANGE_OPS = ('$gt', '$gte', '$lt', '$lte', '$between')
+# 使用全文索引的操作符
+FULLTEXT_OPS = ('$match',)
+
+# 已检查过的查询形状 -> 可用的索引名(None表示没有可用索引)
+_checked_shapes: Dict[Tuple, Optional[str]] = {}
+
+
+def _is_selective(column) -> bool:
+    """布尔列(is_deleted、is_active等)区分度太低，单独命中不算可用索引"""
+    try:
+        return column.type.python_type is not bool
+    except NotImplementedError:
+        return True
+
+
+def _is_fulltext(index) -> bool:
+    return index.dialect_options['mysql']['prefix'] == 'FULLTEXT'
+
+
+def _get_indexes(table) -> List[Tuple[str, List[Any]]]:
+    """返回表的所有普通索引(含主键)的(索引名, 列列表)"""
+    indexes = [("PRIMARY", list(table.primary_key.columns))]
+    indexes.extend((index.name, list(index.columns)) for index in table.indexes if not _is_fulltext(index))
+    return indexes
+
+
+def find_covering_index(table, equality_columns: List[str], range_columns: List[str], order_columns: List[str], other_columns: List[str] = ()) -> Optional[str]:
+    """
+    查找可用于查询的索引
+
+    索引可用的条件: 跳过被等值条件命中的前缀列后，
+    - 前缀中包含有区分度的列，或
+    - 下一列是范围条件列，或
+    - 下一列是第一个排序列(可以按索引顺序读取，避免排序)，且索引前缀之外没有其他过滤条件；
+      布尔列的等值条件除外，这类条件通常命中大部分行，按索引顺序读取很快能凑满一页。
+      其他条件(如$like、$ne或没有索引的列)在按顺序读取时要逐行过滤，可能扫描整张表
+    多个索引可用时按上面的顺序优先返回
+
+    Args:
+        table: SQLAlchemy Table
+        equality_columns: 等值条件列名
+        range_columns: 范围条件列名
+        order_columns: 排序列名，按排序优先级
+        other_columns: 无法使用索引的条件($ne、$nin、$like)的列名
+
+    Returns:
+        可用的索引名，没有则返回None
+    """
+    # 0: 有区分度的等值前缀, 1: 范围条件, 2: 排序，取最优的一个
+    best = None
+    for name, columns in _get_indexes(table):
+        i = 0
+        while i < len(columns) and columns[i].name in equality_columns:
+            i += 1
+        next_column = columns[i].name if i < len(columns) else None
+        prefix_columns = {column.name for column in columns[:i]}
+        residual_columns = [column for column in equality_columns if column not in prefix_columns]
+        only_boolean_residual = (
+            not range_columns and not other_columns
+            and all(column in table.c and not _is_selective(table.c[column]) for column in residual_columns)
+        )
+        if any(_is_selective(column) for column in columns[:i]):
+            rank = 0
+        elif next_column is not None and next_column in range_columns:
+            rank = 1
+        elif next_column is not None and order_columns and next_column == order_columns[0] and only_boolean_residual:
+            rank = 2
+        else:
+            continue
+        if best is None or rank < best[0]:
+            best = (rank, name)
+    return best[1] if best else None
+
+
+def check_index_coverage(Clazz: Any, kwargs: dict, order_columns: List[str]) -> Optional[str]:
+    """
+    检查_search_by_kwargs的过滤与排序组合是否有可用索引，没有则记录警告
+
+    每种查询形状只检查一次
+
+    Args:
+        Clazz: 实体类
+        kwargs: 过滤条件字典，格式同_search_by_kwargs
+        order_columns: 排序列名，包括末尾的id
+
+    Returns:
+        可用的索引名，没有则返回None
+    """
+    equality_columns = ['is_deleted']
+    range_columns = []
+    fulltext_columns = []
+    other_columns = []
+    for key, value in kwargs.items():
+        op = next(iter(value)) if isinstance(value, dict) and len(value) == 1 else '$eq'
+        if op in FULLTEXT_OPS:
+            fulltext_columns.append(key)
+        elif op in EQUALITY_OPS:
+            equality_columns.append(key)
+        elif op in RANGE_OPS:
+            range_columns.append(key)
+        else:
+            other_columns.append(key)
+
+    shape = (
+        Clazz.__name__, frozenset(equality_columns), frozenset(range_columns + fulltext_columns),
+        frozenset(other_columns), tuple(order_columns),
+    )
+    if shape in _checked_shapes:
+        return _checked_shapes[shape]
+
+    if fulltext_columns:
+        # 全文搜索由全文索引完成
+        fulltext_indexes = [
+            index.name for index in Clazz.__table__.indexes
+            if _is_fulltext(index) and set(fulltext_columns) <= {column.name for column in index.columns}
+        ]
+        index_name = fulltext_indexes[0] if fulltext_indexes else None
+    else:
+        index_name = find_covering_index(Clazz.__table__, equality_columns, range_columns, order_columns, other_columns)
+    _checked_shapes[shape] = index_name
+    if index_name is None:
+        logger.warning(
+            f"{Clazz.__name__}查询没有可用索引: 等值条件={sorted(equality_columns)}, "
+            f"范围条件={sorted(range_columns)}, 其他条件={sorted(other_columns)}, 排序={list(order_columns)}"
+        )
+    return index_name
+
+
+def get_uncovered_shapes() -> List[Dict[str, Any]]:
+    """获取已发现的没有可用索引的查询形状"""
+    return [
+        {
+            'entity': entity,
+            'equality': sorted(equality),
+            'range': sorted(ranges),
+            'other': sorted(others),
+            'order_by': list(order),
+        }
+        for (entity, equality, ranges, others, order), index_name in _checked_shapes.items()
+        if index_name is None
+    ]
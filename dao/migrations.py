@@ -0,0 +1,331 @@
+"""
+数据库迁移 - 按版本顺序执行结构变更，已执行的版本记录在schema_migration表
+
+新增迁移时使用@migration注册一个同步函数，函数接收同步的Connection，
+在init_database中create_all之后自动执行，也可以单独运行: python -m dao.migrations
+"""
+
+import asyncio
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Callable, List
+from sqlalchemy import Column, DateTime, LargeBinary, MetaData, String, Table, bindparam, inspect as sa_inspect, select, text, tuple_, type_coerce
+from sqlalchemy.engine import Connection
+from sqlmodel import SQLModel
+from dao.database import get_async_engine
+from entity.fulltext import fts_table_name, sqlite_fts_ddl
+from entity.question import Question
+from entity.exam_question import ExamQuestion
+from entity.paper_question import PaperQuestion
+from entity.session_archive import SessionArchive
+from entity.exam_answer import ExamAnswer
+from entity.session_message import SessionMessage
+from entity.compressed_text import CompressedText, MEDIUM_BLOB_LENGTH
+from utils.compression import compress_text, decompress_text, is_compressed
+
+logger = logging.getLogger(__name__)
+
+# 迁移记录表单独使用一个MetaData，不属于业务实体
+schema_migration_table = Table(
+    "schema_migration",
+    MetaData(),
+    Column("version", String(32), primary_key=True),
+    Column("description", String(255), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+class Migration:
+    """一个迁移版本"""
+
+    def __init__(self, version: str, description: str, upgrade: Callable[[Connection], None]):
+        self.version = version
+        self.description = description
+        self.upgrade = upgrade
+
+    def __repr__(self) -> str:
+        return f"Migration(version={self.version}, description={self.description})"
+
+
+# 已注册的迁移，按版本号顺序执行
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: str, description: str):
+    """注册迁移的装饰器"""
+    def decorator(func: Callable[[Connection], None]) -> Callable[[Connection], None]:
+        if any(m.version == version for m in MIGRATIONS):
+            raise ValueError(f"迁移版本重复: {version}")
+        MIGRATIONS.append(Migration(version, description, func))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return func
+    return decorator
+
+
+def create_missing_indexes(conn: Connection, table_names: List[str]) -> List[str]:
+    """
+    为已存在的表创建实体中声明但数据库中还没有的索引
+
+    Args:
+        conn: 数据库连接
+        table_names: 表名列表
+
+    Returns:
+        List[str]: 新建的索引名列表
+    """
+    inspector = sa_inspect(conn)
+    created = []
+    for table_name in table_names:
+        table = SQLModel.metadata.tables.get(table_name)
+        if table is None or not inspector.has_table(table_name):
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table_name)}
+        for index in sorted(table.indexes, key=lambda ix: ix.name):
+            if index.name not in existing:
+                index.create(conn)
+                created.append(index.name)
+                logger.info(f"创建索引: {table_name}.{index.name}")
+    return created
+
+
+@migration("0001", "为问题、考试、目标、用户、会话添加查询索引")
+def _add_query_indexes(conn: Connection) -> None:
+    create_missing_indexes(conn, ["question", "exam", "goal", "user", "session"])
+
+
+@migration("0002", "为问题题干和材料添加全文索引")
+def _add_question_fulltext(conn: Connection) -> None:
+    if conn.dialect.name == "mysql":
+        create_missing_indexes(conn, ["question"])
+    elif conn.dialect.name == "sqlite":
+        for statement in sqlite_fts_ddl("question", Question.__fulltext_columns__):
+            conn.exec_driver_sql(statement)
+        # 为已有数据建立索引
+        fts = fts_table_name("question")
+        conn.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def _move_question_ids(conn: Connection, table_name: str, LinkClazz, owner_key: str) -> None:
+    """把table_name.question_ids中逗号分割的问题ID写入关联表，然后删除question_ids列"""
+    inspector = sa_inspect(conn)
+    if not inspector.has_table(table_name):
+        return
+    if "question_ids" not in [column["name"] for column in inspector.get_columns(table_name)]:
+        return
+    LinkClazz.__table__.create(conn, checkfirst=True)
+
+    rows = conn.execute(text(f"SELECT id, question_ids FROM {table_name} WHERE question_ids IS NOT NULL AND question_ids != ''")).all()
+    owner_question_ids = [(owner_id, [qid.strip() for qid in question_ids.split(",") if qid.strip()]) for owner_id, question_ids in rows]
+
+    # 关联表有外键，跳过已经不存在的问题
+    all_ids = list({qid for _, ids in owner_question_ids for qid in ids})
+    existing_ids = set()
+    for start in range(0, len(all_ids), 1000):
+        chunk = all_ids[start:start + 1000]
+        existing_ids.update(conn.execute(select(Question.__table__.c.id).where(Question.__table__.c.id.in_(chunk))).scalars())
+    if len(existing_ids) < len(all_ids):
+        logger.warning(f"{table_name}.question_ids中有{len(all_ids) - len(existing_ids)}个问题不存在，迁移时跳过")
+
+    links = []
+    for owner_id, ids in owner_question_ids:
+        ids = [qid for qid in ids if qid in existing_ids]
+        links.extend({owner_key: owner_id, "position": position, "question_id": qid} for position, qid in enumerate(ids))
+    # 迁移中断后重新执行时，先清理已写入的关联
+    conn.execute(LinkClazz.__table__.delete())
+    if links:
+        conn.execute(LinkClazz.__table__.insert(), links)
+    conn.exec_driver_sql(f"ALTER TABLE {table_name} DROP COLUMN question_ids")
+    logger.info(f"迁移{table_name}.question_ids到{LinkClazz.__tablename__}: {len(links)}条")
+
+
+@migration("0003", "考试、试卷的问题列表改为exam_question/paper_question关联表")
+def _move_question_ids_to_link_tables(conn: Connection) -> None:
+    _move_question_ids(conn, "exam", ExamQuestion, "exam_id")
+    _move_question_ids(conn, "paper", PaperQuestion, "paper_id")
+
+
+@migration("0004", "添加会话归档表和按最后活动时间查找空闲会话的索引")
+def _add_session_archive(conn: Connection) -> None:
+    SessionArchive.__table__.create(conn, checkfirst=True)
+    create_missing_indexes(conn, ["session"])
+
+
+@migration("0005", "考试答卷answer_json拆分为exam_answer表中每个问题一行")
+def _split_exam_answers(conn: Connection) -> None:
+    ExamAnswer.__table__.create(conn, checkfirst=True)
+    exam = SQLModel.metadata.tables["exam"]
+    answer_table = ExamAnswer.__table__
+    columns = [column.key for column in answer_table.columns]
+    migrated = skipped = 0
+    last_id = ""
+    while True:
+        # 按ID分批读取，避免一次加载所有答卷
+        rows = conn.execute(
+            select(exam.c.id, exam.c.answer_json)
+            .where(exam.c.answer_json.is_not(None), exam.c.id > last_id)
+            .order_by(exam.c.id)
+            .limit(500)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        for exam_id, answer_json in rows:
+            try:
+                answers = ExamAnswer.from_answer_json(exam_id, json.loads(answer_json))
+            except Exception as e:
+                logger.warning(f"考试{exam_id}的答卷解析失败，迁移时跳过: {e}")
+                skipped += 1
+                continue
+            # 答案表有外键，跳过已经不存在的问题
+            question_ids = [answer.question_id for answer in answers]
+            existing_ids = set(conn.execute(select(Question.__table__.c.id).where(Question.__table__.c.id.in_(question_ids))).scalars()) if question_ids else set()
+            # 迁移中断后重新执行时，先清理已写入的答案
+            conn.execute(answer_table.delete().where(answer_table.c.exam_id == exam_id))
+            values = [{key: getattr(answer, key) for key in columns} for answer in answers if answer.question_id in existing_ids]
+            if values:
+                conn.execute(answer_table.insert(), values)
+            migrated += 1
+    logger.info(f"迁移exam.answer_json到exam_answer: {migrated}份答卷，跳过{skipped}份")
+
+
+@migration("0006", "考试添加答卷增量序号answer_seq")
+def _add_exam_answer_seq(conn: Connection) -> None:
+    inspector = sa_inspect(conn)
+    if not inspector.has_table("exam"):
+        return
+    if "answer_seq" not in [column["name"] for column in inspector.get_columns("exam")]:
+        conn.exec_driver_sql("ALTER TABLE exam ADD COLUMN answer_seq INTEGER NOT NULL DEFAULT 0")
+
+
+def compress_text_column(conn: Connection, table: Table, column_name: str, batch_size: int = 500) -> int:
+    """
+    把已有的文本列改为CompressedText存储: MySQL先把列类型改为MEDIUMBLOB，然后按主键分批改写还没有压缩的行
+
+    Args:
+        conn: 数据库连接
+        table: 表(列类型已声明为CompressedText)
+        column_name: 列名
+        batch_size: 每批读取的行数
+
+    Returns:
+        int: 改写的行数
+    """
+    inspector = sa_inspect(conn)
+    if not inspector.has_table(table.name):
+        return 0
+    if conn.dialect.name == "mysql":
+        column_type = next(c["type"] for c in inspector.get_columns(table.name) if c["name"] == column_name)
+        if "BLOB" not in str(column_type).upper():
+            # TEXT改为BLOB时保留原来的UTF-8字节，未改写的行读取时按未压缩的文本处理
+            blob_type = LargeBinary(length=MEDIUM_BLOB_LENGTH).compile(dialect=conn.dialect)
+            nullable = "NULL" if table.c[column_name].nullable else "NOT NULL"
+            conn.exec_driver_sql(f"ALTER TABLE {table.name} MODIFY {column_name} {blob_type} {nullable}")
+
+    column = table.c[column_name]
+    pk = list(table.primary_key.columns)
+    statement = table.update().where(*[c == bindparam(f"_pk_{c.key}") for c in pk]).values({column_name: bindparam("_value")})
+    rewritten = 0
+    last_key = None
+    while True:
+        # 按原始字节读取，已经压缩的行不需要改写
+        query = select(*pk, type_coerce(column, LargeBinary)).where(column.is_not(None)).order_by(*pk).limit(batch_size)
+        if last_key is not None:
+            query = query.where(tuple_(*pk) > tuple_(*last_key))
+        rows = conn.execute(query).all()
+        if not rows:
+            break
+        last_key = tuple(rows[-1][:len(pk)])
+        values = []
+        for row in rows:
+            raw = row[-1]
+            if is_compressed(raw):
+                continue
+            value = decompress_text(raw)
+            # 较短的文本不压缩，已经是UTF-8字节的不需要改写
+            if isinstance(raw, bytes) and compress_text(value) == raw:
+                continue
+            # 写入时由CompressedText压缩
+            values.append({**{f"_pk_{c.key}": key for c, key in zip(pk, row[:len(pk)])}, "_value": value})
+        if values:
+            conn.execute(statement, values)
+            rewritten += len(values)
+    logger.info(f"压缩{table.name}.{column_name}: 改写{rewritten}行")
+    return rewritten
+
+
+@migration("0007", "会话消息内容改为压缩存储")
+def _compress_large_text_columns(conn: Connection) -> None:
+    for table in SQLModel.metadata.sorted_tables:
+        for column in table.columns:
+            if isinstance(column.type, CompressedText):
+                compress_text_column(conn, table, column.name)
+
+
+@migration("0008", "为目标名称和状态、问题类型、考试状态和标题添加查询索引")
+def _add_list_filter_indexes(conn: Connection) -> None:
+    create_missing_indexes(conn, ["goal", "question", "exam"])
+
+
+@migration("0009", "会话消息改为session_message表中每条消息一行")
+def _add_session_message(conn: Connection) -> None:
+    # 旧的session.messages在首次读取会话时迁移(SessionDAO._migrate_legacy_messages)
+    SessionMessage.__table__.create(conn, checkfirst=True)
+
+
+def _get_applied_versions(conn: Connection) -> List[str]:
+    """创建迁移记录表(如不存在)并返回已执行的版本"""
+    schema_migration_table.create(conn, checkfirst=True)
+    return list(conn.execute(select(schema_migration_table.c.version)).scalars())
+
+
+def _apply_migration(conn: Connection, item: Migration) -> None:
+    """执行一个迁移并记录版本"""
+    item.upgrade(conn)
+    conn.execute(schema_migration_table.insert().values(
+        version=item.version,
+        description=item.description,
+        applied_at=datetime.now(timezone.utc),
+    ))
+
+
+async def run_migrations() -> List[str]:
+    """
+    执行所有未执行的迁移
+
+    Returns:
+        List[str]: 本次执行的迁移版本列表
+    """
+    engine = get_async_engine()
+    async with engine.begin() as conn:
+        applied_versions = set(await conn.run_sync(_get_applied_versions))
+
+    applied = []
+    for item in MIGRATIONS:
+        if item.version in applied_versions:
+            continue
+        try:
+            # 每个迁移单独一个事务，失败时之前的迁移仍然有效
+            async with engine.begin() as conn:
+                await conn.run_sync(_apply_migration, item)
+            applied.append(item.version)
+            logger.info(f"数据库迁移完成: {item.version} {item.description}")
+        except Exception as e:
+            logger.error(f"数据库迁移失败: {item.version} {item.description}: {e}")
+            raise
+    return applied
+
+
+if __name__ == "__main__":
+    import entity.paper  # noqa: F401 注册所有实体
+    import entity.session  # noqa: F401
+    import entity.exam  # noqa: F401
+
+    async def _main():
+        try:
+            versions = await run_migrations()
+            print(f"执行迁移: {versions or '无'}")
+        finally:
+            await get_async_engine().dispose()
+
+    asyncio.run(_main())
@@ -2,12 +2,14 @@
 试卷数据访问对象 (DAO) - 处理试卷相关的数据库操作 - 异步版本
 """
 
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union, AsyncIterator
+from contextlib import aclosing
 from sqlmodel import select, update, delete
 from sqlalchemy import func
 from dao.base_dao import BaseDao
-from dao.question_dao import question_dao
 from entity.paper import Paper
+from entity.paper_question import PaperQuestion
+from entity.question import Question
 from datetime import datetime
 import logging
 
@@ -18,33 +20,50 @@ class PaperDAO(BaseDao):
     """试卷数据访问对象"""
 
     async def get_by_id(self, paper_id: str) -> Optional[Paper]:
-        """根据ID获取试卷"""
-        return await self._get_by_id(Paper, paper_id)
+        """根据ID获取试卷，包括问题ID列表"""
+        paper = await self._get_by_id(Paper, paper_id)
+        if paper:
+            await self._attach_question_ids(PaperQuestion.paper_id, [paper])
+        return paper
 
-    async def search_by_kwargs(self, kwargs: dict, skip: int = 0, limit: int = 100) -> List[Paper]:
+    async def create(self, model: Paper) -> Paper:
+        """创建试卷，并在同一事务中写入问题列表"""
+        return await self._create_with_question_ids(PaperQuestion.paper_id, model)
+
+    async def update(self, model: Paper, refresh: Optional[bool] = None) -> Paper:
+        """更新试卷，问题列表有修改时一并保存"""
+        return await self._update_with_question_ids(PaperQuestion.paper_id, model, refresh)
+
+    async def search_by_kwargs(self, kwargs: dict, skip: int = 0, limit: int = 100, order_by: Union[str, List[str], None] = None, cursor: Optional[str] = None, fields: Optional[List[str]] = None) -> List[Paper]:
         """根据关键字搜索试卷"""
-        return await self._search_by_kwargs(Paper, kwargs, skip, limit)
+        papers = await self._search_by_kwargs(Paper, kwargs, skip, limit, order_by, cursor, fields)
+        return await self._attach_question_ids(PaperQuestion.paper_id, papers)
+
+    async def update_where(self, kwargs: dict, values: Dict[str, Any]) -> int:
+        """按过滤条件批量更新试卷，返回更新的行数"""
+        return await self._update_where(Paper, kwargs, values)
+
+    async def soft_delete_where(self, kwargs: dict) -> int:
+        """按过滤条件批量软删除试卷，返回删除的行数"""
+        return await self._soft_delete_where(Paper, kwargs)
 
     async def count_by_kwargs(self, kwargs: dict) -> int:
         """根据关键字统计试卷数量"""
         return await self._count_by_kwargs(Paper, kwargs)
 
+    async def stream_by_kwargs(self, kwargs: dict, order_by: Union[str, List[str], None] = None, chunk_size: Optional[int] = None) -> AsyncIterator[List[Paper]]:
+        """流式读取全部匹配的试卷，分块返回，每块一次查询加载问题ID列表"""
+        async with aclosing(self._stream_by_kwargs(Paper, kwargs, order_by, chunk_size)) as chunks:
+            async for papers in chunks:
+                yield await self._attach_question_ids(PaperQuestion.paper_id, papers)
+
     async def get_paper_with_questions(self, paper_id: str) -> Optional[Paper]:
-        """根据ID获取试卷并加载问题列表"""
-        try:
-            paper = await self.get_by_id(paper_id)
-            if paper:
-                # 加载问题列表
-                questions = []
-                for qid in paper.question_ids:
-                    question = await question_dao.get_by_id(qid)
-                    if question:
-                        questions.append(question)
-                paper._questions = questions
-            return paper
-        except Exception as e:
-            logger.error(f"获取试卷及问题失败 (ID: {paper_id}): {e}")
-            raise
+        """根据ID获取试卷，一次关联查询按顺序加载问题列表"""
+        return await self._get_with_questions(Paper, PaperQuestion.paper_id, Question, paper_id)
+
+    async def get_paper_ids_by_question(self, question_id: str) -> List[str]:
+        """获取包含某个问题的试卷ID列表"""
+        return await self._get_ids_by_question(PaperQuestion.paper_id, question_id)
 
 
 # 创建全局DAO实例
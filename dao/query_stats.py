@@ -0,0 +1,122 @@
+"""
+SQL查询统计 - 按请求统计执行的语句数量、数据库耗时和重复执行的语句
+
+同一形状的语句在一个请求中执行多次通常是N+1查询(循环中逐条查询)，
+调试模式下由中间件记录日志并写入响应头；测试中可以用assert_max_queries断言查询次数
+"""
+
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# 展开后的IN参数列表，如 (?, ?, ?) 或 (%s, %s)
+_IN_PARAMS_PATTERN = re.compile(r"\((?:\s*(?:\?|%s|%\(\w+\)s)\s*,)+\s*(?:\?|%s|%\(\w+\)s)\s*\)")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_statement(statement: str) -> str:
+    """语句形状: 合并空白，IN参数个数不同的语句视为同一形状"""
+    statement = _IN_PARAMS_PATTERN.sub("(?)", statement)
+    return _WHITESPACE_PATTERN.sub(" ", statement).strip()
+
+
+class QueryStats:
+    """一段代码(通常是一个请求)执行的SQL语句统计"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.statements: List[str] = []
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, elapsed: float) -> None:
+        """记录一条执行完成的语句"""
+        self.count += 1
+        self.total_time += elapsed
+        self.statements.append(statement)
+        self.shapes[normalize_statement(statement)] += 1
+
+    def get_repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """执行次数达到threshold的语句形状及次数，按次数从多到少"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+    def get_summary(self) -> Dict[str, Any]:
+        """统计摘要"""
+        return {
+            'count': self.count,
+            'total_time_ms': round(self.total_time * 1000, 3),
+            'distinct': len(self.shapes),
+        }
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar('query_stats', default=None)
+# 不区分上下文统计所有语句的收集器，用于测试(TestClient在其他线程中执行请求)
+_global_collectors: List[QueryStats] = []
+
+
+def _get_collectors() -> List[QueryStats]:
+    stats = _current_stats.get()
+    return [stats, *_global_collectors] if stats is not None else _global_collectors
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _get_collectors():
+        context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, '_query_start', None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    for stats in _get_collectors():
+        stats.record(statement, elapsed)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """为引擎注册语句统计的事件，没有进行中的统计时几乎没有开销"""
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """
+    统计当前上下文(请求/任务)中执行的语句
+
+    用法:
+        with track_queries() as stats:
+            await question_dao.get_by_id(id)
+        print(stats.count)
+    """
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+@contextmanager
+def assert_max_queries(max_count: int) -> Iterator[QueryStats]:
+    """
+    测试辅助: 断言代码块中执行的语句不超过max_count条，包括其他线程中执行的语句
+
+    用法:
+        with assert_max_queries(3):
+            client.post("/api/question/batch-create", json=...)
+    """
+    stats = QueryStats()
+    _global_collectors.append(stats)
+    try:
+        yield stats
+    finally:
+        _global_collectors.remove(stats)
+    if stats.count > max_count:
+        statements = "\n".join(f"  {i + 1}. {statement}" for i, statement in enumerate(stats.statements))
+        raise AssertionError(f"执行了{stats.count}条语句，超过{max_count}条:\n{statements}")
@@ -1,23 +1,58 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple, Union, AsyncIterator
+from contextlib import aclosing
 from sqlmodel import select, update
 from entity.question import Question
 from dao.base_dao import BaseDao
+from dao.filter_schema import FilterSchema
 from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
 class QuestionDAO(BaseDao):
+    # 列表接口允许的过滤字段、操作符和排序字段
+    filter_schema = FilterSchema(
+        Question,
+        fields={
+            'subject': ('$eq', '$in'),
+            'type': ('$eq', '$in'),
+            'creator_id': ('$eq', '$in'),
+            'is_active': ('$eq',),
+            'title': ('$match',),
+        },
+    )
+
     async def get_by_id(self, id: str) -> Optional[Question]:
         return await self._get_by_id(Question, id)
 
-    async def search_by_kwargs(self, kwargs: dict, skip: int = 0, limit: int = 100) -> List[Question]:
+    async def get_many(self, ids: List[str], preserve_order: bool = True) -> Tuple[List[Question], List[str]]:
+        """批量获取问题，返回(问题列表, 不存在的ID列表)"""
+        return await self._get_many(Question, ids, preserve_order)
+
+    async def search_by_kwargs(self, kwargs: dict, skip: int = 0, limit: int = 100, order_by: Union[str, List[str], None] = None, cursor: Optional[str] = None, fields: Optional[List[str]] = None) -> List[Question]:
         # 定义需要模糊匹配的字段
-        return await self._search_by_kwargs(Question, kwargs, skip, limit)
+        return await self._search_by_kwargs(Question, kwargs, skip, limit, order_by, cursor, fields)
+
+    async def search_with_total(self, kwargs: dict, skip: int = 0, limit: int = 100, order_by: Union[str, List[str], None] = None, cursor: Optional[str] = None, count_mode: str = 'exact', fields: Optional[List[str]] = None) -> Tuple[List[Question], int]:
+        return await self._search_with_total(Question, kwargs, skip, limit, order_by, cursor, count_mode, fields)
+
+    async def update_where(self, kwargs: dict, values: Dict[str, Any]) -> int:
+        """按过滤条件批量更新问题，返回更新的行数"""
+        return await self._update_where(Question, kwargs, values)
+
+    async def soft_delete_where(self, kwargs: dict) -> int:
+        """按过滤条件批量软删除问题，返回删除的行数"""
+        return await self._soft_delete_where(Question, kwargs)
 
     async def count_by_kwargs(self, kwargs: dict) -> int:
         # 定义需要模糊匹配的字段
         return await self._count_by_kwargs(Question, kwargs)
 
+    async def stream_by_kwargs(self, kwargs: dict, order_by: Union[str, List[str], None] = None, chunk_size: Optional[int] = None) -> AsyncIterator[List[Question]]:
+        """流式读取全部匹配的问题，分块返回"""
+        async with aclosing(self._stream_by_kwargs(Question, kwargs, order_by, chunk_size)) as chunks:
+            async for questions in chunks:
+                yield questions
+
 # 全局DAO实例
 question_dao = QuestionDAO()
\ No newline at end of file
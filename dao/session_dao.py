@@ -2,37 +2,115 @@
 会话数据访问对象 - 提供会话相关的数据库操作 - 异步版本
 """
 
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union, AsyncIterator
+from contextlib import aclosing
+from collections import defaultdict
 from sqlmodel import select, update, delete
-from datetime import datetime
+from sqlalchemy import func, DateTime, inspect as sa_inspect
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timedelta, timezone
 from entity.session import Session, TopicType
+from entity.session_message import SessionMessage
+from entity.session_archive import SessionArchive
 from entity.message import Message, MessageRole, MessageType
 from dao.base_dao import BaseDao
 from dao.question_dao import question_dao
 from dao.goal_dao import goal_dao
 import json
+import logging
 from entity.message import create_message
+from config.settings import settings
+from utils.compression import compress_json, decompress_json
+
+logger = logging.getLogger(__name__)
+
+
+def _dump_row(model) -> Dict[str, Any]:
+    """实体的所有列 -> 字典，用于归档"""
+    return {column.key: getattr(model, column.key) for column in model.__table__.columns}
+
+
+def _load_row(Clazz, data: Dict[str, Any]):
+    """从归档的字典创建实体，时间和枚举列转换回原类型"""
+    values = {}
+    for column in Clazz.__table__.columns:
+        if column.key not in data:
+            continue
+        value = data[column.key]
+        if value is not None:
+            enum_class = getattr(column.type, 'enum_class', None)
+            if enum_class is not None:
+                value = enum_class(value)
+            elif isinstance(column.type, DateTime):
+                value = datetime.fromisoformat(value)
+        values[column.key] = value
+    return Clazz(**values)
+
 
 class SessionDAO(BaseDao):
     """会话数据访问对象"""
 
-    async def get_by_id(self, id: str) -> Session:
+    # 并发追加消息导致序号冲突时的重试次数
+    APPEND_RETRY_TIMES = 5
+
+    async def get_by_id(self, id: str, message_window: Optional[int] = None) -> Session:
         """
-        根据ID获取会话
+        根据ID获取会话，已归档的会话自动恢复
 
         Args:
             id: 会话ID
+            message_window: 只加载最后n条消息，None表示加载全部消息
 
         Returns:
             会话对象
         """
-        session = await self._get_by_id(Session, id)
-        # # 手动初始化 pydantic private attr
-        # if session.__pydantic_private__ is None:
-        #     session.__pydantic_private__ = type(session)().__pydantic_private__
+        session = await self._get_session(id)
+        if session:
+            await self._load_messages(session, message_window)
         return session
 
-    async def search_by_kwargs(self, kwargs: dict, skip: int = 0, limit: int = 100) -> List[Session]:
+    async def create(self, model: Session) -> Session:
+        """创建会话，并在同一事务中写入会话已有的消息"""
+        try:
+            pending_messages = model.get_pending_messages()
+            async with self._session_scope() as db_session:
+                db_session.add(model)
+                db_session.add_all([
+                    SessionMessage.from_message(model.id, seq, message)
+                    for seq, message in enumerate(pending_messages, start=1)
+                ])
+                await self._commit(db_session)
+                await db_session.refresh(model)
+            model.mark_messages_saved()
+            return model
+        except Exception as e:
+            logger.error(f"创建Session失败: {e}")
+            raise
+
+    async def update(self, model: Session, refresh: Optional[bool] = None) -> Session:
+        """
+        更新会话，新消息以追加方式写入，不再改写整个消息列表
+
+        有新消息时，消息和会话有改动的字段在同一个事务中写入，会话行只更新一次
+
+        Args:
+            model: 要更新的会话
+            refresh: 同BaseDao.update
+        """
+        pending_messages = model.get_pending_messages()
+        if not pending_messages:
+            return await super().update(model, refresh)
+        if refresh is None:
+            refresh = sa_inspect(model).transient
+        values = self._get_dirty_values(model)
+        model.updated_at = datetime.now(timezone.utc)
+        values['updated_at'] = model.updated_at
+        await self.append_messages(model.id, pending_messages, values)
+        model.mark_messages_saved()
+        self._mark_clean(model, values)
+        return await self.get_by_id(model.id) if refresh else model
+
+    async def search_by_kwargs(self, kwargs: dict, skip: int = 0, limit: int = 100, order_by: Union[str, List[str], None] = None, cursor: Optional[str] = None, fields: Optional[List[str]] = None) -> List[Session]:
         """
         根据关键字搜索会话
 
@@ -44,7 +122,7 @@ class SessionDAO(BaseDao):
         Returns:
             会话列表
         """
-        return await self._search_by_kwargs(Session, kwargs, skip, limit)
+        return await self._search_by_kwargs(Session, kwargs, skip, limit, order_by, cursor, fields)
 
     async def count_by_kwargs(self, kwargs: dict) -> int:
         """
@@ -58,6 +136,12 @@ class SessionDAO(BaseDao):
         """
         return await self._count_by_kwargs(Session, kwargs)
 
+    async def stream_by_kwargs(self, kwargs: dict, order_by: Union[str, List[str], None] = None, chunk_size: Optional[int] = None) -> AsyncIterator[List[Session]]:
+        """流式读取全部匹配的会话(不加载消息)，分块返回"""
+        async with aclosing(self._stream_by_kwargs(Session, kwargs, order_by, chunk_size)) as chunks:
+            async for sessions in chunks:
+                yield sessions
+
     async def get_full_by_id(self, id: str) -> Session:
         """
         根据ID获取会话
@@ -70,7 +154,114 @@ class SessionDAO(BaseDao):
         return session
             
 
-    async def add_message(self, session_id: str, message: Message) -> Optional[Session]:
+    async def append_messages(self, session_id: str, messages: List[Message], values: Optional[Dict[str, Any]] = None) -> List[SessionMessage]:
+        """
+        向会话追加消息，只插入新行，写入代价与会话历史长度无关
+
+        Args:
+            session_id: 会话ID
+            messages: 要追加的消息列表
+            values: 同一事务中写入会话行的其他字段，默认只更新最后活动时间
+
+        Returns:
+            写入的消息行列表
+        """
+        if not messages:
+            return []
+        for attempt in range(1, self.APPEND_RETRY_TIMES + 1):
+            try:
+                # 工作单元中使用保存点，序号冲突时只回滚本次追加
+                async with self._session_scope(savepoint=True) as db_session:
+                    # 加锁读取最新的序号，工作单元的事务中普通读取可能读到事务开始时的快照
+                    statement = (
+                        select(func.max(SessionMessage.seq))
+                        .where(SessionMessage.session_id == session_id)
+                        .with_for_update()
+                    )
+                    last_seq = (await db_session.execute(statement)).scalar() or 0
+                    rows = [
+                        SessionMessage.from_message(session_id, seq, message)
+                        for seq, message in enumerate(messages, start=last_seq + 1)
+                    ]
+                    db_session.add_all(rows)
+                    # 更新最后活动时间，归档按它判断会话是否空闲
+                    await db_session.execute(
+                        update(Session).where(Session.id == session_id).values({'updated_at': datetime.now(timezone.utc), **(values or {})})
+                    )
+                    await self._commit(db_session)
+                self._invalidate_cache(Session, [session_id])
+                return rows
+            except IntegrityError as e:
+                # (session_id, seq)唯一约束冲突说明有并发追加，重新读取最大序号后重试
+                if attempt == self.APPEND_RETRY_TIMES:
+                    logger.error(f"追加会话消息失败 (session_id: {session_id}): {e}")
+                    raise
+                logger.warning(f"追加会话消息序号冲突，第{attempt}次重试 (session_id: {session_id})")
+            except Exception as e:
+                logger.error(f"追加会话消息失败 (session_id: {session_id}): {e}")
+                raise
+
+    async def get_messages(self, session_id: str, last_n: Optional[int] = None) -> List[Message]:
+        """
+        按顺序读取会话消息
+
+        Args:
+            session_id: 会话ID
+            last_n: 只读取最后n条消息，None表示读取全部
+        """
+        try:
+            async with self._session_scope(read_only=True) as db_session:
+                statement = (
+                    select(SessionMessage)
+                    .where(SessionMessage.session_id == session_id)
+                    .order_by(SessionMessage.seq.desc())
+                )
+                if last_n is not None:
+                    statement = statement.limit(last_n)
+                result = await db_session.execute(statement)
+                rows = result.scalars().all()
+                return [row.to_message() for row in reversed(rows)]
+        except Exception as e:
+            logger.error(f"读取会话消息失败 (session_id: {session_id}): {e}")
+            raise
+
+    async def count_messages(self, session_id: str) -> int:
+        """统计会话消息数量"""
+        async with self._session_scope(read_only=True) as db_session:
+            statement = select(func.count()).select_from(SessionMessage).where(SessionMessage.session_id == session_id)
+            result = await db_session.execute(statement)
+            return result.scalar()
+
+    async def _load_messages(self, session: Session, message_window: Optional[int] = None) -> None:
+        """加载会话消息窗口，旧数据在首次读取时迁移到session_message表"""
+        messages = await self.get_messages(session.id, message_window)
+        if not messages and session.messages:
+            messages = session.get_legacy_messages()
+            await self._migrate_legacy_messages(session, messages)
+            if message_window is not None:
+                messages = messages[-message_window:] if message_window > 0 else []
+        session.set_loaded_messages(messages)
+
+    async def _migrate_legacy_messages(self, session: Session, messages: List[Message]) -> None:
+        """把旧版本messages字段中的消息写入session_message表，并清空旧字段"""
+        try:
+            async with self._session_scope(savepoint=True) as db_session:
+                db_session.add_all([
+                    SessionMessage.from_message(session.id, seq, message)
+                    for seq, message in enumerate(messages, start=1)
+                ])
+                await db_session.execute(
+                    update(Session).where(Session.id == session.id).values(messages=None)
+                )
+                await self._commit(db_session)
+            session.messages = None
+        except IntegrityError:
+            # 并发请求已经完成了迁移
+            logger.info(f"会话消息已迁移 (session_id: {session.id})")
+        finally:
+            self._invalidate_cache(Session, [session.id])
+
+    async def add_message(self, session_id: str, message: Message) -> Optional[Message]:
         """
         向会话添加消息
 
@@ -79,23 +270,141 @@ class SessionDAO(BaseDao):
             message: 要添加的消息
 
         Returns:
-            更新后的会话对象，如果会话不存在则返回None
+            添加的消息，如果会话不存在则返回None
         """
-        session = await self.get_by_id(session_id)
+        session = await self._get_session(session_id)
         if not session:
             return None
+        if session.messages:
+            # 旧数据需要先迁移，保证新消息排在历史消息之后
+            await self._load_messages(session)
+        await self.append_messages(session_id, [message])
+        return message
+
+    async def _get_session(self, id: str) -> Optional[Session]:
+        """根据ID获取会话(不加载消息)，不在会话表中时从归档恢复"""
+        session = await self._get_by_id(Session, id)
+        if session is None:
+            session = await self._restore_archived(id)
+        return session
+
+    def get_archive_policy(self) -> Dict[TopicType, timedelta]:
+        """各主题的会话保留时间: 最后活动时间早于该时间的会话会被归档，闲聊会话保留时间较短"""
+        return {
+            topic: timedelta(days=settings.SESSION_ARCHIVE_GOSSIP_AFTER_DAYS if topic == TopicType.GOSSIP else settings.SESSION_ARCHIVE_AFTER_DAYS)
+            for topic in TopicType
+        }
+
+    async def archive_idle_sessions(self, now: Optional[datetime] = None, batch_size: Optional[int] = None) -> int:
+        """
+        归档空闲的会话: 按各主题的保留时间，把会话和消息压缩后写入session_archive表，并从会话表和消息表删除，
+        会话表只保留近期活动的数据
+
+        Args:
+            now: 当前时间，默认为现在
+            batch_size: 每个事务最多归档的会话数，默认为SESSION_ARCHIVE_BATCH_SIZE
+
+        Returns:
+            int: 归档的会话数量
+        """
+        now = now or datetime.now(timezone.utc)
+        batch_size = batch_size or settings.SESSION_ARCHIVE_BATCH_SIZE
+        total = 0
+        for topic, retention in self.get_archive_policy().items():
+            while True:
+                count = await self._archive_batch(topic, now - retention, batch_size)
+                total += count
+                if count < batch_size:
+                    break
+        if total:
+            logger.info(f"归档会话: {total}个")
+        return total
+
+    async def _archive_batch(self, topic: TopicType, cutoff: datetime, batch_size: int) -> int:
+        """在一个事务中归档最多batch_size个最后活动时间早于cutoff的会话"""
+        try:
+            async with self._session_scope() as db_session:
+                # 多个进程同时归档时跳过其他进程已锁定的会话
+                statement = (
+                    select(Session)
+                    .where(Session.topic == topic, Session.updated_at < cutoff)
+                    .order_by(Session.updated_at)
+                    .limit(batch_size)
+                    .with_for_update(skip_locked=True)
+                )
+                sessions = (await db_session.execute(statement)).scalars().all()
+                if not sessions:
+                    return 0
+                ids = [session.id for session in sessions]
+
+                statement = (
+                    select(SessionMessage)
+                    .where(SessionMessage.session_id.in_(ids))
+                    .order_by(SessionMessage.session_id, SessionMessage.seq)
+                )
+                messages = defaultdict(list)
+                for row in (await db_session.execute(statement)).scalars():
+                    messages[row.session_id].append(_dump_row(row))
+
+                archived_at = datetime.now(timezone.utc)
+                db_session.add_all([
+                    SessionArchive(
+                        id=session.id,
+                        topic=TopicType(session.topic).value,
+                        question_id=session.question_id,
+                        message_count=len(messages[session.id]),
+                        payload=compress_json({'session': _dump_row(session), 'messages': messages[session.id]}),
+                        created_at=session.created_at,
+                        updated_at=session.updated_at,
+                        archived_at=archived_at,
+                    )
+                    for session in sessions
+                ])
+                await db_session.execute(delete(SessionMessage).where(SessionMessage.session_id.in_(ids)))
+                await db_session.execute(delete(Session).where(Session.id.in_(ids)))
+                await self._commit(db_session)
+            self._invalidate_cache(Session, ids)
+            return len(ids)
+        except Exception as e:
+            logger.error(f"归档会话失败 (topic: {topic}): {e}")
+            raise
+
+    async def _restore_archived(self, id: str) -> Optional[Session]:
+        """把归档的会话和消息写回会话表和消息表，并删除归档行；会话没有归档时返回None"""
+        # 先用只读查询判断是否归档，不存在的会话不需要获取写锁；归档在主库完成，只读库可能还没有同步
+        async with self._session_scope(read_only=True, primary=True) as db_session:
+            statement = select(SessionArchive.id).where(SessionArchive.id == id)
+            if (await db_session.execute(statement)).first() is None:
+                return None
+        try:
+            session = None
+            async with self._session_scope(savepoint=True) as db_session:
+                archive = await db_session.get(SessionArchive, id, with_for_update=True)
+                if archive is not None:
+                    data = decompress_json(archive.payload)
+                    session = _load_row(Session, data['session'])
+                    # 恢复后重新计算空闲时间，避免下一次归档任务立即再次归档
+                    session.updated_at = datetime.now(timezone.utc)
+                    db_session.add(session)
+                    await db_session.flush()
+                    db_session.add_all([_load_row(SessionMessage, row) for row in data['messages']])
+                    await db_session.delete(archive)
+                    await self._commit(db_session)
+                    await db_session.refresh(session)
+            if session is not None:
+                self._invalidate_cache(Session, [id])
+                logger.info(f"恢复归档会话 (session_id: {id}, 消息: {len(data['messages'])}条)")
+                return session
+        except IntegrityError:
+            pass
+        except Exception as e:
+            logger.error(f"恢复归档会话失败 (session_id: {id}): {e}")
+            raise
+        # 并发请求已经恢复了该会话
+        logger.info(f"归档会话已被其他请求恢复 (session_id: {id})")
+        return await self._load_by_id(Session, id, primary=True)
 
-        # 获取现有消息列表
-        messages_list = session.get_messages_list()
-        
-        # 添加新消息
-        messages_list.append(message.to_dict())
-        
-        # 更新会话
-        session.messages = json.dumps(messages_list, ensure_ascii=False)
-        return await self.update(session)
-
-    async def add_user_message(self, session_id: str, message_content: str) -> Optional[Session]:
+    async def add_user_message(self, session_id: str, message_content: str) -> Optional[Message]:
         """
         向会话添加用户消息
         """
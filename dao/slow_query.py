@@ -0,0 +1,179 @@
+"""
+慢查询日志 - 记录执行时间超过阈值的DAO查询，并异步获取执行计划(EXPLAIN)
+
+记录保存在进程内固定大小的环形缓冲区中，只保留最近的记录，可通过诊断接口查看
+"""
+
+import asyncio
+import itertools
+import logging
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional, Set
+from sqlalchemy.ext.asyncio import AsyncEngine
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# 参数名包含这些词时不记录参数值
+SENSITIVE_NAMES = ('password', 'phone', 'token', 'secret')
+# 记录的字符串参数值最大长度
+MAX_VALUE_LENGTH = 64
+# 各数据库获取执行计划的语句前缀，不支持的数据库不获取
+EXPLAIN_PREFIXES = {
+    'mysql': 'EXPLAIN ',
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'postgresql': 'EXPLAIN ',
+}
+
+_current_endpoint: ContextVar[Optional[str]] = ContextVar('current_endpoint', default=None)
+
+
+def set_current_endpoint(endpoint: Optional[str]):
+    """设置当前请求的接口，返回用于恢复的token"""
+    return _current_endpoint.set(endpoint)
+
+
+def reset_current_endpoint(token) -> None:
+    _current_endpoint.reset(token)
+
+
+def redact_value(name: str, value: Any) -> Any:
+    """隐藏敏感参数值，截断过长的字符串"""
+    if any(word in str(name).lower() for word in SENSITIVE_NAMES):
+        return '***'
+    if isinstance(value, dict):
+        return {key: redact_value(f"{name}.{key}", item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact_value(name, item) for item in value]
+    if isinstance(value, (bytes, bytearray)):
+        return f"<{len(value)} bytes>"
+    if isinstance(value, str) and len(value) > MAX_VALUE_LENGTH:
+        return value[:MAX_VALUE_LENGTH] + '...'
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+def redact_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    """隐藏参数字典中的敏感值"""
+    return {name: redact_value(name, value) for name, value in params.items()}
+
+
+class SlowQueryLog:
+    """
+    慢查询环形缓冲区
+
+    - record检查耗时，超过阈值时记录SQL、脱敏后的参数、耗时和调用的接口
+    - 开启explain时在后台任务中用另一个连接获取执行计划，不阻塞当前请求；
+      同一条SQL正在获取执行计划时不重复获取，获取完成后写入所有等待的记录
+    """
+
+    def __init__(self, max_size: int = 200, threshold_ms: float = 500, explain: bool = True, enabled: bool = True):
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self.enabled = enabled
+        self._records: Deque[Dict[str, Any]] = deque(maxlen=max_size)
+        self._ids = itertools.count(1)
+        # 正在获取执行计划的SQL -> 等待写入执行计划的记录
+        self._explaining: Dict[str, List[Dict[str, Any]]] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def record(self, engine: AsyncEngine, statement: Any, elapsed: float, operation: str, filters: Optional[dict] = None) -> Optional[Dict[str, Any]]:
+        """
+        记录一次查询，没有超过阈值时什么也不做
+
+        Args:
+            engine: 执行查询的引擎，用于编译SQL和获取执行计划
+            statement: 执行的SQLAlchemy语句
+            elapsed: 耗时(秒)
+            operation: 操作名，如 Question.search_by_kwargs
+            filters: 查询使用的过滤条件字典
+
+        Returns:
+            记录的慢查询，没有记录时返回None
+        """
+        duration_ms = elapsed * 1000
+        if not self.enabled or duration_ms < self.threshold_ms:
+            return None
+        try:
+            compiled = statement.compile(dialect=engine.dialect, compile_kwargs={"render_postcompile": True})
+            sql = str(compiled)
+            params = dict(compiled.params)
+        except Exception as e:
+            logger.warning(f"慢查询SQL编译失败: {e}")
+            return None
+
+        entry = {
+            'id': next(self._ids),
+            'time': datetime.now(timezone.utc).isoformat(),
+            'operation': operation,
+            'endpoint': _current_endpoint.get(),
+            'duration_ms': round(duration_ms, 3),
+            'filters': redact_params(filters) if filters else None,
+            'sql': sql,
+            'params': redact_params(params),
+            'explain': None,
+        }
+        self._records.append(entry)
+        logger.warning(f"慢查询 {operation} 耗时{entry['duration_ms']}ms (接口: {entry['endpoint']}): {sql}")
+
+        if self.explain and engine.dialect.name in EXPLAIN_PREFIXES:
+            if sql in self._explaining:
+                self._explaining[sql].append(entry)
+                return entry
+            driver_params = [params[name] for name in compiled.positiontup] if compiled.positional else params
+            self._explaining[sql] = [entry]
+            task = asyncio.get_running_loop().create_task(self._capture_explain(engine, sql, driver_params))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return entry
+
+    async def _capture_explain(self, engine: AsyncEngine, sql: str, params: Any) -> None:
+        """用新的连接获取执行计划，写入等待的记录的explain字段"""
+        explain: Any = None
+        try:
+            async with engine.connect() as conn:
+                prefix = EXPLAIN_PREFIXES[engine.dialect.name]
+                result = await conn.exec_driver_sql(prefix + sql, tuple(params) if isinstance(params, list) else params)
+                explain = [dict(row._mapping) for row in result.all()]
+        except Exception as e:
+            logger.warning(f"获取慢查询执行计划失败: {e}")
+            explain = {'error': str(e)}
+        finally:
+            for entry in self._explaining.pop(sql, []):
+                entry['explain'] = explain
+
+    async def wait_explains(self) -> None:
+        """等待进行中的执行计划获取完成"""
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def get_records(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """获取最近的慢查询记录，最新的在前"""
+        records = list(reversed(self._records))
+        return records[:limit] if limit is not None else records
+
+    def clear(self) -> None:
+        """清空记录"""
+        self._records.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取慢查询日志配置和记录数"""
+        return {
+            'enabled': self.enabled,
+            'threshold_ms': self.threshold_ms,
+            'explain': self.explain,
+            'size': len(self._records),
+            'max_size': self._records.maxlen,
+        }
+
+
+# 创建全局慢查询日志实例，所有DAO共享
+slow_query_log = SlowQueryLog(
+    max_size=settings.SLOW_QUERY_LOG_SIZE,
+    threshold_ms=settings.SLOW_QUERY_THRESHOLD_MS,
+    explain=settings.SLOW_QUERY_EXPLAIN,
+    enabled=settings.SLOW_QUERY_LOG_ENABLED,
+)
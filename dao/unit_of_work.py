@@ -0,0 +1,154 @@
+"""
+工作单元 - 一个请求内的DAO操作共用一个数据库会话和事务
+
+在工作单元中，DAO方法加入当前会话，写操作只flush，由工作单元在结束时统一提交；
+不在工作单元中时(脚本、后台任务等)，DAO方法仍然各自打开会话并立即提交。
+
+配置了只读库时，只读查询使用只读库；同一个请求(或任务)中发生写操作之后，
+后续的读取都改为使用主库，保证读到自己写入的数据
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Iterable, Optional, Set, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from dao.database import get_async_session_maker
+from dao.cache import entity_cache
+
+logger = logging.getLogger(__name__)
+
+
+class UnitOfWork:
+    """一个工作单元，持有共用的数据库会话"""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        # 只读库的会话，第一次只读查询时创建，整个工作单元使用同一个只读库
+        self._read_session: Optional[AsyncSession] = None
+        # 事务中写过的实体，结束时(提交或回滚)统一使缓存失效
+        self._touched: Set[Tuple[type, str]] = set()
+        # SQLite部署时持有的写锁，第一次写操作时获取，事务结束时释放
+        self._write_lock: Optional[asyncio.Lock] = None
+
+    def touch(self, Clazz: type, ids: Iterable[str]) -> None:
+        """记录事务中写过的实体"""
+        self._touched.update((Clazz, id) for id in ids)
+
+    def _invalidate_touched(self) -> None:
+        """
+        事务进行中其他请求可能把旧数据读入缓存，本事务也可能读入未提交的数据，
+        事务结束后再使一次缓存失效
+        """
+        for Clazz, id in self._touched:
+            entity_cache.invalidate(Clazz, [id])
+        self._touched.clear()
+
+    async def acquire_write_lock(self, write_lock: asyncio.Lock) -> None:
+        """获取写锁并持有到事务结束，已持有时直接返回"""
+        if self._write_lock is None:
+            await write_lock.acquire()
+            self._write_lock = write_lock
+
+    def _release_write_lock(self) -> None:
+        if self._write_lock is not None:
+            self._write_lock.release()
+            self._write_lock = None
+
+    def get_read_session(self, read_session_maker: async_sessionmaker) -> AsyncSession:
+        """获取只读库的会话"""
+        if self._read_session is None:
+            self._read_session = read_session_maker()
+        return self._read_session
+
+    async def _close_read_session(self) -> None:
+        if self._read_session is not None:
+            await self._read_session.close()
+            self._read_session = None
+
+    async def commit(self) -> None:
+        """提交当前事务并归还数据库连接，之后的操作会重新获取连接、开始新事务"""
+        try:
+            await self.session.commit()
+        finally:
+            self._release_write_lock()
+            self._invalidate_touched()
+            await self._close_read_session()
+
+    async def rollback(self) -> None:
+        """回滚当前事务"""
+        try:
+            await self.session.rollback()
+        finally:
+            self._release_write_lock()
+            self._invalidate_touched()
+            await self._close_read_session()
+
+
+_current_unit_of_work: ContextVar[Optional[UnitOfWork]] = ContextVar('unit_of_work', default=None)
+# 当前请求(或任务)中是否发生过写操作，之后的读取使用主库
+_has_written: ContextVar[bool] = ContextVar('has_written', default=False)
+
+
+def mark_written() -> None:
+    """记录发生了写操作"""
+    _has_written.set(True)
+
+
+def should_read_primary() -> bool:
+    """当前请求(或任务)中发生过写操作时，只读查询也使用主库"""
+    return _has_written.get()
+
+
+def get_current_unit_of_work() -> Optional[UnitOfWork]:
+    """获取当前的工作单元，不在工作单元中时返回None"""
+    return _current_unit_of_work.get()
+
+
+@asynccontextmanager
+async def unit_of_work() -> AsyncIterator[UnitOfWork]:
+    """
+    开启工作单元，正常退出时提交，抛出异常时回滚
+
+    已在工作单元中时加入外层的工作单元，由外层负责提交
+
+    用法:
+        async with unit_of_work():
+            question = await question_dao.get_by_id(id)
+            await session_dao.create(session)
+    """
+    current = _current_unit_of_work.get()
+    if current is not None:
+        yield current
+        return
+
+    session_maker = await get_async_session_maker()
+    async with session_maker() as session:
+        uow = UnitOfWork(session)
+        token = _current_unit_of_work.set(uow)
+        try:
+            yield uow
+            await uow.commit()
+        except BaseException:
+            await uow.rollback()
+            raise
+        finally:
+            _current_unit_of_work.reset(token)
+
+
+async def request_unit_of_work() -> AsyncIterator[UnitOfWork]:
+    """FastAPI依赖: 整个请求使用一个工作单元，在返回响应前提交"""
+    async with unit_of_work() as uow:
+        yield uow
+
+
+async def release_connection() -> None:
+    """
+    提前提交当前工作单元的事务并归还连接
+
+    在调用大模型等耗时操作前使用，避免长时间占用连接池中的连接；不在工作单元中时什么也不做
+    """
+    uow = _current_unit_of_work.get()
+    if uow is not None:
+        await uow.commit()
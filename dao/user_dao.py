@@ -4,7 +4,8 @@
 
 import logging
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union, AsyncIterator, Tuple
+from contextlib import aclosing
 from sqlmodel import select, update, delete
 from dao.base_dao import BaseDao
 from entity.user import User
@@ -18,18 +19,27 @@ class UserDAO(BaseDao):
         """根据ID获取用户"""
         return await self._get_by_id(User, user_id)
 
-    async def search_by_kwargs(self, kwargs: dict, skip: int = 0, limit: int = 100) -> List[User]:
+    async def get_many(self, user_ids: List[str], preserve_order: bool = True) -> Tuple[List[User], List[str]]:
+        """批量获取用户，返回(用户列表, 不存在的ID列表)"""
+        return await self._get_many(User, user_ids, preserve_order)
+
+    async def search_by_kwargs(self, kwargs: dict, skip: int = 0, limit: int = 100, order_by: Union[str, List[str], None] = None, cursor: Optional[str] = None, fields: Optional[List[str]] = None) -> List[User]:
         """搜索用户"""
-        return await self._search_by_kwargs(User, kwargs, skip, limit)
+        return await self._search_by_kwargs(User, kwargs, skip, limit, order_by, cursor, fields)
 
     async def count_by_kwargs(self, kwargs: dict) -> int:
         return await self._count_by_kwargs(User, kwargs)
 
+    async def stream_by_kwargs(self, kwargs: dict, order_by: Union[str, List[str], None] = None, chunk_size: Optional[int] = None) -> AsyncIterator[List[User]]:
+        """流式读取全部匹配的用户，分块返回"""
+        async with aclosing(self._stream_by_kwargs(User, kwargs, order_by, chunk_size)) as chunks:
+            async for users in chunks:
+                yield users
+
     async def get_by_name(self, name: str) -> Optional[User]:
         """根据用户名获取用户"""
         try:
-            session_maker = await self._get_session_maker()
-            async with session_maker() as session:
+            async with self._session_scope(read_only=True) as session:
                 statement = select(User).where(User.name == name, User.is_deleted == False)
                 result = await session.execute(statement)
                 return result.scalar_one_or_none()
@@ -40,8 +50,7 @@ class UserDAO(BaseDao):
     async def get_by_phone(self, phone: str) -> Optional[User]:
         """根据手机号获取用户"""
         try:
-            session_maker = await self._get_session_maker()
-            async with session_maker() as session:
+            async with self._session_scope(read_only=True) as session:
                 statement = select(User).where(User.phone == phone, User.is_deleted == False)
                 result = await session.execute(statement)
                 return result.scalar_one_or_none()
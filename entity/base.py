@@ -2,14 +2,31 @@
 抽象类 - 定义基础模型
 """
 
+from typing import List, Set
+from sqlalchemy import event, inspect as sa_inspect
 from sqlmodel import SQLModel, Field
 from datetime import datetime
 import uuid
 
 class BaseModel(SQLModel):
+    # 列表查询默认不加载的大字段，子类按需声明
+    __list_deferred_columns__ = ()
+
     def to_dict(self) -> dict:
         """转换为字典格式"""
-        return self.dict()
+        return self.dict(exclude=self.get_unloaded_fields())
+
+    @classmethod
+    def get_list_fields(cls) -> List[str]:
+        """列表查询默认加载的字段: 除__list_deferred_columns__以外的所有列"""
+        return [attr.key for attr in sa_inspect(cls).column_attrs if attr.key not in cls.__list_deferred_columns__]
+
+    def get_unloaded_fields(self) -> Set[str]:
+        """按字段投影查询时没有从数据库加载的字段，访问这些字段会出错"""
+        state = sa_inspect(self, raiseerr=False)
+        if state is None or state.transient or state.pending:
+            return set()
+        return set(state.unloaded)
 
     @classmethod
     def from_dict(cls, data: dict) -> 'BaseModel':
@@ -23,4 +40,11 @@ class BaseModel(SQLModel):
 
     def __repr__(self) -> str:
         """详细字符串表示"""
-        return self.__str__()
\ No newline at end of file
+        return self.__str__()
+
+
+@event.listens_for(BaseModel, "load", propagate=True)
+def _init_private_attributes(target, context):
+    """ORM从数据库加载的实例不经过__init__，需要手动初始化pydantic私有属性"""
+    if target.__pydantic_private__ is None:
+        target.model_post_init(None)
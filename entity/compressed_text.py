@@ -0,0 +1,44 @@
+"""
+压缩文本列类型 - 大文本列在数据库中压缩存储，读写实体时自动解压和压缩
+
+用法:
+    content: str = Field(..., sa_type=CompressedText)
+
+数据库中为二进制列(MySQL为MEDIUMBLOB)，格式见utils.compression.compress_text:
+较短的文本只编码为UTF-8，较长的文本加2字节头后用zlib压缩。
+实体中仍然是str，业务代码不需要修改；改为压缩存储的已有列通过迁移改写。
+压缩后的列不能在SQL中按内容过滤或建全文索引；
+每次修改都要重新压缩整个值，适合写入后不再修改的列，不适合在末尾追加内容的列
+"""
+
+from typing import Any, Optional
+from sqlalchemy import LargeBinary
+from sqlalchemy.types import TypeDecorator
+from utils.compression import compress_text, decompress_text
+
+# MySQL MEDIUMBLOB的最大长度，与MEDIUMTEXT相同
+MEDIUM_BLOB_LENGTH = 16777215
+
+
+class CompressedText(TypeDecorator):
+    """压缩存储的文本列"""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def __init__(self, length: int = MEDIUM_BLOB_LENGTH):
+        super().__init__(length=length)
+
+    @property
+    def python_type(self) -> type:
+        return str
+
+    def process_bind_param(self, value: Optional[str], dialect: Any) -> Optional[bytes]:
+        if value is None:
+            return None
+        return compress_text(value)
+
+    def process_result_value(self, value: Optional[bytes], dialect: Any) -> Optional[str]:
+        if value is None:
+            return None
+        return decompress_text(value)
@@ -7,11 +7,14 @@ from enum import Enum
 from datetime import datetime, timezone
 from typing import Optional, List
 from sqlmodel import Field, Relationship
+from sqlalchemy import Index
 from pydantic import PrivateAttr
 from entity.base import BaseModel
 from entity.message import Message
 from entity.question import Question
-from utils.helpers import random_uuid
+from entity.exam_question import ExamQuestion  # 注册exam_question关联表
+from entity.exam_answer import ExamAnswer
+from utils.helpers import time_ordered_id
 from entity.answer import Answer
 from utils.transformer import iso_to_mysql_datetime, mysql_datetime_to_iso
 
@@ -25,8 +28,19 @@ class ExamStatus(str, Enum):
 class Exam(BaseModel, table=True):
     """考试实体类"""
 
+    # 索引与列表查询条件对应：按参考人、按目标、按状态筛选未删除的考试，并按计划开始时间排序；按标题查找
+    __table_args__ = (
+        Index("ix_exam_examinee_deleted_plan", "examinee_id", "is_deleted", "plan_starttime"),
+        Index("ix_exam_goal_deleted_plan", "goal_id", "is_deleted", "plan_starttime"),
+        Index("ix_exam_status_deleted_plan", "status", "is_deleted", "plan_starttime"),
+        Index("ix_exam_title_deleted", "title", "is_deleted"),
+        Index("ix_exam_deleted_plan", "is_deleted", "plan_starttime"),
+    )
+    # 答卷可能包含整套答案和对话记录，列表查询默认不加载
+    __list_deferred_columns__ = ("answer_json",)
+
     # 基本信息
-    id: Optional[str] = Field(default_factory=lambda: random_uuid(), primary_key=True, description="试卷唯一标识")
+    id: Optional[str] = Field(default_factory=time_ordered_id, primary_key=True, description="试卷唯一标识")
 
     # 试卷ID列表
     goal_id: str = Field(..., description="试卷ID", foreign_key="goal.id")
@@ -37,16 +51,22 @@ class Exam(BaseModel, table=True):
     # 参考人
     examinee_id: str = Field(..., description="参考人ID")
 
-    # 问题列表
-    question_ids: str = Field(default='', description="问题ID列表,以逗号分割")
-    # 声明一个私有实例属性，不被 ORM、验证、导出影响，不被当成数据库字段处理
+    # 问题列表，按顺序存储在exam_question表，由DAO加载与保存
+    # 声明私有实例属性，不被 ORM、验证、导出影响，不被当成数据库字段处理
+    _question_ids: List[str] = PrivateAttr(default_factory=list)
+    _question_ids_changed: bool = PrivateAttr(default=False)
     _questions: List[Question] = PrivateAttr(default_factory=list)
 
     # 状态
     status: ExamStatus = Field(default=ExamStatus.pending, description="状态")
 
-    # 答卷
-    answer_json: str | None = Field(default=None, description="答卷json")
+    # 每个问题的答案存储在exam_answer表，由DAO加载与保存
+    _answers: List[ExamAnswer] = PrivateAttr(default_factory=list)
+
+    # 答卷json，仅兼容旧数据，新答卷存储在exam_answer表
+    answer_json: str | None = Field(default=None, description="答卷json(已废弃)")
+    # 最后一次应用的答卷增量序号，序号不大于它的增量已过期
+    answer_seq: int = Field(default=0, description="答卷增量序号")
 
     # 预计开始时间
     plan_starttime: datetime = Field(default=None, description="预计开始时间")
@@ -69,18 +89,56 @@ class Exam(BaseModel, table=True):
             datetime: lambda v: v.isoformat()
         }
 
+    def get_question_ids(self) -> List[str]:
+        """获取问题ID列表"""
+        return list(self._question_ids)
+
+    def set_question_ids(self, question_ids: List[str]) -> None:
+        """修改问题ID列表，保存考试时写入exam_question表"""
+        self._question_ids = list(question_ids)
+        self._question_ids_changed = True
+
+    def set_loaded_question_ids(self, question_ids: List[str]) -> None:
+        """设置由DAO从exam_question表加载的问题ID列表"""
+        self._question_ids = list(question_ids)
+        self._question_ids_changed = False
+
+    def is_question_ids_changed(self) -> bool:
+        """问题ID列表是否有未保存的修改"""
+        return self._question_ids_changed
+
+    def mark_question_ids_saved(self) -> None:
+        """问题ID列表已保存"""
+        self._question_ids_changed = False
+
+    def set_questions(self, questions: List[Question]) -> None:
+        """设置由DAO批量加载的问题列表"""
+        self._questions = list(questions)
+
     def get_questions_list(self) -> List[Question]:
-        """获取问题列表"""
-        if not self.question_ids:
-            return []
-        if self._questions and len(self._questions) > 0:
-            return self._questions
-        else:
-            return [Question.get_by_id(qid.strip()) for qid in self.question_ids.split(',') if qid.strip()]
+        """获取问题列表，需先通过DAO加载(get_exam_with_questions)"""
+        return self._questions
+
+    def set_loaded_answers(self, answers: List[ExamAnswer]) -> None:
+        """设置由DAO从exam_answer表加载的答案"""
+        self._answers = list(answers)
+
+    def get_answers(self) -> List[ExamAnswer]:
+        """获取已加载的每个问题的答案"""
+        return list(self._answers)
 
     def get_answer(self) -> Answer | None:
-        """获取答"""
-        print(f"answer_json: {self.answer_json}")
+        """
+        获取答卷，由exam_answer表的答案和问题列表组成，需先通过DAO加载(get_exam_with_answers)；
+        没有答案行时解析旧版本的answer_json
+        """
+        if self._answers:
+            questions = {q.id: q for q in self._questions}
+            return Answer(
+                question=[questions[a.question_id] for a in self._answers if a.question_id in questions],
+                messages={a.question_id: a.get_messages() for a in self._answers if a.messages_json},
+                answer={a.question_id: a.answer for a in self._answers if a.answer is not None},
+            )
         if self.answer_json is None:
             return None
         try:
@@ -94,30 +152,34 @@ class Exam(BaseModel, table=True):
     @classmethod
     def from_dict(cls, data: dict) -> 'Exam':
         """从字典创建"""
-        for field in ['question_ids']:
-            if data.get(field):
-                data[field] = ",".join(data[field])
+        question_ids = data.pop('question_ids', None)
         for field in ['answer']:
             if isinstance(data.get(field), Answer):
                 data[field] = data[field].model_dump_json()
         for field in ['plan_starttime', 'actual_starttime', 'created_at', 'updated_at']:
             if data.get(field):
                 data[field] = datetime.fromisoformat(data[field])
-        return cls(**data)
+        exam = cls(**data)
+        if question_ids:
+            exam.set_question_ids(question_ids)
+        return exam
 
     def to_dict(self) -> dict:
         """转换为字典格式"""
         result = {}
+        unloaded = self.get_unloaded_fields()
         for field in self.__fields__:
+            if field in unloaded:
+                continue
             value = getattr(self, field)
             if not value:
                 continue
-            if field in ['question_ids']:
-                result[field] = value.split(',') if value else []
-            elif field in ['plan_starttime', 'actual_starttime', 'created_at', 'updated_at']:
+            if field in ['plan_starttime', 'actual_starttime', 'created_at', 'updated_at']:
                 result[field] = value.replace(tzinfo=timezone.utc).isoformat()
             else:
                 result[field] = value
+        if self._question_ids:
+            result['question_ids'] = self.get_question_ids()
         return result
 
 
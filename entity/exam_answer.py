@@ -0,0 +1,228 @@
+"""
+考试答案实体类 - 考试中每个问题的答案一行，按(exam_id, question_id)存储
+"""
+
+import json
+from typing import Optional, List, Dict, Any, Tuple
+from datetime import datetime, timezone
+from sqlalchemy import Index, Text
+from sqlmodel import Field
+from entity.base import BaseModel
+from entity.message import Message
+
+# 答卷增量可以修改的字段
+PATCH_FIELDS = ('answer', 'is_correct', 'time_spent', 'session_id', 'messages')
+
+
+def _answer_text(answer: Any) -> Optional[str]:
+    """答案统一存储为字符串，非字符串的答案序列化为JSON"""
+    return answer if answer is None or isinstance(answer, str) else json.dumps(answer, ensure_ascii=False)
+
+
+class ExamAnswer(BaseModel, table=True):
+    """考试答案实体类，读取单个问题的答案或按问题统计正确率时不需要解析整份答卷"""
+
+    __tablename__ = "exam_answer"
+    # 按问题统计答题数、正确率和平均耗时，只需要扫描索引
+    __table_args__ = (
+        Index("ix_exam_answer_question_correct", "question_id", "is_correct", "time_spent"),
+    )
+    # 对话记录可能很大，统计和列表查询不加载
+    __list_deferred_columns__ = ("messages_json",)
+
+    exam_id: str = Field(..., primary_key=True, foreign_key="exam.id", description="考试ID")
+    question_id: str = Field(..., primary_key=True, foreign_key="question.id", description="问题ID")
+    position: int = Field(default=0, description="问题在答卷中的位置，从0开始")
+
+    # 答案
+    answer: Optional[str] = Field(default=None, sa_type=Text, description="答案")
+    is_correct: Optional[bool] = Field(default=None, description="是否正确，None表示未批改")
+    time_spent: int = Field(default=0, description="答题耗时(秒)")
+
+    # 对话记录: 关联的会话ID，以及客户端提交的该问题对话消息
+    # 不使用CompressedText: 答卷增量追加消息时只拼接新消息，压缩存储每次追加都要解压并重新压缩整段对话
+    session_id: Optional[str] = Field(default=None, description="对话会话ID")
+    messages_json: Optional[str] = Field(default=None, sa_type=Text, description="对话消息列表JSON字符串")
+
+    # 时间信息
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), description="创建时间")
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), description="更新时间")
+
+    def get_messages(self) -> List[Message]:
+        """解析对话消息列表"""
+        if not self.messages_json:
+            return []
+        return [Message.from_dict(m) for m in json.loads(self.messages_json)]
+
+    def append_messages(self, messages: List[Dict[str, Any]]) -> None:
+        """追加对话消息，只序列化新消息并拼接到已有的JSON数组末尾，不解析已有的消息"""
+        if not messages:
+            return
+        text = json.dumps(messages, ensure_ascii=False)
+        existing = (self.messages_json or '').rstrip()
+        if not existing or existing == '[]':
+            self.messages_json = text
+        else:
+            self.messages_json = f"{existing[:-1]}, {text[1:]}"
+
+    def reset(self) -> None:
+        """清空答案的所有内容"""
+        self.answer = None
+        self.is_correct = None
+        self.time_spent = 0
+        self.session_id = None
+        self.messages_json = None
+
+    def apply_patch(self, op: str, field: str, value: Any) -> None:
+        """
+        应用一个已由parse_answer_patch校验的增量操作
+
+        Args:
+            op: set(设置字段) / append(追加一条对话消息) / remove(清空字段)
+            field: 字段名
+            value: 新的值
+        """
+        if op == 'append':
+            self.append_messages([value])
+        elif op == 'remove':
+            if field == 'messages':
+                self.messages_json = None
+            else:
+                setattr(self, field, 0 if field == 'time_spent' else None)
+        elif field == 'messages':
+            self.messages_json = json.dumps(value, ensure_ascii=False) if value else None
+        elif field == 'answer':
+            self.answer = _answer_text(value)
+        else:
+            setattr(self, field, value)
+
+    @classmethod
+    def from_answer_json(cls, exam_id: str, data: Dict[str, Any]) -> List['ExamAnswer']:
+        """
+        把客户端提交的答卷拆分为每个问题一行
+
+        答卷格式: {"question": [问题字典], "messages": {问题ID: [消息字典]}, "answer": {问题ID: 答案}}，
+        可选 "correct": {问题ID: 是否正确}, "time_spent": {问题ID: 耗时秒数}, "session_ids": {问题ID: 会话ID}
+
+        Raises:
+            ValueError: 答卷格式不合法
+        """
+        if not isinstance(data, dict):
+            raise ValueError("答卷必须是对象")
+        questions = data.get('question') or []
+        if not isinstance(questions, list) or not all(isinstance(q, dict) for q in questions):
+            raise ValueError("question必须是问题对象的列表")
+        sections = {}
+        for key in ('answer', 'messages', 'correct', 'time_spent', 'session_ids'):
+            values = data.get(key) or {}
+            if not isinstance(values, dict):
+                raise ValueError(f"{key}必须是以问题ID为键的对象")
+            sections[key] = values
+        question_ids = [q['id'] for q in questions if q.get('id')]
+        for values in sections.values():
+            question_ids.extend(values)
+
+        answers = []
+        for position, question_id in enumerate(dict.fromkeys(question_ids)):
+            if not isinstance(question_id, str):
+                raise ValueError(f"问题ID必须是字符串: {question_id}")
+            answer = sections['answer'].get(question_id)
+            is_correct = sections['correct'].get(question_id)
+            messages = sections['messages'].get(question_id)
+            if messages and not isinstance(messages, list):
+                raise ValueError(f"问题{question_id}的messages必须是列表")
+            time_spent = sections['time_spent'].get(question_id)
+            try:
+                time_spent = int(time_spent or 0)
+            except (TypeError, ValueError):
+                raise ValueError(f"问题{question_id}的time_spent不是整数: {time_spent}")
+            answers.append(cls(
+                exam_id=exam_id,
+                question_id=question_id,
+                position=position,
+                answer=_answer_text(answer),
+                is_correct=None if is_correct is None else bool(is_correct),
+                time_spent=time_spent,
+                session_id=sections['session_ids'].get(question_id),
+                messages_json=json.dumps(messages, ensure_ascii=False) if messages else None,
+            ))
+        return answers
+
+    def to_dict(self) -> dict:
+        """转换为字典格式，对话消息解析为列表"""
+        result = super().to_dict()
+        if 'messages_json' in result:
+            messages_json = result.pop('messages_json')
+            result['messages'] = json.loads(messages_json) if messages_json else []
+        return result
+
+    def __str__(self) -> str:
+        """字符串表示，答案以(考试ID, 问题ID)为主键，没有id字段"""
+        return f"ExamAnswer(exam_id={self.exam_id}, question_id={self.question_id})"
+
+def _check_patch_value(field: str, value: Any, append: bool) -> None:
+    if append:
+        if not isinstance(value, dict):
+            raise ValueError("追加的对话消息必须是对象")
+    elif field == 'messages':
+        if not isinstance(value, list):
+            raise ValueError("messages必须是列表")
+    elif field == 'is_correct':
+        if value is not None and not isinstance(value, bool):
+            raise ValueError("is_correct必须是布尔值")
+    elif field == 'time_spent':
+        if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+            raise ValueError("time_spent必须是非负整数")
+    elif field == 'session_id':
+        if value is not None and not isinstance(value, str):
+            raise ValueError("session_id必须是字符串")
+
+
+def parse_answer_patch(patches: List[Dict[str, Any]]) -> Dict[str, List[Tuple[str, Optional[str], Any]]]:
+    """
+    解析类似JSON Patch的答卷增量，按问题分组
+
+    每个操作为 {"op": "add" | "replace" | "remove", "path": "/问题ID/字段", "value": 值}:
+        replace(或add) /q1/answer    设置字段，字段为PATCH_FIELDS之一
+        add /q1/messages/-           追加一条对话消息
+        remove /q1/answer            清空字段
+        remove /q1                   删除该问题的答案，之后的操作从空答案开始
+
+    Returns:
+        dict: 问题ID -> [(操作, 字段, 值)]，操作为set/append/remove，删除整个问题时字段为None
+
+    Raises:
+        ValueError: 操作或路径不合法
+    """
+    changes: Dict[str, List[Tuple[str, Optional[str], Any]]] = {}
+    for index, patch in enumerate(patches):
+        op, path = patch.get('op'), patch.get('path')
+        if op not in ('add', 'replace', 'remove') or not isinstance(path, str) or not path.startswith('/'):
+            raise ValueError(f"第{index + 1}个操作不合法: {patch}")
+        # JSON Pointer转义: ~1表示/，~0表示~
+        parts = [part.replace('~1', '/').replace('~0', '~') for part in path[1:].split('/')]
+        question_id, rest = parts[0], parts[1:]
+        if not question_id:
+            raise ValueError(f"第{index + 1}个操作缺少问题ID: {path}")
+
+        if not rest:
+            if op != 'remove':
+                raise ValueError(f"第{index + 1}个操作只能删除整个问题的答案: {path}")
+            # 删除之前的操作没有意义，只保留删除
+            changes[question_id] = [('remove', None, None)]
+            continue
+        field = rest[0]
+        append = rest[1:] == ['-'] and field == 'messages' and op == 'add'
+        if field not in PATCH_FIELDS or (len(rest) > 1 and not append):
+            raise ValueError(f"第{index + 1}个操作的路径不合法: {path}")
+        if op == 'remove':
+            changes.setdefault(question_id, []).append(('remove', field, None))
+            continue
+        if 'value' not in patch:
+            raise ValueError(f"第{index + 1}个操作缺少value: {path}")
+        try:
+            _check_patch_value(field, patch['value'], append)
+        except ValueError as e:
+            raise ValueError(f"第{index + 1}个操作: {e}")
+        changes.setdefault(question_id, []).append(('append' if append else 'set', field, patch['value']))
+    return changes
@@ -0,0 +1,20 @@
+"""
+考试问题关联实体类 - 考试包含的问题及其顺序
+"""
+
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Index
+
+
+class ExamQuestion(SQLModel, table=True):
+    """考试与问题的关联，按position排序"""
+
+    __tablename__ = "exam_question"
+    # 反查包含某个问题的考试
+    __table_args__ = (
+        Index("ix_exam_question_question", "question_id", "exam_id"),
+    )
+
+    exam_id: str = Field(..., primary_key=True, foreign_key="exam.id", description="考试ID")
+    position: int = Field(..., primary_key=True, description="问题在考试中的位置，从0开始")
+    question_id: str = Field(..., foreign_key="question.id", description="问题ID")
@@ -0,0 +1,155 @@
+"""
+全文搜索 - 全文索引声明、$match过滤条件与相关度排序
+
+- MySQL: 使用ngram分词器的FULLTEXT索引，MATCH ... AGAINST查询
+- SQLite: 使用trigram分词的FTS5外部内容表，由触发器与原表保持同步
+- 其他数据库: 退化为LIKE包含匹配
+
+实体通过__fulltext_columns__声明参与全文搜索的列，__table_args__中加入fulltext_index，
+并调用register_sqlite_fts注册SQLite的FTS5表
+"""
+
+from typing import Any, List, Sequence
+from sqlalchemy import DDL, Float, Index, Table, bindparam, event, literal, or_
+from sqlalchemy.dialects.mysql import match as mysql_match
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ColumnElement
+
+# 各数据库分词的最短长度，更短的搜索词命中不了索引，退化为LIKE
+MIN_TOKEN_SIZE = {'mysql': 2, 'sqlite': 3}
+
+
+def fulltext_index(table_name: str, columns: Sequence[str]) -> Index:
+    """声明MySQL的ngram全文索引，其他数据库不创建"""
+    return Index(
+        f"ft_{table_name}_{'_'.join(columns)}",
+        *columns,
+        mysql_prefix="FULLTEXT",
+        mysql_with_parser="ngram",
+    ).ddl_if(dialect="mysql")
+
+
+def fts_table_name(table_name: str) -> str:
+    """SQLite全文搜索表名"""
+    return f"{table_name}_fts"
+
+
+def sqlite_fts_ddl(table_name: str, columns: Sequence[str]) -> List[str]:
+    """生成SQLite的FTS5外部内容表及同步触发器的DDL"""
+    fts = fts_table_name(table_name)
+    column_list = ", ".join(columns)
+    new_values = ", ".join(f"new.{column}" for column in columns)
+    old_values = ", ".join(f"old.{column}" for column in columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{column_list}, content='{table_name}', content_rowid='rowid', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table_name} BEGIN "
+        f"INSERT INTO {fts}(rowid, {column_list}) VALUES (new.rowid, {new_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table_name} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column_list}) VALUES ('delete', old.rowid, {old_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table_name} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column_list}) VALUES ('delete', old.rowid, {old_values}); "
+        f"INSERT INTO {fts}(rowid, {column_list}) VALUES (new.rowid, {new_values}); END",
+    ]
+
+
+def register_sqlite_fts(table: Table, columns: Sequence[str]) -> None:
+    """建表后在SQLite上创建对应的FTS5表和触发器"""
+    for statement in sqlite_fts_ddl(table.name, columns):
+        event.listen(table, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
+
+def get_fulltext_columns(Clazz: Any, key: str) -> List[Any]:
+    """获取key所在的全文搜索列，key不支持全文搜索时抛出ValueError"""
+    columns = getattr(Clazz, "__fulltext_columns__", None) or ()
+    if key not in columns:
+        raise ValueError(f"{Clazz.__name__}.{key}不支持全文搜索")
+    return [Clazz.__table__.c[column] for column in columns]
+
+
+class _FullTextElement(ColumnElement):
+    """全文搜索表达式的基类，SQL按数据库方言生成"""
+
+    # SQL与搜索词长度有关，不参与语句缓存
+    inherit_cache = False
+
+    def __init__(self, columns: List[Any], value: str):
+        self.columns = columns
+        self.value = value
+        self.table = columns[0].table
+
+    def is_short(self, dialect_name: str) -> bool:
+        return len(self.value) < MIN_TOKEN_SIZE.get(dialect_name, 0)
+
+    def fallback(self):
+        return or_(*[column.contains(self.value) for column in self.columns])
+
+    def fts_query(self):
+        """FTS5查询按短语匹配，避免搜索词中的符号被解析为查询语法"""
+        return bindparam("fts_query", '"' + self.value.replace('"', '""') + '"', unique=True)
+
+
+class FullTextMatch(_FullTextElement):
+    """全文匹配过滤条件"""
+    # 不声明Boolean类型，否则不支持原生布尔的数据库会渲染为"... = 1"
+    inherit_cache = False
+
+
+class FullTextScore(_FullTextElement):
+    """全文匹配相关度，越大越相关"""
+    inherit_cache = False
+    type = Float()
+
+
+@compiles(FullTextMatch)
+def _compile_match_default(element, compiler, **kw):
+    return compiler.process(element.fallback(), **kw)
+
+
+@compiles(FullTextMatch, "mysql")
+def _compile_match_mysql(element, compiler, **kw):
+    if element.is_short("mysql"):
+        return compiler.process(element.fallback(), **kw)
+    return compiler.process(mysql_match(*element.columns, against=element.value).in_natural_language_mode(), **kw)
+
+
+@compiles(FullTextMatch, "sqlite")
+def _compile_match_sqlite(element, compiler, **kw):
+    if element.is_short("sqlite"):
+        return compiler.process(element.fallback(), **kw)
+    fts = fts_table_name(element.table.name)
+    query = compiler.process(element.fts_query(), **kw)
+    return f"{element.table.name}.rowid IN (SELECT rowid FROM {fts} WHERE {fts} MATCH {query})"
+
+
+@compiles(FullTextScore)
+def _compile_score_default(element, compiler, **kw):
+    return compiler.process(literal(0), **kw)
+
+
+@compiles(FullTextScore, "mysql")
+def _compile_score_mysql(element, compiler, **kw):
+    if element.is_short("mysql"):
+        return compiler.process(literal(0), **kw)
+    return compiler.process(mysql_match(*element.columns, against=element.value).in_natural_language_mode(), **kw)
+
+
+@compiles(FullTextScore, "sqlite")
+def _compile_score_sqlite(element, compiler, **kw):
+    if element.is_short("sqlite"):
+        return compiler.process(literal(0), **kw)
+    fts = fts_table_name(element.table.name)
+    query = compiler.process(element.fts_query(), **kw)
+    # bm25越小越相关，取负数与MySQL保持一致
+    return (f"(SELECT -bm25({fts}) FROM {fts} "
+            f"WHERE {fts} MATCH {query} AND {fts}.rowid = {element.table.name}.rowid)")
+
+
+def fulltext_match(attr: Any, value: str) -> FullTextMatch:
+    """构建$match过滤条件"""
+    return FullTextMatch(get_fulltext_columns(attr.class_, attr.key), str(value))
+
+
+def fulltext_score(Clazz: Any, key: str, value: str) -> FullTextScore:
+    """构建与$match对应的相关度表达式"""
+    return FullTextScore(get_fulltext_columns(Clazz, key), str(value))
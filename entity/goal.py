@@ -4,10 +4,11 @@
 
 from typing import Optional
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index
 from enum import Enum
 from datetime import datetime, timezone
 from entity.base import BaseModel
-from utils.helpers import random_uuid
+from utils.helpers import time_ordered_id
 from entity.user import User
 
 
@@ -22,8 +23,15 @@ class GoalStatus(str, Enum):
 class Goal(BaseModel, table=True):
     """目标实体类"""
 
+    # 索引与列表查询条件对应：按创建人、名称、状态筛选未删除的目标
+    __table_args__ = (
+        Index("ix_goal_creator_deleted", "creator_id", "is_deleted"),
+        Index("ix_goal_name_deleted", "name", "is_deleted"),
+        Index("ix_goal_status_deleted", "status", "is_deleted"),
+    )
+
     # 基本信息
-    id: Optional[str] = Field(default_factory=lambda: random_uuid(), primary_key=True, description="目标唯一标识")
+    id: Optional[str] = Field(default_factory=time_ordered_id, primary_key=True, description="目标唯一标识")
     name: str = Field(..., description="目标名称")
     status: GoalStatus = Field(default=GoalStatus.PREPARING, description="目标状态")
     ai_prompt: Optional[str] = Field(default=None, description="AI提示词")
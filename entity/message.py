@@ -4,7 +4,7 @@ import json
 import base64
 from datetime import datetime, timezone
 from pydantic import BaseModel, Field
-from utils.helpers import random_uuid
+from utils.helpers import time_ordered_id
 
 
 class MessageType(Enum):
@@ -27,7 +27,7 @@ class Message(BaseModel):
     """绘画消息类，支持多种媒体类型"""
 
     # 消息ID
-    id: Optional[str] = Field(default_factory=lambda: random_uuid(), primary_key=True, description="消息唯一标识")
+    id: Optional[str] = Field(default_factory=time_ordered_id, primary_key=True, description="消息唯一标识")
 
     # 消息角色
     role: MessageRole = Field(..., description="消息角色")
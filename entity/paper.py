@@ -8,21 +8,23 @@ from entity.base import BaseModel
 from datetime import datetime, timezone
 from pydantic import PrivateAttr
 from .question import Question
+from .paper_question import PaperQuestion  # 注册paper_question关联表
 from .user import User
-from utils.helpers import random_uuid
+from utils.helpers import time_ordered_id
 
 
 class Paper(BaseModel, table=True):
     """试卷实体类"""
 
     # 基本信息
-    id: Optional[str] = Field(default_factory=lambda: random_uuid(), primary_key=True, description="试卷唯一标识")
+    id: Optional[str] = Field(default_factory=time_ordered_id, primary_key=True, description="试卷唯一标识")
     title: str = Field(..., description="试卷标题")
     description: Optional[str] = Field(default=None, description="试卷描述")
 
-    # 问题列表
-    question_ids: str = Field(default='', description="问题ID列表,以逗号分割")
-    # 声明一个私有实例属性，不被 ORM、验证、导出影响，不被当成数据库字段处理
+    # 问题列表，按顺序存储在paper_question表，由DAO加载与保存
+    # 声明私有实例属性，不被 ORM、验证、导出影响，不被当成数据库字段处理
+    _question_ids: List[str] = PrivateAttr(default_factory=list)
+    _question_ids_changed: bool = PrivateAttr(default=False)
     _questions: list = PrivateAttr(default_factory=list)
 
     # 创建人信息
@@ -45,14 +47,41 @@ class Paper(BaseModel, table=True):
         super().__init__(**kwargs)
         self._questions = []
 
+    def get_question_ids(self) -> List[str]:
+        """获取问题ID列表"""
+        return list(self._question_ids)
+
+    def set_question_ids(self, question_ids: List[str]) -> None:
+        """修改问题ID列表，保存试卷时写入paper_question表"""
+        self._question_ids = list(question_ids)
+        self._question_ids_changed = True
+
+    def set_loaded_question_ids(self, question_ids: List[str]) -> None:
+        """设置由DAO从paper_question表加载的问题ID列表"""
+        self._question_ids = list(question_ids)
+        self._question_ids_changed = False
+
+    def is_question_ids_changed(self) -> bool:
+        """问题ID列表是否有未保存的修改"""
+        return self._question_ids_changed
+
+    def mark_question_ids_saved(self) -> None:
+        """问题ID列表已保存"""
+        self._question_ids_changed = False
+
+    def set_questions(self, questions: List[Question]) -> None:
+        """设置由DAO批量加载的问题列表"""
+        self._questions = list(questions)
+
     def get_questions_list(self) -> List[Question]:
-        """获取问题列表"""
-        if not self.question_ids:
-            return []
-        if self._questions and len(self._questions) > 0:
-            return self._questions
-        else:
-            return [Question.get_by_id(qid.strip()) for qid in self.question_ids.split(',') if qid.strip()]
+        """获取问题列表，需先通过DAO加载(get_paper_with_questions)"""
+        return self._questions
+
+    def to_dict(self) -> dict:
+        """转换为字典格式"""
+        result = super().to_dict()
+        result['question_ids'] = self.get_question_ids()
+        return result
 
 # 创建试卷的工厂函数
 def create_paper(
@@ -69,6 +98,6 @@ def create_paper(
     )
 
     if question_ids:
-        paper.question_ids = ','.join(question_ids)
+        paper.set_question_ids(question_ids)
 
     return paper
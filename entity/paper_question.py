@@ -0,0 +1,20 @@
+"""
+试卷问题关联实体类 - 试卷包含的问题及其顺序
+"""
+
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Index
+
+
+class PaperQuestion(SQLModel, table=True):
+    """试卷与问题的关联，按position排序"""
+
+    __tablename__ = "paper_question"
+    # 反查包含某个问题的试卷
+    __table_args__ = (
+        Index("ix_paper_question_question", "question_id", "paper_id"),
+    )
+
+    paper_id: str = Field(..., primary_key=True, foreign_key="paper.id", description="试卷ID")
+    position: int = Field(..., primary_key=True, description="问题在试卷中的位置，从0开始")
+    question_id: str = Field(..., foreign_key="question.id", description="问题ID")
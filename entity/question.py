@@ -4,13 +4,15 @@
 
 from typing import List, Optional, Union
 from sqlmodel import SQLModel, Field, Session, select, Relationship
+from sqlalchemy import Index
 import logging
 from enum import Enum
 from datetime import datetime, timezone
 from entity.base import BaseModel
+from entity.fulltext import fulltext_index, register_sqlite_fts
 import json
 from pydantic import validator
-from utils.helpers import random_uuid
+from utils.helpers import time_ordered_id
 from entity.message import Message, MessageRole
 from entity.user import User
 from utils.transformer import iso_to_mysql_datetime, mysql_datetime_to_iso
@@ -49,8 +51,20 @@ class Subject(str, Enum):
 class Question(BaseModel, table=True):
     """问题实体类"""
 
+    # 索引与列表查询条件对应：按创建人、按科目+题型、按题型筛选未删除的问题，题干和材料全文搜索
+    __table_args__ = (
+        Index("ix_question_creator_deleted", "creator_id", "is_deleted"),
+        Index("ix_question_subject_type_deleted", "subject", "type", "is_deleted"),
+        Index("ix_question_type_deleted", "type", "is_deleted"),
+        fulltext_index("question", ("title", "material")),
+    )
+    # 参与全文搜索($match)的列
+    __fulltext_columns__ = ("title", "material")
+    # 材料可能是整篇文件提取的文字，列表查询默认不加载
+    __list_deferred_columns__ = ("material",)
+
     # 基本信息
-    id: Optional[str] = Field(default_factory=lambda: random_uuid(), primary_key=True, description="问题唯一标识")
+    id: Optional[str] = Field(default_factory=time_ordered_id, primary_key=True, description="问题唯一标识")
     subject: Subject = Field(..., description="科目")
     type: QuestionType = Field(..., description="问题类型")
     title: str = Field(..., description="题干")
@@ -134,7 +148,10 @@ class Question(BaseModel, table=True):
     def to_dict(self) -> dict:
         """转换为字典格式"""
         result = {}
+        unloaded = self.get_unloaded_fields()
         for field in self.__fields__:
+            if field in unloaded:
+                continue
             value = getattr(self, field)
             if field in ['images', 'audios', 'videos', 'options', 'attachments', 'links']:
                 result[field] = value.split(',') if value else []
@@ -184,6 +201,10 @@ class Question(BaseModel, table=True):
         return []
 
 
+# SQLite上的全文搜索表
+register_sqlite_fts(Question.__table__, Question.__fulltext_columns__)
+
+
 # 创建问题的工厂函数
 def create_question(**kwargs) -> Question:
     """创建问题实例的工厂函数"""
@@ -5,6 +5,7 @@
 import json
 from typing import List, Optional, Dict, Any
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index
 from pydantic import PrivateAttr
 from enum import Enum
 from datetime import datetime, timezone
@@ -12,7 +13,7 @@ from entity.base import BaseModel
 from entity.message import Message, MessageRole, MessageType
 from entity.question import Question, Subject
 from entity.goal import Goal
-from utils.helpers import random_uuid
+from utils.helpers import time_ordered_id
 
 class TopicType(str, Enum):
     """主题类型枚举"""
@@ -24,8 +25,17 @@ class TopicType(str, Enum):
 class Session(BaseModel, table=True):
     """会话实体类"""
 
+    # 索引与查询条件对应：按问题、按主题筛选未删除的会话，按主题和最后活动时间查找需要归档的会话
+    __table_args__ = (
+        Index("ix_session_question_deleted", "question_id", "is_deleted"),
+        Index("ix_session_topic_deleted", "topic", "is_deleted"),
+        Index("ix_session_topic_updated", "topic", "updated_at"),
+    )
+    # 旧版本的消息列表可能很大，列表查询默认不加载
+    __list_deferred_columns__ = ("messages",)
+
     # 基本信息
-    id: Optional[str] = Field(default_factory=lambda: random_uuid(), primary_key=True, description="会话唯一标识")
+    id: Optional[str] = Field(default_factory=time_ordered_id, primary_key=True, description="会话唯一标识")
     topic: TopicType = Field(..., description="主题类型")
     # # 多态外键，可能是question_id，也可能是goal_id
     # topic_id: str = Field(..., description="主题ID")
@@ -37,8 +47,11 @@ class Session(BaseModel, table=True):
     # _goal: Optional[Goal] = PrivateAttr(default=None)
 
     
-    # 消息列表 - 使用JSON字符串存储
-    messages: Optional[str] = Field(default=None, description="消息列表JSON字符串")
+    # 历史消息列表JSON字符串，仅兼容旧数据，新消息存储在session_message表
+    messages: Optional[str] = Field(default=None, description="消息列表JSON字符串(已废弃)")
+    # 已加载的消息窗口，以及尚未写入session_message表的新消息
+    _messages: List[Message] = PrivateAttr(default_factory=list)
+    _pending_messages: List[Message] = PrivateAttr(default_factory=list)
     
     # 时间信息
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), description="创建时间")
@@ -55,31 +68,54 @@ class Session(BaseModel, table=True):
 
     def add_message(self, message: Message) -> None:
         """
-        添加消息到会话
+        添加消息到会话，消息在DAO保存会话时追加写入session_message表
 
         Args:
             message: 要添加的消息
         """
-        messages_dict_list = json.loads(self.messages) if self.messages else []
-        messages_dict_list.append(message.to_dict())
-        self.messages = json.dumps(messages_dict_list, ensure_ascii=False)
+        self._messages.append(message)
+        self._pending_messages.append(message)
         self.updated_at = datetime.now(timezone.utc)
 
-    def get_messages(self) -> List[Message]:
-        """获取消息列表"""
+    def get_messages(self, last_n: Optional[int] = None) -> List[Message]:
+        """
+        获取消息列表
+
+        Args:
+            last_n: 只返回最后n条消息，None表示返回已加载的全部消息
+        """
+        if last_n is None:
+            return list(self._messages)
+        return self._messages[-last_n:] if last_n > 0 else []
+
+    def set_loaded_messages(self, messages: List[Message]) -> None:
+        """设置从存储中加载的消息窗口"""
+        self._messages = list(messages)
+        self._pending_messages = []
+
+    def get_pending_messages(self) -> List[Message]:
+        """获取尚未持久化的新消息"""
+        return list(self._pending_messages)
+
+    def mark_messages_saved(self) -> None:
+        """新消息已持久化"""
+        self._pending_messages = []
+
+    def get_legacy_messages(self) -> List[Message]:
+        """解析旧版本messages字段中的消息"""
         if self.messages:
-            messages = json.loads(self.messages)
-            return [Message.from_dict(msg) for msg in messages]
+            return [Message.from_dict(msg) for msg in json.loads(self.messages)]
         return []
 
     def clear_messages(self) -> None:
-        """清空所有消息"""
-        self.messages = json.dumps([], ensure_ascii=False)
+        """清空已加载和未保存的消息"""
+        self._messages = []
+        self._pending_messages = []
         self.updated_at = datetime.now(timezone.utc)
 
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典格式"""
-        messages_dict_list = json.loads(self.messages) if self.messages else []
+        messages_dict_list = [msg.to_dict() for msg in self.get_messages()]
         return {
             "id": self.id,
             "topic": self.topic,
@@ -93,15 +129,16 @@ class Session(BaseModel, table=True):
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'Session':
         """从字典创建Session对象"""
-        messages = data.get("messages", [])
-        return cls(
+        session = cls(
             id=data.get("id"),
             topic=data.get("topic"),
-            messages=json.dumps(messages, ensure_ascii=False) if messages else None,
             created_at=datetime.fromisoformat(data["created_at"]) if data.get("created_at") else None,
             updated_at=datetime.fromisoformat(data["updated_at"]) if data.get("updated_at") else None,
             is_deleted=data.get("is_deleted", False)
         )
+        for msg in data.get("messages", []):
+            session.add_message(Message.from_dict(msg))
+        return session
 
     def __str__(self) -> str:
         """字符串表示"""
@@ -127,9 +164,8 @@ def create_session(
         question=question,
     )
     
-    if messages:
-        messages_data = [msg.to_dict() for msg in messages]
-        session.messages = json.dumps(messages_data, ensure_ascii=False)
+    for message in messages or []:
+        session.add_message(message)
     
     return session
 
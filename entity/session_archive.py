@@ -0,0 +1,32 @@
+"""
+会话归档实体类 - 长时间没有活动的会话连同消息压缩后移到冷数据表
+"""
+
+from typing import Optional
+from datetime import datetime, timezone
+from sqlalchemy import Index, LargeBinary
+from sqlmodel import Field
+from entity.base import BaseModel
+
+
+class SessionArchive(BaseModel, table=True):
+    """会话归档实体类，一个会话一行，会话和消息行压缩存储在payload中"""
+
+    __tablename__ = "session_archive"
+    __table_args__ = (
+        Index("ix_session_archive_question", "question_id"),
+        Index("ix_session_archive_archived_at", "archived_at"),
+    )
+
+    # 与原会话ID相同，读取时按ID直接查找
+    id: str = Field(..., primary_key=True, description="会话ID")
+    topic: str = Field(..., description="主题类型")
+    question_id: Optional[str] = Field(default=None, description="问题ID")
+    message_count: int = Field(default=0, description="消息数量")
+    # compress_json({"session": 会话行, "messages": [消息行]})，MySQL中为MEDIUMBLOB
+    payload: bytes = Field(..., sa_type=LargeBinary(length=16777215), description="压缩的会话数据")
+
+    # 时间信息
+    created_at: datetime = Field(..., description="会话创建时间")
+    updated_at: datetime = Field(..., description="会话最后活动时间")
+    archived_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), description="归档时间")
@@ -0,0 +1,62 @@
+"""
+会话消息实体类 - 会话消息按(session_id, seq)顺序追加存储
+"""
+
+import json
+from typing import Optional
+from datetime import datetime, timezone
+from sqlalchemy import Text, UniqueConstraint
+from sqlmodel import Field
+from entity.base import BaseModel
+from entity.compressed_text import CompressedText
+from entity.message import Message, MessageRole, MessageType
+from utils.helpers import time_ordered_id
+
+
+class SessionMessage(BaseModel, table=True):
+    """会话消息实体类，每条消息一行，只追加不改写"""
+
+    __tablename__ = "session_message"
+    __table_args__ = (
+        UniqueConstraint("session_id", "seq", name="uq_session_message_session_seq"),
+    )
+
+    # 基本信息
+    id: Optional[str] = Field(default_factory=time_ordered_id, primary_key=True, description="消息唯一标识")
+    session_id: str = Field(..., foreign_key="session.id", description="会话ID")
+    seq: int = Field(..., description="会话内消息序号，从1开始递增")
+
+    # 消息内容，content是会话中最大的数据，每行写入一次不再改写，压缩存储
+    role: str = Field(..., description="消息角色")
+    message_type: str = Field(default=MessageType.TEXT.value, description="消息类型")
+    content: str = Field(..., sa_type=CompressedText, description="消息内容JSON字符串")
+    meta_json: Optional[str] = Field(default=None, sa_type=Text, description="元数据JSON字符串")
+
+    # 时间信息
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), description="消息时间戳")
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), description="创建时间")
+
+    @classmethod
+    def from_message(cls, session_id: str, seq: int, message: Message) -> 'SessionMessage':
+        """从Message创建存储行"""
+        return cls(
+            id=message.id or time_ordered_id(),
+            session_id=session_id,
+            seq=seq,
+            role=message.role.value,
+            message_type=message.message_type.value,
+            content=json.dumps(message.content, ensure_ascii=False),
+            meta_json=json.dumps(message.metadata, ensure_ascii=False) if message.metadata else None,
+            timestamp=message.timestamp or datetime.now(timezone.utc),
+        )
+
+    def to_message(self) -> Message:
+        """转换为Message对象"""
+        return Message(
+            id=self.id,
+            role=MessageRole(self.role),
+            content=json.loads(self.content),
+            message_type=MessageType(self.message_type),
+            timestamp=self.timestamp,
+            metadata=json.loads(self.meta_json) if self.meta_json else None,
+        )
@@ -8,19 +8,19 @@ import uuid
 from datetime import datetime, timezone
 import hashlib
 import os
-from utils.helpers import random_uuid
+from utils.helpers import time_ordered_id
 
 class User(SQLModel, table=True):
     """用户实体类"""
 
     # 基本信息
-    id: Optional[str] = Field(default_factory=lambda: random_uuid(), primary_key=True, description="用户唯一标识")
-    name: str = Field(..., description="用户姓名")
+    id: Optional[str] = Field(default_factory=time_ordered_id, primary_key=True, description="用户唯一标识")
+    name: str = Field(..., index=True, description="用户姓名")
     password: str = Field(..., description="密码")
 
     # 可选信息
     email: Optional[str] = Field(default=None, description="邮箱")
-    phone: Optional[str] = Field(default=None, description="手机号")
+    phone: Optional[str] = Field(default=None, index=True, description="手机号")
     avatar: Optional[str] = Field(default=None, description="头像URL")
 
     # 时间信息
@@ -0,0 +1,65 @@
+"""
+测试用的临时SQLite数据库
+
+把应用的数据库(dao.database中的全局引擎)切换到临时目录中的SQLite文件，
+建表并执行迁移，退出时释放引擎并恢复原来的配置
+"""
+
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List
+
+from entity.paper import Paper  # 注册User.papers关系映射
+from entity.session import Session  # 注册Question.sessions关系映射
+from entity.exam import Exam
+from entity.exam_answer import ExamAnswer
+from entity.goal import Goal
+from entity.session_archive import SessionArchive
+from config.settings import settings
+from dao.cache import entity_cache
+from dao.database import dispose_engine, init_database
+
+
+def sqlite_url(path: str) -> str:
+    return f"sqlite+aiosqlite:///{path}"
+
+
+@asynccontextmanager
+async def temp_database(replicas: int = 0, **overrides) -> AsyncIterator[List[str]]:
+    """
+    使用临时SQLite数据库
+
+    Args:
+        replicas: 只读库个数，只读库是独立的空数据库文件(同样建表)，用于验证查询走的是哪个库
+        overrides: 其他要临时修改的配置
+
+    Returns:
+        数据库文件路径列表，第一个是主库，之后是只读库
+    """
+    directory = tempfile.mkdtemp()
+    paths = [os.path.join(directory, f"db{i}.sqlite") for i in range(replicas + 1)]
+    values = {
+        'DATABASE_URL': sqlite_url(paths[0]),
+        'DATABASE_READ_URLS': None,
+        **overrides,
+    }
+    original = {key: getattr(settings, key) for key in values}
+    await dispose_engine()
+    entity_cache.clear()
+    try:
+        # 每个文件都用主库的方式建表，再统一切换配置
+        for path in reversed(paths):
+            settings.DATABASE_URL = sqlite_url(path)
+            await init_database()
+            await dispose_engine()
+        for key, value in values.items():
+            setattr(settings, key, value)
+        if replicas:
+            settings.DATABASE_READ_URLS = ",".join(sqlite_url(path) for path in paths[1:])
+        yield paths
+    finally:
+        await dispose_engine()
+        entity_cache.clear()
+        for key, value in original.items():
+            setattr(settings, key, value)
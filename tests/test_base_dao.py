@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+BaseDao通用方法测试，使用临时SQLite数据库
+"""
+
+import sys
+import os
+import asyncio
+from contextlib import aclosing
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy.dialects import mysql
+from sqlite_database import temp_database
+from entity.question import Question
+from dao.base_dao import BaseDao
+from dao.database import get_pool_stats
+from dao.question_dao import question_dao
+from dao.query_stats import track_queries
+
+
+def make_questions(count: int, prefix: str = 'q'):
+    """构造count个问题，ID按序号排列"""
+    return [
+        Question(id=f'{prefix}{i:03d}', subject='math', type='choice', title=f'题目{i}', creator_id='u1')
+        for i in range(count)
+    ]
+
+
+def test_get_many_order_and_missing():
+    """测试批量获取按传入顺序返回，并报告不存在和已删除的ID"""
+    print("🧪 测试批量获取...")
+
+    async def run():
+        async with temp_database():
+            questions = make_questions(4)
+            questions[3].is_deleted = True
+            for question in questions:
+                await question_dao.create(question)
+            ordered = await question_dao.get_many(['q002', 'missing', 'q000', 'q003', 'q002'])
+            unordered = await question_dao.get_many(['q002', 'q000'], preserve_order=False)
+            empty = await question_dao.get_many([])
+            return ordered, unordered, empty
+
+    (models, missing_ids), (unordered, _), empty = asyncio.run(run())
+    # 重复的ID按出现的位置各返回一次，不存在的和已删除的都视为缺失
+    assert [model.id for model in models] == ['q002', 'q000', 'q002']
+    assert missing_ids == ['missing', 'q003']
+    assert sorted(model.id for model in unordered) == ['q000', 'q002']
+    assert empty == ([], [])
+    print(f"   ✅ 返回顺序: {[model.id for model in models]}, 缺失: {missing_ids}")
+
+
+async def create_questions(count: int, deleted: int = 0):
+    """创建count个问题，其中最后deleted个已删除"""
+    questions = make_questions(count)
+    for question in questions[count - deleted:]:
+        question.is_deleted = True
+    for question in questions:
+        await question_dao.create(question)
+    return questions
+
+
+def test_search_with_total_window_count():
+    """测试精确总数与当前页在同一条语句中返回，页码超出范围时补充统计"""
+    print("🧪 测试列表总数(窗口函数)...")
+
+    async def run():
+        async with temp_database():
+            await create_questions(5, deleted=1)
+            with track_queries() as page_stats:
+                page = await question_dao.search_with_total({}, skip=1, limit=2, order_by='id')
+            with track_queries() as past_end_stats:
+                past_end = await question_dao.search_with_total({}, skip=10, limit=2, order_by='id')
+            empty = await question_dao.search_with_total({'subject': 'english'}, limit=2)
+            return page, page_stats, past_end, past_end_stats, empty
+
+    (models, total), page_stats, past_end, past_end_stats, empty = asyncio.run(run())
+    assert [model.id for model in models] == ['q001', 'q002'] and total == 4
+    assert page_stats.count == 1 and 'OVER' in page_stats.statements[0]
+    # 超出范围的页没有行可以带回总数，再执行一次COUNT
+    assert past_end == ([], 4) and past_end_stats.count == 2
+    assert empty == ([], 0)
+    print(f"   ✅ 总数: {total}, 超出范围: {past_end}")
+
+
+def test_search_with_total_cached_count():
+    """测试cached模式在有效期内复用总数，SQLite上estimate模式按cached处理"""
+    print("🧪 测试列表总数缓存...")
+
+    BaseDao._count_cache.clear()
+
+    async def run():
+        async with temp_database():
+            await create_questions(3)
+            first = await question_dao.search_with_total({}, limit=2, count_mode='cached')
+            await question_dao.create(Question(id='q100', subject='math', type='choice', title='新题', creator_id='u1'))
+            with track_queries() as stats:
+                cached = await question_dao.search_with_total({}, limit=2, count_mode='cached')
+            estimate = await question_dao.search_with_total({}, limit=2, count_mode='estimate')
+            exact = await question_dao.search_with_total({}, limit=2)
+            return first, cached, stats, estimate, exact
+
+    first, cached, stats, estimate, exact = asyncio.run(run())
+    BaseDao._count_cache.clear()
+    assert first[1] == 3
+    # 缓存命中时只查询当前页，不使用窗口函数
+    assert cached[1] == 3 and stats.count == 1 and 'OVER' not in stats.statements[0]
+    assert estimate[1] == 3
+    assert exact[1] == 4
+    print(f"   ✅ 缓存总数: {cached[1]}, 精确总数: {exact[1]}")
+
+
+class FakeMysqlSession:
+    """按顺序返回给定标量结果的MySQL会话"""
+
+    def __init__(self, scalars):
+        self.bind = SimpleNamespace(dialect=mysql.dialect())
+        self.scalars = list(scalars)
+        self.statements = []
+
+    async def execute(self, statement, params=None):
+        self.statements.append(str(statement))
+        value = self.scalars.pop(0)
+        return SimpleNamespace(scalar=lambda: value)
+
+
+def test_estimate_count_excludes_deleted():
+    """测试估算总数减去已删除的行数，已删除行数在有效期内缓存"""
+    print("🧪 测试估算总数...")
+
+    BaseDao._count_cache.clear()
+    session = FakeMysqlSession([1000, 40, 1010])
+    first = asyncio.run(question_dao._estimate_count(session, Question))
+    second = asyncio.run(question_dao._estimate_count(session, Question))
+    BaseDao._count_cache.clear()
+    assert first == 960 and second == 970
+    assert 'is_deleted' in session.statements[1]
+    assert len(session.statements) == 3
+    print(f"   ✅ 估算总数: {first}, {second}")
+
+
+def test_count_cache_evicts_least_recently_used():
+    """测试总数缓存超过容量时只淘汰最久未使用的条目"""
+    print("🧪 测试总数缓存淘汰...")
+
+    BaseDao._count_cache.clear()
+    dao = SimpleNamespace(_count_cache=BaseDao._count_cache, COUNT_CACHE_MAX_SIZE=2)
+    BaseDao._set_cached_count(dao, ('Question', 'a'), 1)
+    BaseDao._set_cached_count(dao, ('Exam', 'b'), 2)
+    assert BaseDao._get_cached_count(dao, ('Question', 'a')) == 1
+    BaseDao._set_cached_count(dao, ('Goal', 'c'), 3)
+    keys = list(BaseDao._count_cache)
+    BaseDao._count_cache.clear()
+    assert keys == [('Question', 'a'), ('Goal', 'c')]
+    print(f"   ✅ 保留: {keys}")
+
+
+def test_update_writes_dirty_columns_only():
+    """测试更新只写入修改过的字段，不覆盖其他请求同时修改的字段"""
+    print("🧪 测试只更新修改过的字段...")
+
+    async def run():
+        async with temp_database():
+            await create_questions(1)
+            question = await question_dao.get_by_id('q000')
+            # 读取之后其他请求修改了提示
+            await question_dao.update_where({'id': 'q000'}, {'tip': '其他请求写入的提示'})
+            question.title = '修改后的题干'
+            with track_queries() as stats:
+                returned = await question_dao.update(question)
+            with track_queries() as clean_stats:
+                unchanged = await question_dao.update(question)
+            return question, returned, stats, unchanged, clean_stats, await question_dao.get_by_id('q000')
+
+    question, returned, stats, unchanged, clean_stats, stored = asyncio.run(run())
+    assert returned is question
+    assert stats.count == 1
+    set_clause = stats.statements[0].split('SET', 1)[1].split('WHERE', 1)[0]
+    assert 'title' in set_clause and 'updated_at' in set_clause and 'tip' not in set_clause
+    # 没有修改时不执行UPDATE
+    assert unchanged is question and clean_stats.count == 0
+    assert stored.title == '修改后的题干' and stored.tip == '其他请求写入的提示'
+    print(f"   ✅ SET子句: {set_clause.strip()}")
+
+
+def test_update_partial_model_returns_full_row():
+    """测试由部分字段构造的实体更新后通过RETURNING返回完整数据，不再查询一次"""
+    print("🧪 测试部分字段更新的RETURNING刷新...")
+
+    async def run():
+        async with temp_database():
+            await create_questions(1)
+            with track_queries() as stats:
+                updated = await question_dao.update(Question(id='q000', title='只传了题干'))
+            return updated, stats
+
+    updated, stats = asyncio.run(run())
+    assert stats.count == 1 and 'RETURNING' in stats.statements[0]
+    assert updated.title == '只传了题干'
+    assert updated.subject == 'math' and updated.creator_id == 'u1'
+    print(f"   ✅ 返回: {updated.title} / {updated.subject}")
+
+
+def test_batch_create_chunks():
+    """测试批量创建按块写入，块边界上的实体都写入且只写入一次"""
+    print("🧪 测试分块批量创建...")
+
+    async def run():
+        async with temp_database():
+            results = {}
+            for count in (4, 5):
+                models = make_questions(count, prefix=f'c{count}_')
+                with track_queries() as stats:
+                    created = await question_dao.batch_create(models, chunk_size=2)
+                results[count] = (created is models, stats.count, await question_dao.count_by_kwargs({'id': {'$in': [m.id for m in models]}}))
+            # 返回的实体作为已持久化的实体，可以直接修改后更新
+            created[-1].title = '最后一块的题目'
+            await question_dao.update(created[-1])
+            empty = await question_dao.batch_create([])
+            return results, await question_dao.get_by_id(created[-1].id), empty
+
+    results, last, empty = asyncio.run(run())
+    # 4行正好两块，5行最后一块只有1行
+    assert results[4] == (True, 2, 4)
+    assert results[5] == (True, 3, 5)
+    assert last.title == '最后一块的题目'
+    assert empty == []
+    print(f"   ✅ 语句数: 4行{results[4][1]}条, 5行{results[5][1]}条")
+
+
+def test_stream_by_kwargs_chunks():
+    """测试流式读取按块返回全部匹配的实体，排除已删除的"""
+    print("🧪 测试流式读取分块...")
+
+    async def run():
+        async with temp_database():
+            await create_questions(6, deleted=1)
+            chunks = []
+            async for questions in question_dao.stream_by_kwargs({}, order_by='id', chunk_size=2):
+                chunks.append([question.id for question in questions])
+            return chunks
+
+    chunks = asyncio.run(run())
+    assert chunks == [['q000', 'q001'], ['q002', 'q003'], ['q004']]
+    print(f"   ✅ 分块: {chunks}")
+
+
+def test_stream_by_kwargs_early_exit():
+    """测试中途退出遍历后立即归还数据库连接"""
+    print("🧪 测试流式读取中途退出...")
+
+    async def run():
+        async with temp_database():
+            await create_questions(5)
+            async with aclosing(question_dao.stream_by_kwargs({}, order_by='id', chunk_size=2)) as stream:
+                async for questions in stream:
+                    first = [question.id for question in questions]
+                    during = get_pool_stats()['checked_out']
+                    break
+            return first, during, get_pool_stats()['checked_out']
+
+    first, during, after = asyncio.run(run())
+    assert first == ['q000', 'q001']
+    assert during == 1 and after == 0
+    print(f"   ✅ 遍历中使用连接{during}个，退出后{after}个")
+
+
+if __name__ == "__main__":
+    test_get_many_order_and_missing()
+    test_search_with_total_window_count()
+    test_search_with_total_cached_count()
+    test_estimate_count_excludes_deleted()
+    test_count_cache_evicts_least_recently_used()
+    test_update_writes_dirty_columns_only()
+    test_update_partial_model_returns_full_row()
+    test_batch_create_chunks()
+    test_stream_by_kwargs_chunks()
+    test_stream_by_kwargs_early_exit()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+压缩文本列测试
+"""
+
+import sys
+import os
+import json
+import asyncio
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import Column, Integer, LargeBinary, MetaData, Table, create_engine, select, type_coerce
+from entity.compressed_text import CompressedText
+from utils.compression import compress_text, decompress_text, is_compressed
+from sqlite_database import temp_database
+from entity.session import Session, TopicType
+from entity.session_message import SessionMessage
+from entity.message import create_message, MessageRole, MessageType
+from dao.database import get_async_session_maker
+from dao.migrations import compress_text_column
+from dao.session_dao import session_dao
+
+TRANSCRIPT = json.dumps([
+    {'role': 'user' if i % 2 else 'assistant', 'content': f'第{i}步：先写出判别式，再代入求根公式计算方程的两个根。'}
+    for i in range(30)
+], ensure_ascii=False)
+
+
+def test_compress_text_roundtrip():
+    """测试长文本压缩、短文本不压缩，以及旧的字符串数据原样返回"""
+    print("🧪 测试文本压缩...")
+
+    data = compress_text(TRANSCRIPT)
+    assert is_compressed(data)
+    assert len(data) < len(TRANSCRIPT.encode('utf-8')) / 3
+    assert decompress_text(data) == TRANSCRIPT
+
+    assert compress_text('[]') == b'[]'
+    assert not is_compressed(b'[]')
+    assert decompress_text(b'[]') == '[]'
+    assert decompress_text('旧数据') == '旧数据'
+    # 以\x00开头的文本总是压缩存储，不会被误认为压缩数据
+    assert decompress_text(compress_text('\x00z短文本')) == '\x00z短文本'
+    print(f"   ✅ {len(TRANSCRIPT.encode('utf-8'))}字节压缩为{len(data)}字节")
+
+
+def test_compressed_column_and_migration():
+    """测试CompressedText列读写，以及迁移改写旧的文本数据"""
+    print("🧪 测试压缩列迁移...")
+
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'compressed.db')}")
+    table = Table('doc', MetaData(), Column('id', Integer, primary_key=True), Column('body', CompressedText))
+    table.create(engine)
+    with engine.begin() as conn:
+        # 旧数据以TEXT存储
+        conn.exec_driver_sql("INSERT INTO doc (id, body) VALUES (1, ?), (2, '[]'), (3, NULL)", (TRANSCRIPT,))
+        conn.execute(table.insert().values(id=4, body=TRANSCRIPT))
+        assert compress_text_column(conn, table, 'body', batch_size=2) == 2
+        assert compress_text_column(conn, table, 'body') == 0
+
+        raw = dict(conn.execute(select(table.c.id, type_coerce(table.c.body, LargeBinary))).all())
+        assert is_compressed(raw[1]) and is_compressed(raw[4])
+        assert raw[2] == b'[]' and raw[3] is None
+        assert dict(conn.execute(select(table.c.id, table.c.body)).all()) == {1: TRANSCRIPT, 2: '[]', 3: None, 4: TRANSCRIPT}
+    engine.dispose()
+    print("   ✅ 旧数据已改写为压缩格式")
+
+
+def test_session_message_content_compressed():
+    """测试会话消息内容压缩存储，较短的消息不压缩，读取时还原"""
+    print("🧪 测试会话消息压缩存储...")
+
+    long_content = '，'.join(f'第{i}步：先写出判别式，再代入求根公式' for i in range(20))
+
+    async def run():
+        async with temp_database():
+            session = await session_dao.create(Session(topic=TopicType.GUIDE))
+            await session_dao.add_message(session.id, create_message(role=MessageRole.USER, content='为什么要除以二', message_type=MessageType.TEXT))
+            await session_dao.add_message(session.id, create_message(role=MessageRole.ASSISTANT, content=long_content, message_type=MessageType.TEXT))
+            session_maker = await get_async_session_maker()
+            async with session_maker() as db_session:
+                statement = select(SessionMessage.seq, type_coerce(SessionMessage.content, LargeBinary)).order_by(SessionMessage.seq)
+                raw = dict((await db_session.execute(statement)).all())
+            return raw, await session_dao.get_messages(session.id)
+
+    raw, messages = asyncio.run(run())
+    assert not is_compressed(raw[1]) and is_compressed(raw[2])
+    assert len(raw[2]) < len(json.dumps(long_content, ensure_ascii=False).encode('utf-8')) / 2
+    assert [m.content for m in messages] == ['为什么要除以二', long_content]
+    print(f"   ✅ 长消息存储为{len(raw[2])}字节")
+
+
+if __name__ == "__main__":
+    test_compress_text_roundtrip()
+    test_compressed_column_and_migration()
+    test_session_message_content_compressed()
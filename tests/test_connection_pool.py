@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+连接池预热和统计测试，使用临时SQLite数据库
+"""
+
+import sys
+import os
+import asyncio
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import exc as sa_exc
+from sqlite_database import temp_database
+from dao.database import get_async_engine, get_pool_stats, init_engine
+
+
+def test_warm_up_pool():
+    """测试启动时为主库和只读库预热连接，统计中可以看到预热的连接"""
+    print("🧪 测试连接池预热...")
+
+    async def run():
+        async with temp_database(replicas=1, DB_POOL_SIZE=3, DB_POOL_WARMUP=2):
+            before = get_pool_stats()
+            await init_engine()
+            return before, get_pool_stats()
+
+    before, stats = asyncio.run(run())
+    # 引擎创建前没有统计
+    assert before == {}
+    assert stats['pool_size'] == 3
+    # 检查连接用的连接和预热的连接复用，预热后都已归还
+    assert stats['checked_in'] == 2 and stats['checked_out'] == 0
+    assert stats['checkouts'] >= 2 and stats['checkout_timeouts'] == 0
+    assert len(stats['replicas']) == 1 and stats['replicas'][0]['checked_in'] == 2
+    print(f"   ✅ 主库: {stats['checked_in']}个空闲连接, 只读库: {stats['replicas'][0]['checked_in']}个")
+
+
+def test_pool_checkout_timeout_stats():
+    """测试连接池耗尽时获取连接超时被计入统计"""
+    print("🧪 测试获取连接超时统计...")
+
+    async def run():
+        async with temp_database(DB_POOL_SIZE=1, DB_MAX_OVERFLOW=0, DB_POOL_TIMEOUT=0):
+            engine = get_async_engine()
+            async with engine.connect():
+                busy = get_pool_stats()
+                try:
+                    async with engine.connect():
+                        pass
+                except sa_exc.TimeoutError:
+                    pass
+                else:
+                    raise AssertionError("连接池耗尽时应超时")
+            return busy, get_pool_stats()
+
+    busy, stats = asyncio.run(run())
+    assert busy['checked_out'] == 1 and busy['overflow'] == 0
+    assert stats['checkout_timeouts'] == 1 and stats['checked_out'] == 0
+    assert stats['max_wait_ms'] >= stats['avg_wait_ms'] >= 0
+    print(f"   ✅ 超时次数: {stats['checkout_timeouts']}, 获取连接次数: {stats['checkouts']}")
+
+
+if __name__ == "__main__":
+    test_warm_up_pool()
+    test_pool_checkout_timeout_stats()
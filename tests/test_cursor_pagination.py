@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+游标分页功能测试
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import datetime
+from entity.exam import Exam
+from entity.goal import Goal
+from entity.paper import Paper  # 注册User.papers关系映射
+from entity.session import Session  # 注册Question.sessions关系映射
+from dao.exam_dao import exam_dao
+
+
+def test_cursor_round_trip():
+    """测试游标编码与解析"""
+    print("🧪 测试游标编码与解析...")
+
+    exam = Exam(goal_id="g1", title="期中考试", examinee_id="u1", plan_starttime=datetime(2025, 3, 1, 8, 30))
+    cursor = exam_dao.encode_cursor(Exam, exam, "-plan_starttime")
+    values = exam_dao.decode_cursor(Exam, cursor, "-plan_starttime")
+
+    assert values == [datetime(2025, 3, 1, 8, 30), exam.id]
+    print(f"   ✅ 游标: {cursor}")
+
+
+def test_cursor_order_mismatch():
+    """测试游标与排序参数不一致时报错"""
+    print("🧪 测试游标与排序不一致...")
+
+    exam = Exam(goal_id="g1", title="期中考试", examinee_id="u1", plan_starttime=datetime(2025, 3, 1))
+    cursor = exam_dao.encode_cursor(Exam, exam, "-plan_starttime")
+
+    for order_by, bad_cursor in [("title", cursor), ("-plan_starttime", "not-a-cursor")]:
+        try:
+            exam_dao.decode_cursor(Exam, bad_cursor, order_by)
+            assert False, "应该抛出ValueError"
+        except ValueError as e:
+            print(f"   ✅ 拒绝无效游标: {e}")
+
+
+def test_next_cursor():
+    """测试下一页游标生成"""
+    print("🧪 测试下一页游标...")
+
+    exams = [Exam(goal_id="g1", title=f"考试{i}", examinee_id="u1", plan_starttime=datetime(2025, 3, i + 1)) for i in range(3)]
+
+    # 不足一页说明已经到末尾
+    assert exam_dao.next_cursor(Exam, exams, 5, "-plan_starttime") is None
+    assert exam_dao.next_cursor(Exam, [], 5, "-plan_starttime") is None
+
+    cursor = exam_dao.next_cursor(Exam, exams, 3, "-plan_starttime")
+    assert exam_dao.decode_cursor(Exam, cursor, "-plan_starttime")[1] == exams[-1].id
+    print("   ✅ 下一页游标正确")
+
+
+def test_keyset_condition():
+    """测试search_after条件"""
+    print("🧪 测试search_after条件...")
+
+    order_fields = exam_dao._parse_order_fields(Exam, "-plan_starttime")
+    assert [name for name, _, _ in order_fields] == ["plan_starttime", "id"]
+
+    condition = exam_dao._build_keyset_condition(order_fields, [datetime(2025, 3, 1), "abc"])
+    sql = str(condition.compile(compile_kwargs={"literal_binds": True}))
+    print(f"   条件: {sql}")
+    assert "exam.plan_starttime <" in sql
+    assert "exam.id >" in sql
+
+
+if __name__ == "__main__":
+    test_cursor_round_trip()
+    test_cursor_order_mismatch()
+    test_next_cursor()
+    test_keyset_condition()
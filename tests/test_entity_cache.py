@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+实体缓存功能测试
+"""
+
+import sys
+import os
+import asyncio
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from entity.goal import Goal
+from entity.paper import Paper  # 注册User.papers关系映射
+from entity.session import Session  # 注册Question.sessions关系映射
+from dao.cache import EntityCache
+
+
+def test_cache_hit_returns_copy():
+    """测试缓存命中时返回新的实体"""
+    print("🧪 测试缓存命中...")
+
+    cache = EntityCache(max_size=10, ttl=60)
+    goal = Goal(name="学习Python", creator_id="u1")
+
+    async def loader():
+        return goal
+
+    async def run():
+        await cache.get_or_load(Goal, goal.id, loader)
+        return await cache.get_or_load(Goal, goal.id, loader)
+
+    cached = asyncio.run(run())
+    assert cached is not goal and cached.name == goal.name
+
+    # 修改返回的实体不影响缓存
+    cached.name = "已修改"
+    assert cache.get(Goal, goal.id).name == "学习Python"
+
+    stats = cache.get_stats()
+    assert stats['hits'] == 1 and stats['misses'] == 1
+    print(f"   ✅ 统计: {stats}")
+
+
+def test_cache_eviction_and_invalidate():
+    """测试容量淘汰与失效"""
+    print("🧪 测试淘汰与失效...")
+
+    cache = EntityCache(max_size=2, ttl=60)
+    goals = [Goal(name=f"目标{i}", creator_id="u1") for i in range(3)]
+    for goal in goals:
+        cache.set(goal)
+
+    assert cache.get(Goal, goals[0].id) is None
+    assert cache.get(Goal, goals[2].id) is not None
+    assert cache.get_stats()['evictions'] == 1
+
+    cache.invalidate(Goal, [goals[2].id])
+    assert cache.get(Goal, goals[2].id) is None
+
+    # 过期的实体不再返回
+    expired = EntityCache(max_size=2, ttl=0)
+    expired.set(goals[0])
+    assert expired.get(Goal, goals[0].id) is None
+    print("   ✅ 淘汰与失效正确")
+
+
+def test_concurrent_misses_coalesced():
+    """测试并发未命中只加载一次"""
+    print("🧪 测试并发未命中合并...")
+
+    cache = EntityCache(max_size=10, ttl=60)
+    goal = Goal(name="学习Python", creator_id="u1")
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return goal
+
+    async def run():
+        return await asyncio.gather(*[cache.get_or_load(Goal, goal.id, loader) for _ in range(5)])
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(result.id == goal.id for result in results)
+    assert cache.get_stats()['coalesced'] == 4
+    print("   ✅ 只查询了一次")
+
+
+if __name__ == "__main__":
+    test_cache_hit_returns_copy()
+    test_cache_eviction_and_invalidate()
+    test_concurrent_misses_coalesced()
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+考试答案表测试
+"""
+
+import sys
+import os
+import asyncio
+import tempfile
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlmodel import SQLModel
+from sqlite_database import temp_database
+from api.app import app
+from utils.jwt_utils import get_current_user_id
+from entity.paper import Paper  # 注册User.papers关系映射
+from entity.session import Session  # 注册Question.sessions关系映射
+from entity.exam import Exam, ExamStatus, create_exam
+from entity.compressed_text import CompressedText
+from entity.exam_answer import ExamAnswer, parse_answer_patch
+from entity.question import Question
+from entity.goal import Goal
+from dao.exam_dao import exam_dao
+from dao.goal_dao import goal_dao
+from dao.question_dao import question_dao
+from dao.unit_of_work import UnitOfWork, _current_unit_of_work
+
+ANSWER_JSON = {
+    'question': [{'id': 'q1', 'title': '1+1=?'}, {'id': 'q2', 'title': '2+2=?'}],
+    'messages': {'q1': [{'role': 'user', 'content': '提示一下', 'message_type': 'text', 'timestamp': '2025-01-01T08:00:00'}]},
+    'answer': {'q1': '2', 'q2': '5'},
+    'correct': {'q1': True, 'q2': False},
+    'time_spent': {'q1': 30, 'q2': 90},
+}
+
+
+def test_from_answer_json():
+    """测试答卷按问题拆分为答案行"""
+    print("🧪 测试答卷拆分...")
+
+    answers = ExamAnswer.from_answer_json('e1', ANSWER_JSON)
+    assert [(a.question_id, a.position, a.answer, a.is_correct, a.time_spent) for a in answers] == [
+        ('q1', 0, '2', True, 30),
+        ('q2', 1, '5', False, 90),
+    ]
+    assert answers[0].get_messages()[0].content == '提示一下'
+    assert answers[1].messages_json is None
+    print("   ✅ 拆分正确")
+
+
+def test_from_answer_json_rejects_invalid_shape():
+    """测试答卷格式不合法时抛出ValueError"""
+    print("🧪 测试答卷格式校验...")
+
+    cases = [
+        {'question': ['q1']},
+        {'question': {'id': 'q1'}},
+        {'answer': ['2']},
+        {'messages': {'q1': 'hello'}},
+        {'answer': {'q1': '2'}, 'time_spent': {'q1': '三十秒'}},
+        {'answer': {'q1': '2'}, 'time_spent': {'q1': [30]}},
+    ]
+    for data in cases:
+        try:
+            ExamAnswer.from_answer_json('e1', data)
+            assert False, f"应该抛出ValueError: {data}"
+        except ValueError as e:
+            print(f"   ✅ 拒绝: {e}")
+    # 可以转换为整数的字符串耗时仍然接受
+    assert ExamAnswer.from_answer_json('e1', {'time_spent': {'q1': '30'}})[0].time_spent == 30
+
+
+def test_exam_answer_str():
+    """测试答案的字符串表示使用(考试ID, 问题ID)"""
+    answer = ExamAnswer(exam_id='e1', question_id='q1')
+    assert str(answer) == repr(answer) == "ExamAnswer(exam_id=e1, question_id=q1)"
+
+
+def test_get_answer_from_rows():
+    """测试Exam.get_answer由答案行和问题列表组成"""
+    print("🧪 测试答卷组装...")
+
+    exam = create_exam(goal_id='g1', title='期中考试', examinee_id='u1', question_ids=['q1', 'q2'])
+    exam.set_questions([Question(id='q1', subject='math', type='choice', title='1+1=?'), Question(id='q2', subject='math', type='choice', title='2+2=?')])
+    exam.set_loaded_answers(ExamAnswer.from_answer_json(exam.id, ANSWER_JSON))
+    answer = exam.get_answer()
+    assert [q.id for q in answer.question] == ['q1', 'q2']
+    assert answer.answer == {'q1': '2', 'q2': '5'}
+    assert list(answer.messages) == ['q1']
+    assert create_exam(goal_id='g1', title='空', examinee_id='u1').get_answer() is None
+    print("   ✅ 组装正确")
+
+
+def test_question_accuracy():
+    """测试按问题统计正确率，不统计已删除的考试"""
+    print("🧪 测试问题正确率统计...")
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'answers.db')}")
+
+    async def run():
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(SQLModel.metadata.create_all)
+            uow = UnitOfWork(AsyncSession(engine, expire_on_commit=False))
+            token = _current_unit_of_work.set(uow)
+            try:
+                uow.session.add(Goal(id='g1', name='目标', creator_id='u1'))
+                uow.session.add_all([Question(id=qid, subject='math', type='choice', title=qid, creator_id='u1') for qid in ('q1', 'q2')])
+                for index, (correct, deleted) in enumerate([(True, False), (False, False), (True, True)]):
+                    exam = Exam(id=f'e{index}', goal_id='g1', title='考试', examinee_id='u1', plan_starttime=datetime(2025, 1, 1, 8), actual_starttime=datetime(2025, 1, 1, 8), is_deleted=deleted)
+                    uow.session.add(exam)
+                    await uow.session.flush()
+                    await exam_dao.save_answers(exam.id, ExamAnswer.from_answer_json(exam.id, {
+                        'answer': {'q1': 'x'}, 'correct': {'q1': correct}, 'time_spent': {'q1': 10 * (index + 1)},
+                    }))
+                return await exam_dao.get_question_accuracy(['q1', 'q2', 'q1'])
+            finally:
+                await uow.rollback()
+                _current_unit_of_work.reset(token)
+        finally:
+            await engine.dispose()
+
+    stats = asyncio.run(run())
+    assert stats['q1'] == {'question_id': 'q1', 'answered': 2, 'graded': 2, 'correct': 1, 'accuracy': 0.5, 'avg_time_spent': 15.0}
+    assert stats['q2']['answered'] == 0 and stats['q2']['accuracy'] is None
+    print(f"   ✅ 统计结果: {stats['q1']}")
+
+
+def test_parse_answer_patch():
+    """测试答卷增量按问题分组并校验路径和值"""
+    print("🧪 测试答卷增量解析...")
+
+    changes = parse_answer_patch([
+        {'op': 'replace', 'path': '/q1/answer', 'value': 'B'},
+        {'op': 'add', 'path': '/q1/messages/-', 'value': {'role': 'user', 'content': '再想想'}},
+        {'op': 'remove', 'path': '/q2/answer'},
+        {'op': 'replace', 'path': '/q3/time_spent', 'value': 60},
+        {'op': 'remove', 'path': '/q3'},
+    ])
+    assert changes == {
+        'q1': [('set', 'answer', 'B'), ('append', 'messages', {'role': 'user', 'content': '再想想'})],
+        'q2': [('remove', 'answer', None)],
+        'q3': [('remove', None, None)],
+    }
+
+    for patch in [
+        {'op': 'move', 'path': '/q1/answer', 'value': 'B'},
+        {'op': 'replace', 'path': '/q1/title', 'value': 'x'},
+        {'op': 'replace', 'path': '/q1', 'value': {}},
+        {'op': 'replace', 'path': '/q1/time_spent', 'value': -1},
+        {'op': 'replace', 'path': '/q1/answer'},
+    ]:
+        try:
+            parse_answer_patch([patch])
+            assert False, f"应该抛出ValueError: {patch}"
+        except ValueError as e:
+            print(f"   ✅ 拒绝: {e}")
+
+
+def test_append_messages_without_parsing():
+    """测试追加对话消息时直接拼接JSON数组"""
+    print("🧪 测试追加对话消息...")
+
+    answer = ExamAnswer(exam_id='e1', question_id='q1')
+    answer.append_messages([{'content': '一'}])
+    answer.append_messages([{'content': '二'}, {'content': '三'}])
+    assert answer.messages_json == '[{"content": "一"}, {"content": "二"}, {"content": "三"}]'
+    # 对话记录不压缩存储，追加时数据库中也只是拼接文本
+    assert not isinstance(ExamAnswer.__table__.c.messages_json.type, CompressedText)
+    print(f"   ✅ {answer.messages_json}")
+
+
+def test_apply_answer_patch_rejects_stale_seq():
+    """测试按序号应用答卷增量，过期的序号和提交答卷之后的增量被拒绝"""
+    print("🧪 测试答卷增量序号...")
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'patch.db')}")
+    positions = {'q1': 0, 'q2': 1}
+
+    async def run():
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(SQLModel.metadata.create_all)
+            uow = UnitOfWork(AsyncSession(engine, expire_on_commit=False))
+            token = _current_unit_of_work.set(uow)
+            try:
+                uow.session.add(Goal(id='g1', name='目标', creator_id='u1'))
+                uow.session.add_all([Question(id=qid, subject='math', type='choice', title=qid, creator_id='u1') for qid in positions])
+                uow.session.add(Exam(id='e1', goal_id='g1', title='考试', examinee_id='u1', plan_starttime=datetime(2025, 1, 1, 8), actual_starttime=datetime(2025, 1, 1, 8)))
+                await uow.session.flush()
+                await exam_dao.save_answers('e1', ExamAnswer.from_answer_json('e1', {'answer': {'q1': 'A', 'q2': 'B'}}))
+
+                results = [
+                    await exam_dao.apply_answer_patch('e1', 1, parse_answer_patch([{'op': 'replace', 'path': '/q1/answer', 'value': 'C'}]), positions),
+                    await exam_dao.apply_answer_patch('e1', 1, parse_answer_patch([{'op': 'replace', 'path': '/q1/answer', 'value': 'D'}]), positions),
+                    await exam_dao.apply_answer_patch('e1', 3, parse_answer_patch([{'op': 'remove', 'path': '/q2'}]), positions),
+                    await exam_dao.apply_answer_patch('e1', 2, parse_answer_patch([{'op': 'remove', 'path': '/q1'}]), positions),
+                ]
+                answers = await exam_dao.get_answers('e1')
+                # 提交答卷推进序号，之后的增量不论序号都被拒绝
+                completed_seq = await exam_dao.complete_with_answers('e1', ExamAnswer.from_answer_json('e1', {'answer': {'q1': 'E'}}))
+                late = await exam_dao.apply_answer_patch('e1', 10, parse_answer_patch([{'op': 'replace', 'path': '/q1/answer', 'value': 'F'}]), positions)
+                final = await exam_dao.get_answers('e1')
+                return results, [(a.question_id, a.answer) for a in answers], completed_seq, late, [(a.question_id, a.answer) for a in final]
+            finally:
+                await uow.rollback()
+                _current_unit_of_work.reset(token)
+        finally:
+            await engine.dispose()
+
+    results, answers, completed_seq, late, final = asyncio.run(run())
+    assert results == [(True, 1, None), (False, 1, ExamStatus.pending), (True, 3, None), (False, 3, ExamStatus.pending)]
+    assert answers == [('q1', 'C')]
+    assert completed_seq == 4
+    assert late == (False, 4, ExamStatus.completed)
+    assert final == [('q1', 'E')]
+    print(f"   ✅ 结果: {results}, 答案: {answers}")
+
+
+async def create_exam_with_questions(question_ids) -> Exam:
+    """创建目标、问题和包含这些问题的考试"""
+    await goal_dao.create(Goal(id='g1', name='目标', creator_id='u1'))
+    for qid in question_ids:
+        await question_dao.create(Question(id=qid, subject='math', type='choice', title=qid, creator_id='u1'))
+    exam = Exam(id='e1', goal_id='g1', title='考试', examinee_id='u1', plan_starttime=datetime(2025, 1, 1, 8), actual_starttime=datetime(2025, 1, 1, 8))
+    exam.set_question_ids(question_ids)
+    return await exam_dao.create(exam)
+
+
+async def call_exam_api(requests):
+    """依次调用考试接口，requests为(方法, 路径, 参数)列表"""
+    app.dependency_overrides[get_current_user_id] = lambda: 'u1'
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            responses = []
+            for method, path, body in requests:
+                if method == 'GET':
+                    responses.append(await client.get(path, params=body))
+                else:
+                    responses.append(await client.post(path, json=body))
+            return responses
+    finally:
+        app.dependency_overrides.pop(get_current_user_id, None)
+
+
+def test_finish_and_get_return_answers():
+    """测试提交答卷和获取考试详情都返回每个问题的答案，答卷格式不合法时返回400"""
+    print("🧪 测试考试接口返回答案...")
+
+    async def run():
+        async with temp_database():
+            await create_exam_with_questions(['q1', 'q2'])
+            return await call_exam_api([
+                ('POST', '/api/exam/finish', {'id': 'e1', 'answer_json': {'answer': {'q1': '2'}, 'time_spent': {'q1': 'abc'}}}),
+                ('POST', '/api/exam/finish', {'id': 'e1', 'answer_json': ANSWER_JSON}),
+                ('GET', '/api/exam/get', {'id': 'e1'}),
+                ('POST', '/api/exam/answer-patch', {'id': 'e1', 'seq': 100, 'patches': [{'op': 'replace', 'path': '/q1/answer', 'value': '3'}]}),
+            ])
+
+    invalid, finished, detail, late_patch = asyncio.run(run())
+    assert invalid.status_code == 400
+    # 提交之后的增量返回409，答案不变
+    assert late_patch.status_code == 409
+    assert finished.status_code == 200 and detail.status_code == 200
+    finished_answers = finished.json()['data']['answers']
+    answers = detail.json()['data']['answers']
+    assert [(a['question_id'], a['answer'], a['is_correct'], a['time_spent']) for a in answers] == [
+        ('q1', '2', True, 30),
+        ('q2', '5', False, 90),
+    ]
+    assert answers[0]['messages'][0]['content'] == '提示一下' and answers[1]['messages'] == []
+    assert [a['question_id'] for a in finished_answers] == ['q1', 'q2']
+    assert detail.json()['data']['status'] == 'completed' and detail.json()['data']['answer_seq'] == 1
+    print(f"   ✅ 详情返回{len(answers)}个答案")
+
+
+if __name__ == "__main__":
+    test_from_answer_json()
+    test_from_answer_json_rejects_invalid_shape()
+    test_exam_answer_str()
+    test_get_answer_from_rows()
+    test_question_accuracy()
+    test_parse_answer_patch()
+    test_append_messages_without_parsing()
+    test_apply_answer_patch_rejects_stale_seq()
+    test_finish_and_get_return_answers()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+考试问题列表测试
+"""
+
+import sys
+import os
+import asyncio
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlite_database import temp_database
+from entity.goal import Goal
+from entity.question import Question
+from dao.exam_dao import exam_dao
+from dao.goal_dao import goal_dao
+from dao.question_dao import question_dao
+from dao.query_stats import track_queries
+
+from entity.exam import Exam, create_exam
+from entity.exam_question import ExamQuestion
+from entity.paper import Paper, create_paper  # 注册User.papers关系映射
+from entity.session import Session  # 注册Question.sessions关系映射
+
+
+def test_exam_question_ids():
+    """测试考试问题ID列表的读写"""
+    print("🧪 测试考试问题ID列表...")
+
+    exam = create_exam(goal_id="g1", title="期中考试", examinee_id="u1", question_ids=["q3", "q1", "q2"])
+    assert "question_ids" not in Exam.__table__.c
+    assert exam.get_question_ids() == ["q3", "q1", "q2"]
+    assert exam.is_question_ids_changed()
+    assert exam.to_dict()["question_ids"] == ["q3", "q1", "q2"]
+
+    # 从数据库加载的问题ID不需要重新保存
+    exam.set_loaded_question_ids(["q1"])
+    assert not exam.is_question_ids_changed()
+    print("   ✅ 问题ID列表正确")
+
+
+def test_paper_question_ids():
+    """测试试卷问题ID列表"""
+    print("🧪 测试试卷问题ID列表...")
+
+    paper = create_paper(title="单元测试", creator_id="u1", question_ids=["q1", "q2"])
+    assert paper.get_question_ids() == ["q1", "q2"]
+    assert paper.to_dict()["question_ids"] == ["q1", "q2"]
+    print("   ✅ 问题ID列表正确")
+
+
+def test_reverse_lookup_index():
+    """测试按问题反查考试的索引"""
+    print("🧪 测试反查索引...")
+
+    indexes = {index.name: [c.name for c in index.columns] for index in ExamQuestion.__table__.indexes}
+    assert indexes["ix_exam_question_question"][0] == "question_id"
+    assert [c.name for c in ExamQuestion.__table__.primary_key.columns] == ["exam_id", "position"]
+    print("   ✅ 索引正确")
+
+
+def test_update_question_ids_in_one_transaction():
+    """测试更新考试时问题关联和考试行在同一事务中写入，考试行更新失败时问题关联不变"""
+    print("🧪 测试问题列表与考试行一起更新...")
+
+    async def run():
+        async with temp_database():
+            await goal_dao.create(Goal(id='g1', name='目标', creator_id='u1'))
+            for qid in ('q1', 'q2', 'q3'):
+                await question_dao.create(Question(id=qid, subject='math', type='choice', title=qid, creator_id='u1'))
+            exam = Exam(id='e1', goal_id='g1', title='考试', examinee_id='u1', plan_starttime=datetime(2025, 1, 1, 8), actual_starttime=datetime(2025, 1, 1, 8))
+            exam.set_question_ids(['q1', 'q2'])
+            await exam_dao.create(exam)
+
+            exam = await exam_dao.get_by_id('e1')
+            exam.set_question_ids(['q3'])
+            # 标题不能为空，考试行的UPDATE失败
+            exam.title = None
+            try:
+                await exam_dao.update(exam)
+                raise AssertionError("应该更新失败")
+            except AssertionError:
+                raise
+            except Exception:
+                pass
+            after_failure = (await exam_dao.get_by_id('e1')).get_question_ids()
+
+            exam = await exam_dao.get_by_id('e1')
+            exam.set_question_ids(['q2', 'q3'])
+            with track_queries() as stats:
+                await exam_dao.update(exam)
+            updated = await exam_dao.get_by_id('e1')
+            return after_failure, stats, updated
+
+    after_failure, stats, updated = asyncio.run(run())
+    assert after_failure == ['q1', 'q2']
+    # 只修改问题列表时也更新考试的更新时间
+    assert any(s.startswith('UPDATE exam ') for s in stats.statements)
+    assert updated.get_question_ids() == ['q2', 'q3']
+    print(f"   ✅ 失败后问题列表: {after_failure}, 更新后: {updated.get_question_ids()}")
+
+
+if __name__ == "__main__":
+    test_exam_question_ids()
+    test_paper_question_ids()
+    test_reverse_lookup_index()
+    test_update_question_ids_in_one_transaction()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+过滤条件模式测试
+"""
+
+import sys
+import os
+import asyncio
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+from sqlalchemy import types as sa_types
+from sqlite_database import temp_database
+from api.app import app
+from utils.jwt_utils import get_current_user_id
+
+from entity.exam import Exam, ExamStatus
+from entity.paper import Paper  # 注册User.papers关系映射
+from entity.session import Session  # 注册Question.sessions关系映射
+from entity.question import Question, QuestionType, Subject
+from dao.exam_dao import exam_dao
+from dao.goal_dao import goal_dao
+from dao.question_dao import question_dao
+from dao.filter_schema import FilterSchema, LIST_OPS
+from dao.index_check import EQUALITY_OPS, RANGE_OPS, FULLTEXT_OPS
+
+
+def test_validate_coerces_values():
+    """测试参数值按列类型转换"""
+    print("🧪 测试参数值转换...")
+
+    kwargs = exam_dao.filter_schema.validate({
+        'status': {'$in': ['pending', 'ongoing']},
+        'plan_starttime': {'$gte': '2025-01-01T08:00:00'},
+        'goal_id': 'g1',
+    }, '-plan_starttime')
+    assert kwargs['status'] == {'$in': [ExamStatus.pending, ExamStatus.ongoing]}
+    assert kwargs['plan_starttime'] == {'$gte': datetime(2025, 1, 1, 8)}
+    assert kwargs['goal_id'] == 'g1'
+
+    kwargs = question_dao.filter_schema.validate({'subject': 'math', 'type': 'choice', 'is_active': 'false'})
+    assert kwargs == {'subject': Subject.MATH, 'type': QuestionType.choice, 'is_active': False}
+    print(f"   ✅ 转换后: {kwargs}")
+
+
+def test_validate_rejects_disallowed():
+    """测试拒绝未声明的字段、操作符、排序和无效的值"""
+    print("🧪 测试拒绝不允许的查询...")
+
+    cases = [
+        ({'answer_json': {'$like': 'x'}}, None),
+        ({'goal_id': {'$like': 'g'}}, None),
+        ({}, '-answer_json'),
+        ({'status': 'unknown'}, None),
+        ({'plan_starttime': {'$gte': 'yesterday'}}, None),
+    ]
+    for kwargs, order_by in cases:
+        try:
+            exam_dao.filter_schema.validate(kwargs, order_by)
+            assert False, f"应该抛出ValueError: {kwargs} {order_by}"
+        except ValueError as e:
+            print(f"   ✅ 拒绝: {e}")
+
+
+def test_validate_rejects_unindexed_combination():
+    """测试拒绝没有可用索引的过滤与排序组合"""
+    print("🧪 测试拒绝没有索引的组合...")
+
+    schema = FilterSchema(Exam, fields={'actual_starttime': ('$gte',)}, order_by=('actual_starttime',))
+    try:
+        schema.validate({'actual_starttime': {'$gte': '2025-01-01T08:00:00'}}, '-actual_starttime')
+        assert False, "应该抛出ValueError"
+    except ValueError as e:
+        print(f"   ✅ 拒绝: {e}")
+
+    # 不检查索引时允许
+    schema = FilterSchema(Exam, fields={'actual_starttime': ('$gte',)}, order_by=('actual_starttime',), require_index=False)
+    assert schema.validate({'actual_starttime': {'$gte': datetime(2025, 1, 1, 8)}}, '-actual_starttime') == {'actual_starttime': {'$gte': datetime(2025, 1, 1, 8)}}
+
+
+def test_schema_declaration_checked_at_import():
+    """测试声明不存在的字段或操作符时立即报错"""
+    print("🧪 测试模式声明检查...")
+
+    for fields, order_by in [({'nope': ('$eq',)}, ()), ({'title': ('$regex',)}, ()), ({}, ('nope',))]:
+        try:
+            FilterSchema(Question, fields=fields, order_by=order_by)
+            assert False, "应该抛出ValueError"
+        except ValueError as e:
+            print(f"   ✅ 拒绝: {e}")
+
+
+def test_endpoint_schemas_reject_full_scans():
+    """测试列表接口的过滤模式拒绝只能逐行过滤的查询，有区分度的等值前缀时允许"""
+    print("🧪 测试列表接口拒绝全表扫描...")
+
+    rejected = [
+        (exam_dao, {'title': {'$like': '期中'}}, '-plan_starttime'),
+        (exam_dao, {'status': {'$ne': 'completed'}}, '-plan_starttime'),
+        (goal_dao, {'name': {'$like': '数学'}}, None),
+    ]
+    for dao, kwargs, order_by in rejected:
+        try:
+            dao.filter_schema.validate(kwargs, order_by)
+            assert False, f"应该抛出ValueError: {kwargs}"
+        except ValueError as e:
+            print(f"   ✅ 拒绝: {e}")
+
+    # 有区分度的等值前缀时其他条件在索引范围内过滤；布尔列条件按索引顺序读取
+    assert exam_dao.filter_schema.validate({'goal_id': 'g1', 'status': {'$ne': 'completed'}}, '-plan_starttime')
+    assert goal_dao.filter_schema.validate({'creator_id': 'u1', 'name': '数学'})
+    assert question_dao.filter_schema.validate({'is_active': 'true'}) == {'is_active': True}
+
+
+# 每个字段单独过滤时使用的示例值，枚举字段使用第一个枚举值
+SAMPLE_VALUES = {
+    'goal_id': 'g1', 'examinee_id': 'u1', 'creator_id': 'u1', 'title': '期中考试', 'name': '数学',
+    'is_active': 'true', 'plan_starttime': '2025-01-01T08:00:00',
+}
+
+
+def sample_value(Clazz, name: str) -> str:
+    column_type = Clazz.__table__.c[name].type
+    if isinstance(column_type, sa_types.Enum):
+        return next(iter(column_type.enum_class)).value
+    return SAMPLE_VALUES[name]
+
+
+def test_every_declared_field_usable_alone():
+    """测试过滤模式声明的每个字段单独使用可以走索引的操作符过滤时都能通过校验"""
+    print("🧪 测试声明的字段单独过滤...")
+
+    checked = []
+    for dao in (exam_dao, goal_dao, question_dao):
+        schema = dao.filter_schema
+        for name, (ops, _) in schema._fields.items():
+            for op in sorted(ops & set(EQUALITY_OPS + RANGE_OPS + FULLTEXT_OPS)):
+                value = sample_value(schema.Clazz, name)
+                if op in LIST_OPS:
+                    value = [value, value]
+                kwargs = {name: value if op == '$eq' else {op: value}}
+                # 不指定排序和按每个允许的排序字段排序都可以
+                for order_by in (None, *(f'-{field}' for field in schema._order_fields)):
+                    try:
+                        schema.validate(kwargs, order_by)
+                    except ValueError as e:
+                        raise AssertionError(f"{schema.Clazz.__name__}.{name} {op} 排序{order_by}: {e}")
+                checked.append(f"{schema.Clazz.__name__}.{name}{op}")
+    print(f"   ✅ 检查了{len(checked)}种过滤")
+
+
+def test_exam_list_rejects_full_scan():
+    """测试考试列表接口对没有可用索引的过滤返回400"""
+    print("🧪 测试考试列表接口...")
+
+    async def run():
+        async with temp_database():
+            app.dependency_overrides[get_current_user_id] = lambda: 'u1'
+            try:
+                transport = httpx.ASGITransport(app=app)
+                async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+                    return [
+                        await client.get('/api/exam/list', params=params)
+                        for params in ({'title__like': '期中'}, {'status__ne': 'completed'}, {'goal_id': 'g1', 'status__ne': 'completed'})
+                    ]
+            finally:
+                app.dependency_overrides.pop(get_current_user_id, None)
+
+    like, not_equal, prefixed = asyncio.run(run())
+    assert like.status_code == 400 and not_equal.status_code == 400
+    assert prefixed.status_code == 200 and prefixed.json()['data']['total'] == 0
+    print(f"   ✅ title__like: {like.status_code}, status__ne: {not_equal.status_code}, goal_id+status__ne: {prefixed.status_code}")
+
+
+def test_single_field_list_filters():
+    """测试目标按名称、问题按题型单独过滤的列表接口返回200"""
+    print("🧪 测试单字段过滤的列表接口...")
+
+    async def run():
+        async with temp_database():
+            app.dependency_overrides[get_current_user_id] = lambda: 'u1'
+            try:
+                transport = httpx.ASGITransport(app=app)
+                async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+                    return [
+                        await client.get('/api/goal/list', params={'name': '数学'}),
+                        await client.get('/api/question/list', params={'question_type': 'choice'}),
+                    ]
+            finally:
+                app.dependency_overrides.pop(get_current_user_id, None)
+
+    for response in asyncio.run(run()):
+        assert response.status_code == 200, response.text
+        assert response.json()['data']['total'] == 0
+    print("   ✅ name、question_type过滤: 200")
+
+
+if __name__ == "__main__":
+    test_validate_coerces_values()
+    test_validate_rejects_disallowed()
+    test_validate_rejects_unindexed_combination()
+    test_schema_declaration_checked_at_import()
+    test_endpoint_schemas_reject_full_scans()
+    test_every_declared_field_usable_alone()
+    test_exam_list_rejects_full_scan()
+    test_single_field_list_filters()
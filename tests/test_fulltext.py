@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+问题全文搜索测试
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy.dialects import mysql, sqlite
+from sqlmodel import select
+from entity.question import Question
+from entity.paper import Paper  # 注册User.papers关系映射
+from entity.session import Session  # 注册Question.sessions关系映射
+from entity.fulltext import fulltext_match, fulltext_score
+from dao.question_dao import question_dao
+
+
+def _compile(statement, dialect) -> str:
+    return str(statement.compile(dialect=dialect))
+
+
+def test_match_mysql():
+    """测试MySQL使用MATCH ... AGAINST"""
+    print("🧪 测试MySQL全文搜索...")
+
+    statement = select(Question).where(fulltext_match(Question.title, "二次方程"))
+    sql = _compile(statement, mysql.dialect())
+    assert "MATCH (question.title, question.material) AGAINST" in sql
+    assert "= 1" not in sql
+
+    # 短于分词长度时退化为LIKE
+    sql = _compile(select(Question).where(fulltext_match(Question.title, "方")), mysql.dialect())
+    assert "LIKE" in sql
+    print("   ✅ SQL正确")
+
+
+def test_match_sqlite():
+    """测试SQLite使用FTS5表"""
+    print("🧪 测试SQLite全文搜索...")
+
+    statement = select(Question).where(fulltext_match(Question.title, "二次方程")).order_by(
+        fulltext_score(Question, "title", "二次方程").desc()
+    )
+    sql = _compile(statement, sqlite.dialect())
+    assert "question_fts MATCH" in sql
+    assert "bm25(question_fts)" in sql
+    print("   ✅ SQL正确")
+
+
+def test_match_filter_and_order():
+    """测试$match过滤条件与相关度排序"""
+    print("🧪 测试$match过滤条件...")
+
+    # 未指定排序时按相关度排序
+    order_clauses = question_dao._build_order_clauses(Question, {"title": {"$match": "二次方程"}}, None)
+    assert "bm25" in _compile(select(Question).order_by(*order_clauses), sqlite.dialect())
+
+    # 指定排序时按指定字段排序
+    order_clauses = question_dao._build_order_clauses(Question, {"title": {"$match": "二次方程"}}, "-created_at")
+    assert "bm25" not in _compile(select(Question).order_by(*order_clauses), sqlite.dialect())
+
+    for kwargs, cursor in [({"tip": {"$match": "方程"}}, None), ({"title": {"$match": "方程"}}, "abc")]:
+        try:
+            question_dao._build_filters(Question, kwargs)
+            question_dao._build_order_clauses(Question, kwargs, None, cursor)
+            assert False, "应该抛出ValueError"
+        except ValueError as e:
+            print(f"   ✅ 拒绝: {e}")
+
+
+if __name__ == "__main__":
+    test_match_mysql()
+    test_match_sqlite()
+    test_match_filter_and_order()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+索引覆盖检查测试
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from entity.exam import Exam
+from entity.question import Question
+from entity.user import User
+from entity.paper import Paper  # 注册User.papers关系映射
+from entity.session import Session  # 注册Question.sessions关系映射
+from dao.index_check import find_covering_index, check_index_coverage, get_uncovered_shapes
+
+
+def test_declared_indexes():
+    """测试实体声明的索引"""
+    print("🧪 测试实体索引...")
+
+    exam_indexes = {index.name: [c.name for c in index.columns] for index in Exam.__table__.indexes}
+    assert exam_indexes["ix_exam_examinee_deleted_plan"] == ["examinee_id", "is_deleted", "plan_starttime"]
+
+    user_indexes = {index.name for index in User.__table__.indexes}
+    assert {"ix_user_name", "ix_user_phone"} <= user_indexes
+    print(f"   ✅ 考试索引: {list(exam_indexes)}")
+
+
+def test_find_covering_index():
+    """测试查找可用索引"""
+    print("🧪 测试查找可用索引...")
+
+    # 等值条件命中有区分度的前缀优先
+    assert find_covering_index(Exam.__table__, ["is_deleted", "examinee_id"], [], ["plan_starttime", "id"]) == "ix_exam_examinee_deleted_plan"
+    # 只有is_deleted时按排序列使用索引
+    assert find_covering_index(Exam.__table__, ["is_deleted"], [], ["plan_starttime", "id"]) == "ix_exam_deleted_plan"
+    # 范围条件
+    assert find_covering_index(Exam.__table__, ["is_deleted"], ["plan_starttime"], ["id"]) == "ix_exam_deleted_plan"
+    # 单独按题型过滤
+    assert find_covering_index(Question.__table__, ["is_deleted", "type"], [], ["created_at", "id"]) == "ix_question_type_deleted"
+    # 没有可用索引
+    assert find_covering_index(Question.__table__, ["is_deleted", "title"], [], ["created_at", "id"]) is None
+    # 按主键顺序读取时，只有布尔列条件可以逐行过滤，其他条件可能扫描整张表
+    assert find_covering_index(Question.__table__, ["is_deleted", "is_active"], [], ["id"]) == "PRIMARY"
+    assert find_covering_index(Question.__table__, ["is_deleted", "title"], [], ["id"]) is None
+    assert find_covering_index(Question.__table__, ["is_deleted"], [], ["id"], ["title"]) is None
+    assert find_covering_index(Exam.__table__, ["is_deleted"], [], ["plan_starttime", "id"], ["status"]) is None
+    assert find_covering_index(Exam.__table__, ["is_deleted", "goal_id"], [], ["plan_starttime", "id"], ["status"]) == "ix_exam_goal_deleted_plan"
+    print("   ✅ 索引选择正确")
+
+
+def test_check_index_coverage():
+    """测试记录没有可用索引的查询"""
+    print("🧪 测试索引覆盖检查...")
+
+    assert check_index_coverage(Question, {"creator_id": "u1"}, ["id"]) == "ix_question_creator_deleted"
+    assert check_index_coverage(Question, {"title": {"$like": "方程"}}, ["created_at", "id"]) is None
+
+    shapes = get_uncovered_shapes()
+    assert any(shape["entity"] == "Question" and shape["order_by"] == ["created_at", "id"] for shape in shapes)
+    print(f"   ✅ 未覆盖的查询: {shapes}")
+
+
+if __name__ == "__main__":
+    test_declared_indexes()
+    test_find_covering_index()
+    test_check_index_coverage()
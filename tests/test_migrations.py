@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+数据库迁移测试，使用临时SQLite数据库
+"""
+
+import sys
+import os
+import asyncio
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import inspect as sa_inspect, text
+from sqlite_database import temp_database
+from entity.session import Session, TopicType
+from entity.message import create_message, MessageRole, MessageType
+from dao.database import get_async_engine
+from dao.migrations import run_migrations, schema_migration_table
+from dao.session_dao import session_dao
+
+
+def test_upgrade_creates_session_message():
+    """测试升级没有session_message表的数据库时由迁移建表，旧的消息列表在读取时迁移"""
+    print("🧪 测试迁移创建会话消息表...")
+
+    async def run():
+        async with temp_database():
+            # 模拟session_message表之前的数据库: 删除表和迁移记录
+            engine = get_async_engine()
+            async with engine.begin() as conn:
+                await conn.execute(text("DROP TABLE session_message"))
+                await conn.execute(schema_migration_table.delete())
+            session = Session(topic=TopicType.GUIDE)
+            session.messages = '[{"role": "user", "content": "旧消息", "message_type": "text", "timestamp": "2025-01-01T08:00:00+00:00"}]'
+            await session_dao.create(session)
+
+            applied = await run_migrations()
+            async with engine.connect() as conn:
+                unique = await conn.run_sync(lambda sync_conn: sa_inspect(sync_conn).get_unique_constraints("session_message"))
+            await session_dao.add_message(session.id, create_message(role=MessageRole.USER, content='新消息', message_type=MessageType.TEXT))
+            return applied, unique, await session_dao.get_messages(session.id), await run_migrations()
+
+    applied, unique, messages, again = asyncio.run(run())
+    assert '0009' in applied
+    assert [(c['name'], c['column_names']) for c in unique] == [('uq_session_message_session_seq', ['session_id', 'seq'])]
+    assert [m.content for m in messages] == ['旧消息', '新消息']
+    assert again == []
+    print(f"   ✅ 执行迁移: {applied}")
+
+
+if __name__ == "__main__":
+    test_upgrade_creates_session_message()
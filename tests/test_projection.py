@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+列表查询字段投影测试
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlmodel import select
+from entity.exam import Exam
+from entity.question import Question, create_question
+from entity.paper import Paper  # 注册User.papers关系映射
+from entity.session import Session  # 注册Question.sessions关系映射
+from dao.exam_dao import exam_dao
+
+
+def test_list_fields_skip_heavy_columns():
+    """测试列表默认字段不包含大字段"""
+    print("🧪 测试列表默认字段...")
+
+    assert "answer_json" not in Exam.get_list_fields()
+    assert "material" not in Question.get_list_fields()
+    assert "title" in Question.get_list_fields()
+    print(f"   ✅ 考试列表字段: {Exam.get_list_fields()}")
+
+
+def test_load_options_select_only_fields():
+    """测试只查询指定字段以及游标需要的排序字段"""
+    print("🧪 测试字段投影...")
+
+    order_fields = exam_dao._parse_order_fields(Exam, "-plan_starttime")
+    options = exam_dao._build_load_options(Exam, ["title"], order_fields)
+    sql = str(select(Exam).options(*options))
+    assert "exam.title" in sql and "exam.plan_starttime" in sql and "exam.id" in sql
+    assert "answer_json" not in sql
+
+    try:
+        exam_dao._build_load_options(Exam, ["nope"], order_fields)
+        assert False, "未知字段应该报错"
+    except ValueError as e:
+        print(f"   ✅ 未知字段: {e}")
+
+
+def test_to_dict_of_new_entity():
+    """测试新构造的实体没有未加载的字段"""
+    print("🧪 测试新实体转换...")
+
+    question = create_question(subject="math", type="choice", title="1+1=?", creator_id="u1")
+    assert question.get_unloaded_fields() == set()
+    assert "material" in question.to_dict()
+    print("   ✅ 全部字段")
+
+
+if __name__ == "__main__":
+    test_list_fields_skip_heavy_columns()
+    test_load_options_select_only_fields()
+    test_to_dict_of_new_entity()
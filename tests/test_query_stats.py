@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+SQL查询统计测试
+"""
+
+import sys
+import os
+import asyncio
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlite_database import temp_database
+from api.app import app
+from entity.user import User
+from dao.query_stats import assert_max_queries, instrument_engine, normalize_statement, track_queries
+from dao.question_dao import question_dao
+from dao.user_dao import user_dao
+from utils.jwt_utils import get_current_user_id
+
+
+def test_normalize_statement():
+    """测试IN参数个数不同的语句视为同一形状"""
+    print("🧪 测试语句形状...")
+
+    a = normalize_statement("SELECT * FROM user WHERE user.id IN (?, ?, ?)")
+    b = normalize_statement("SELECT *\n  FROM user WHERE user.id IN (?, ?)")
+    c = normalize_statement("SELECT * FROM user WHERE user.id IN (%s, %s, %s, %s)")
+    assert a == b == "SELECT * FROM user WHERE user.id IN (?)"
+    assert c == a
+    print(f"   ✅ 形状: {a}")
+
+
+async def _run_queries(engine, times: int) -> None:
+    async with engine.connect() as conn:
+        for i in range(times):
+            await conn.execute(text("SELECT :value"), {'value': i})
+
+
+def test_track_queries_and_repeated():
+    """测试统计语句数量并找出重复执行的语句"""
+    print("🧪 测试请求内语句统计...")
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'stats.db')}")
+    instrument_engine(engine)
+
+    async def run():
+        try:
+            await _run_queries(engine, 2)  # 不在统计中的语句不计入
+            with track_queries() as stats:
+                await _run_queries(engine, 6)
+            return stats
+        finally:
+            await engine.dispose()
+
+    stats = asyncio.run(run())
+    assert stats.count == 6
+    assert stats.total_time > 0
+    assert stats.get_repeated(5) == [("SELECT ?", 6)]
+    assert stats.get_repeated(7) == []
+    print(f"   ✅ 统计: {stats.get_summary()}")
+
+
+def test_assert_max_queries():
+    """测试超过查询次数上限时断言失败并列出语句"""
+    print("🧪 测试查询次数断言...")
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'stats.db')}")
+    instrument_engine(engine)
+
+    async def run(times: int, max_count: int):
+        with assert_max_queries(max_count):
+            await _run_queries(engine, times)
+
+    try:
+        asyncio.run(run(3, 3))
+        try:
+            asyncio.run(run(4, 3))
+        except AssertionError as e:
+            assert "执行了4条语句" in str(e)
+            print(f"   ✅ 断言失败: {str(e).splitlines()[0]}")
+        else:
+            raise AssertionError("超过上限时应断言失败")
+    finally:
+        asyncio.run(engine.dispose())
+
+
+def test_batch_create_query_count():
+    """测试批量创建问题的语句数与问题数和创建人数无关"""
+    print("🧪 测试批量创建问题的语句数...")
+
+    creator_ids = ['u1', 'u2', 'u3']
+    questions = [
+        {'subject': 'math', 'type': 'choice', 'title': f'题目{i}', 'creator_id': creator_ids[i % 3]}
+        for i in range(12)
+    ]
+
+    async def run():
+        async with temp_database():
+            for creator_id in creator_ids:
+                await user_dao.create(User(id=creator_id, name=creator_id, password='x'))
+            app.dependency_overrides[get_current_user_id] = lambda: 'u1'
+            try:
+                transport = httpx.ASGITransport(app=app)
+                async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+                    # 一次查询校验所有创建人，一条INSERT写入所有问题
+                    with assert_max_queries(2) as stats:
+                        created = await client.post('/api/question/batch-create', json={'questions': questions})
+                    with assert_max_queries(1):
+                        missing = await client.post('/api/question/batch-create', json={'questions': [
+                            *questions[:2], {**questions[2], 'creator_id': 'missing'},
+                        ]})
+            finally:
+                app.dependency_overrides.pop(get_current_user_id, None)
+            return created, stats, missing, await question_dao.count_by_kwargs({'creator_id': {'$in': creator_ids}})
+
+    created, stats, missing, count = asyncio.run(run())
+    assert created.status_code == 200, created.text
+    assert len(created.json()['data']['questions']) == 12 and count == 12
+    assert missing.status_code == 404
+    print(f"   ✅ 创建12个问题执行了{stats.count}条语句")
+
+
+if __name__ == "__main__":
+    test_normalize_statement()
+    test_track_queries_and_repeated()
+    test_assert_max_queries()
+    test_batch_create_query_count()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+只读库选择测试
+"""
+
+import sys
+import os
+import asyncio
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlite_database import sqlite_url, temp_database
+from entity.question import Question
+from config.settings import Settings
+from dao.cache import entity_cache
+from dao.database import select_read_index
+from dao.question_dao import question_dao
+from dao.unit_of_work import unit_of_work
+
+
+def fake_engine(checked_out: int):
+    """只有连接池使用中连接数的引擎"""
+    pool = SimpleNamespace(checkedout=lambda: checked_out)
+    return SimpleNamespace(sync_engine=SimpleNamespace(pool=pool))
+
+
+def test_round_robin():
+    """测试轮询选择只读库"""
+    print("🧪 测试轮询...")
+
+    engines = [fake_engine(0), fake_engine(0), fake_engine(0)]
+    first = select_read_index(engines, "round_robin")
+    selected = [select_read_index(engines, "round_robin") for _ in range(3)]
+    assert selected == [(first + i) % 3 for i in range(1, 4)]
+    print(f"   ✅ 选择顺序: {selected}")
+
+
+def test_least_busy():
+    """测试选择使用中连接最少的只读库"""
+    print("🧪 测试最少使用中连接...")
+
+    engines = [fake_engine(5), fake_engine(1), fake_engine(3)]
+    assert select_read_index(engines, "least_busy") == 1
+    print("   ✅ 选择了第2个只读库")
+
+
+def test_read_strategy_validated():
+    """测试不支持的只读库选择策略在加载配置时报错"""
+    print("🧪 测试只读库选择策略校验...")
+
+    assert Settings(DATABASE_READ_STRATEGY='least_busy').DATABASE_READ_STRATEGY == 'least_busy'
+    try:
+        Settings(DATABASE_READ_STRATEGY='random')
+    except ValidationError as e:
+        print(f"   ✅ 配置错误: {e.errors()[0]['msg']}")
+    else:
+        raise AssertionError("不支持的策略应报错")
+    try:
+        select_read_index([fake_engine(0)], 'random')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("不支持的策略应报错")
+
+
+def make_question(id: str, title: str) -> Question:
+    return Question(id=id, subject='math', type='choice', title=title, creator_id='u1')
+
+
+async def add_to_replica(path: str, question: Question) -> None:
+    """直接写入只读库文件，模拟只读库与主库内容不同"""
+    engine = create_async_engine(sqlite_url(path))
+    try:
+        async with AsyncSession(engine) as session:
+            session.add(question)
+            await session.commit()
+    finally:
+        await engine.dispose()
+
+
+async def titles(kwargs: dict) -> list:
+    return [question.title for question in await question_dao.search_by_kwargs(kwargs)]
+
+
+def test_read_routing_with_two_databases():
+    """测试只读查询使用只读库，写入之后同一请求的读取使用主库"""
+    print("🧪 测试只读库路由和读自己的写...")
+
+    async def write_in_other_request(question: Question) -> None:
+        # 写操作在单独的任务(请求)中，不影响当前任务的读库选择
+        await asyncio.create_task(question_dao.create(question))
+
+    async def read_after_write() -> list:
+        await question_dao.update(Question(id='q1', title='主库修改后'))
+        return await titles({'id': 'q1'})
+
+    async def unit_of_work_reads() -> tuple:
+        async with unit_of_work():
+            before = await titles({'id': 'q1'})
+            await question_dao.update(Question(id='q1', title='事务中修改'))
+            after = await titles({'id': 'q1'})
+        return before, after
+
+    async def run():
+        async with temp_database(replicas=1) as paths:
+            await write_in_other_request(make_question('q1', '主库'))
+            await add_to_replica(paths[1], make_question('q1', '只读库'))
+            routed = await titles({'id': 'q1'})
+            # 按ID读取会写入实体缓存，从主库读取
+            cached = (await question_dao.get_by_id('q1')).title
+            entity_cache.enabled = False
+            try:
+                uncached = (await question_dao.get_by_id('q1')).title
+            finally:
+                entity_cache.enabled = True
+            written = await asyncio.create_task(read_after_write())
+            in_unit_of_work = await asyncio.create_task(unit_of_work_reads())
+            return routed, cached, uncached, written, in_unit_of_work
+
+    routed, cached, uncached, written, (before, after) = asyncio.run(run())
+    assert routed == ['只读库']
+    assert cached == '主库'
+    assert uncached == '只读库'
+    assert written == ['主库修改后']
+    assert before == ['只读库'] and after == ['事务中修改']
+    print(f"   ✅ 只读查询: {routed}, 写入后: {written}, 工作单元中: {before} -> {after}")
+
+
+if __name__ == "__main__":
+    test_round_robin()
+    test_least_busy()
+    test_read_strategy_validated()
+    test_read_routing_with_two_databases()
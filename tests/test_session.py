@@ -9,6 +9,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from entity.session import Session, TopicType, create_session
 from entity.message import Message, MessageRole, MessageType
+from entity.paper import Paper  # 注册User.papers关系映射
 from datetime import datetime
 
 
@@ -104,6 +105,31 @@ def test_session_with_goal():
     print("Goal会话测试完成！\n")
 
 
+def test_session_message_window():
+    """测试会话消息追加与窗口读取"""
+    print("=== 测试会话消息窗口 ===")
+
+    session = create_session(topic=TopicType.GOSSIP)
+    for i in range(5):
+        session.add_message(Message(role=MessageRole.USER, content=f"消息{i}"))
+
+    # 新消息在保存前都处于待写入状态
+    assert len(session.get_pending_messages()) == 5
+    assert [m.content for m in session.get_messages(last_n=2)] == ["消息3", "消息4"]
+    assert session.get_messages(last_n=0) == []
+
+    # 保存后只保留已加载的消息
+    session.mark_messages_saved()
+    assert session.get_pending_messages() == []
+    assert len(session.get_messages()) == 5
+
+    # 不再改写JSON字段
+    assert session.messages is None
+    assert len(session.to_dict()["messages"]) == 5
+
+    print("会话消息窗口测试完成！\n")
+
+
 if __name__ == "__main__":
     print("开始测试Session相关功能...\n")
     
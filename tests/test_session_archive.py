@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+会话归档测试
+"""
+
+import sys
+import os
+import asyncio
+from datetime import datetime, timedelta, timezone
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import func, select
+from sqlite_database import temp_database
+
+from entity.paper import Paper  # 注册User.papers关系映射
+from entity.session import Session, TopicType
+from entity.session_message import SessionMessage
+from entity.session_archive import SessionArchive
+from entity.message import create_message, MessageRole, MessageType
+from dao.database import get_async_session_maker
+from dao.session_dao import session_dao, _dump_row, _load_row
+from utils.compression import compress_json, decompress_json
+
+
+def test_archive_payload_roundtrip():
+    """测试会话和消息行压缩后能还原为原来的实体"""
+    print("🧪 测试归档数据还原...")
+
+    session = Session(topic=TopicType.GOSSIP, question_id='q1', created_at=datetime(2025, 1, 1, 8), updated_at=datetime(2025, 1, 2, 8))
+    message = create_message(role=MessageRole.USER, content='你好，我有一个问题' * 50, message_type=MessageType.TEXT)
+    row = SessionMessage.from_message(session.id, 1, message)
+
+    payload = compress_json({'session': _dump_row(session), 'messages': [_dump_row(row)]})
+    data = decompress_json(payload)
+    restored = _load_row(Session, data['session'])
+    restored_row = _load_row(SessionMessage, data['messages'][0])
+
+    assert restored.id == session.id
+    assert restored.topic == TopicType.GOSSIP
+    assert restored.updated_at == datetime(2025, 1, 2, 8)
+    assert restored_row.to_message().content == message.content
+    assert restored_row.timestamp == row.timestamp
+    assert len(payload) < len(row.content.encode('utf-8'))
+    print(f"   ✅ 压缩后{len(payload)}字节，消息原文{len(row.content.encode('utf-8'))}字节")
+
+
+def test_archive_policy():
+    """测试闲聊会话的保留时间比其他主题短"""
+    print("🧪 测试归档策略...")
+
+    policy = session_dao.get_archive_policy()
+    assert set(policy) == set(TopicType)
+    assert all(policy[TopicType.GOSSIP] < policy[topic] for topic in TopicType if topic != TopicType.GOSSIP)
+    assert all(isinstance(retention, timedelta) for retention in policy.values())
+    print(f"   ✅ 保留时间: { {topic.value: retention.days for topic, retention in policy.items()} }")
+
+
+async def create_idle_session(topic: TopicType, idle_days: int, now: datetime, message_count: int = 2) -> Session:
+    """创建最后活动时间在idle_days天前、带有message_count条消息的会话"""
+    session = Session(topic=topic, created_at=now - timedelta(days=idle_days + 1))
+    for i in range(message_count):
+        session.add_message(create_message(role=MessageRole.USER, content=f'第{i + 1}条消息', message_type=MessageType.TEXT))
+    session.updated_at = now - timedelta(days=idle_days)
+    return await session_dao.create(session)
+
+
+async def count_rows() -> dict:
+    """会话表、消息表、归档表中的行数"""
+    session_maker = await get_async_session_maker()
+    async with session_maker() as db_session:
+        return {
+            Clazz.__tablename__: (await db_session.execute(select(func.count()).select_from(Clazz))).scalar()
+            for Clazz in (Session, SessionMessage, SessionArchive)
+        }
+
+
+def test_archive_and_restore_on_sqlite():
+    """测试空闲会话归档后从会话表和消息表删除，读取或追加消息时恢复"""
+    print("🧪 测试SQLite会话归档和恢复...")
+
+    now = datetime.now(timezone.utc)
+
+    async def run():
+        async with temp_database():
+            old = await create_idle_session(TopicType.GUIDE, 200, now)
+            recent = await create_idle_session(TopicType.GUIDE, 30, now)
+            gossip = await create_idle_session(TopicType.GOSSIP, 20, now)
+            archived = await session_dao.archive_idle_sessions(now=now, batch_size=1)
+            after_archive = await count_rows()
+            restored = await session_dao.get_by_id(old.id)
+            appended = await session_dao.add_message(gossip.id, create_message(role=MessageRole.USER, content='回来了', message_type=MessageType.TEXT))
+            after_restore = await count_rows()
+            gossip_messages = await session_dao.get_messages(gossip.id)
+            # 恢复后重新计算空闲时间，不会被立即再次归档
+            archived_again = await session_dao.archive_idle_sessions(now=now)
+            return recent, archived, after_archive, restored, appended, after_restore, gossip_messages, archived_again, await session_dao.get_by_id('missing')
+
+    recent, archived, after_archive, restored, appended, after_restore, gossip_messages, archived_again, missing = asyncio.run(run())
+    # 超过保留时间的指导会话(90天)和闲聊会话(14天)被归档，30天前的指导会话保留
+    assert archived == 2
+    assert after_archive == {'session': 1, 'session_message': 2, 'session_archive': 2}
+    assert [message.content for message in restored.get_messages()] == ['第1条消息', '第2条消息']
+    assert restored.topic == TopicType.GUIDE and restored.updated_at.replace(tzinfo=timezone.utc) >= now
+    assert appended is not None
+    assert [message.content for message in gossip_messages] == ['第1条消息', '第2条消息', '回来了']
+    assert after_restore == {'session': 3, 'session_message': 7, 'session_archive': 0}
+    assert archived_again == 0
+    assert missing is None
+    print(f"   ✅ 归档{archived}个会话，恢复后: {after_restore}")
+
+
+def test_concurrent_restore_on_sqlite():
+    """测试并发恢复同一个会话: 只恢复一次，写回会话时主键冲突的请求读取已恢复的会话"""
+    print("🧪 测试并发恢复归档会话...")
+
+    now = datetime.now(timezone.utc)
+
+    async def run():
+        async with temp_database():
+            first = await create_idle_session(TopicType.GUIDE, 200, now)
+            second = await create_idle_session(TopicType.GUIDE, 200, now)
+            await session_dao.archive_idle_sessions(now=now)
+            sessions = await asyncio.gather(*[session_dao.get_by_id(first.id) for _ in range(3)])
+            after_gather = await count_rows()
+
+            # 模拟其他进程已写回会话但还没有删除归档行: 写回时主键冲突，改为读取已恢复的会话
+            session_maker = await get_async_session_maker()
+            async with session_maker() as db_session:
+                db_session.add(Session(id=second.id, topic=TopicType.GUIDE))
+                await db_session.commit()
+            conflicted = await session_dao._restore_archived(second.id)
+            return sessions, after_gather, conflicted, second, await count_rows()
+
+    sessions, after_gather, conflicted, second, after_conflict = asyncio.run(run())
+    assert all(session is not None and len(session.get_messages()) == 2 for session in sessions)
+    assert after_gather == {'session': 1, 'session_message': 2, 'session_archive': 1}
+    assert conflicted is not None and conflicted.id == second.id
+    # 冲突的保存点已回滚，归档行和其他进程写回的会话都不受影响
+    assert after_conflict == {'session': 2, 'session_message': 2, 'session_archive': 1}
+    print(f"   ✅ 并发恢复后: {after_gather}")
+
+
+if __name__ == "__main__":
+    test_archive_payload_roundtrip()
+    test_archive_policy()
+    test_archive_and_restore_on_sqlite()
+    test_concurrent_restore_on_sqlite()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+会话消息追加写入测试，使用临时SQLite数据库
+"""
+
+import sys
+import os
+import asyncio
+import inspect
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlite_database import temp_database
+from entity.session import Session, TopicType
+from entity.message import create_message, MessageRole, MessageType
+from dao.base_dao import BaseDao
+from dao.session_dao import SessionDAO, session_dao
+from dao.query_stats import track_queries
+
+
+def user_message(content: str):
+    return create_message(role=MessageRole.USER, content=content, message_type=MessageType.TEXT)
+
+
+def test_update_writes_messages_and_row_once():
+    """测试更新会话时新消息和会话字段在同一事务中写入，会话行只更新一次"""
+    print("🧪 测试会话更新...")
+
+    async def run():
+        async with temp_database():
+            session = await session_dao.create(Session(topic=TopicType.GUIDE))
+            session = await session_dao.get_by_id(session.id)
+            session.add_message(user_message('第一条'))
+            session.topic = TopicType.RAISE
+            with track_queries() as stats:
+                returned = await session_dao.update(session)
+            refreshed = await session_dao.update(session, refresh=True)
+            return session, returned, stats, refreshed
+
+    session, returned, stats, refreshed = asyncio.run(run())
+    session_updates = [s for s in stats.statements if s.startswith('UPDATE session ')]
+    assert len(session_updates) == 1 and 'topic' in session_updates[0]
+    assert returned is session
+    assert refreshed is not session and refreshed.topic == TopicType.RAISE
+    assert [m.content for m in refreshed.get_messages()] == ['第一条']
+    print(f"   ✅ 语句: {len(stats.statements)}条，其中会话行UPDATE {len(session_updates)}条")
+
+
+def test_update_failure_rolls_back_messages():
+    """测试会话行更新失败时新消息也不写入"""
+    print("🧪 测试会话更新失败回滚...")
+
+    async def run():
+        async with temp_database():
+            session = await session_dao.create(Session(topic=TopicType.GUIDE))
+            session = await session_dao.get_by_id(session.id)
+            session.add_message(user_message('不应写入'))
+            # topic不能为空，会话行的UPDATE失败
+            session.topic = None
+            try:
+                await session_dao.update(session)
+                raise AssertionError("应该更新失败")
+            except AssertionError:
+                raise
+            except Exception as e:
+                error = e
+            return error, await session_dao.get_messages(session.id)
+
+    error, messages = asyncio.run(run())
+    assert messages == []
+    print(f"   ✅ 更新失败({type(error).__name__})，没有写入消息")
+
+
+def test_update_signature_matches_base():
+    """测试SessionDAO.update保留BaseDao.update的refresh参数"""
+    assert list(inspect.signature(SessionDAO.update).parameters) == list(inspect.signature(BaseDao.update).parameters)
+    assert inspect.signature(SessionDAO.update).parameters['refresh'].default is None
+
+
+if __name__ == "__main__":
+    test_update_writes_messages_and_row_once()
+    test_update_failure_rolls_back_messages()
+    test_update_signature_matches_base()
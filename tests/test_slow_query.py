@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+慢查询日志测试
+"""
+
+import sys
+import os
+import asyncio
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel, select
+from entity.paper import Paper  # 注册User.papers关系映射
+from entity.session import Session  # 注册Question.sessions关系映射
+from entity.user import User
+from dao.slow_query import SlowQueryLog, redact_params, slow_query_log
+from config.settings import settings
+from api.app import app
+from utils.jwt_utils import get_current_user_id
+
+
+def test_redact_params():
+    """测试隐藏敏感参数并截断长字符串"""
+    print("🧪 测试参数脱敏...")
+
+    params = redact_params({'password_1': 'secret', 'phone': {'$in': ['138']}, 'title_1': 'x' * 100, 'limit': 10})
+    assert params['password_1'] == '***'
+    assert params['phone'] == '***'
+    assert params['title_1'] == 'x' * 64 + '...'
+    assert params['limit'] == 10
+    print(f"   ✅ 脱敏后: {params}")
+
+
+def test_record_slow_query_with_explain():
+    """测试超过阈值的查询被记录并获取执行计划，缓冲区只保留最近的记录"""
+    print("🧪 测试慢查询记录...")
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'slow.db')}")
+    log = SlowQueryLog(max_size=2, threshold_ms=100)
+    statement = select(User).where(User.id.in_(['a', 'b', 'c']), User.password == 'secret')
+
+    async def run():
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(SQLModel.metadata.create_all)
+            assert log.record(engine, statement, 0.05, "User.search_by_kwargs") is None
+            for _ in range(3):
+                log.record(engine, statement, 0.2, "User.search_by_kwargs", {'password': 'secret'})
+            await log.wait_explains()
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
+    records = log.get_records()
+    assert [record['id'] for record in records] == [3, 2]
+    record = records[0]
+    assert record['duration_ms'] == 200.0
+    assert record['filters'] == {'password': '***'}
+    assert "IN (?, ?, ?)" in record['sql']
+    assert 'secret' not in str(record['params'])
+    # 同一条SQL只获取一次执行计划，写入所有记录
+    assert all(isinstance(r['explain'], list) and r['explain'] for r in records)
+    print(f"   ✅ 记录: {record['operation']} {record['duration_ms']}ms, 执行计划: {record['explain']}")
+
+
+def test_slow_query_endpoints_require_admin():
+    """测试慢查询接口只允许ADMIN_USER_IDS中的用户访问，其他诊断接口不受影响"""
+    print("🧪 测试慢查询接口权限...")
+
+    async def call(user_id: str):
+        app.dependency_overrides[get_current_user_id] = lambda: user_id
+        try:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+                return [
+                    (await client.get('/api/diagnostics/slow-queries')).status_code,
+                    (await client.delete('/api/diagnostics/slow-queries')).status_code,
+                    (await client.get('/api/diagnostics/cache')).status_code,
+                ]
+        finally:
+            app.dependency_overrides.pop(get_current_user_id, None)
+
+    original = settings.ADMIN_USER_IDS
+    try:
+        settings.ADMIN_USER_IDS = None
+        unconfigured = asyncio.run(call('admin'))
+        settings.ADMIN_USER_IDS = 'ops, admin'
+        slow_query_log._records.append({'id': 0, 'sql': 'SELECT 1'})
+        user = asyncio.run(call('u1'))
+        remaining = slow_query_log.get_stats()['size']
+        admin = asyncio.run(call('admin'))
+    finally:
+        settings.ADMIN_USER_IDS = original
+        slow_query_log.clear()
+
+    assert unconfigured == [403, 403, 200]
+    assert user == [403, 403, 200] and remaining == 1
+    assert admin == [200, 200, 200]
+    print(f"   ✅ 普通用户: {user}, 管理员: {admin}")
+
+
+if __name__ == "__main__":
+    test_redact_params()
+    test_record_slow_query_with_explain()
+    test_slow_query_endpoints_require_admin()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+时间有序ID测试
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.helpers import time_ordered_id
+from entity.goal import Goal
+from entity.paper import Paper  # 注册User.papers关系映射
+from entity.session import Session  # 注册Question.sessions关系映射
+
+
+def test_ids_are_sorted_and_unique():
+    """测试ID按生成顺序递增且不重复"""
+    print("🧪 测试ID有序...")
+
+    ids = [time_ordered_id() for _ in range(10000)]
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+    assert all(len(id) == 26 for id in ids)
+    print(f"   ✅ 示例: {ids[0]}, {ids[-1]}")
+
+
+def test_entity_default_id():
+    """测试实体默认使用时间有序ID"""
+    print("🧪 测试实体ID...")
+
+    first = Goal(name="目标一", creator_id="u1")
+    second = Goal(name="目标二", creator_id="u1")
+    assert len(first.id) == 26 and first.id < second.id
+    print(f"   ✅ 目标ID: {first.id}")
+
+
+if __name__ == "__main__":
+    test_ids_are_sorted_and_unique()
+    test_entity_default_id()
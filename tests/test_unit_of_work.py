@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+工作单元测试
+"""
+
+import sys
+import os
+import asyncio
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from entity.goal import Goal
+from entity.paper import Paper  # 注册User.papers关系映射
+from entity.session import Session  # 注册Question.sessions关系映射
+from dao.cache import entity_cache
+from dao.goal_dao import goal_dao
+from dao.unit_of_work import UnitOfWork, _current_unit_of_work, get_current_unit_of_work
+
+
+class FakeSession:
+    """只记录提交和回滚的会话"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def commit(self):
+        self.calls.append("commit")
+
+    async def flush(self):
+        self.calls.append("flush")
+
+    async def rollback(self):
+        self.calls.append("rollback")
+
+
+def test_commit_inside_unit_of_work_only_flushes():
+    """测试工作单元中DAO的写操作只flush"""
+    print("🧪 测试工作单元中的提交...")
+
+    session = FakeSession()
+    uow = UnitOfWork(session)
+
+    async def run():
+        assert get_current_unit_of_work() is None
+        await goal_dao._commit(session)
+        token = _current_unit_of_work.set(uow)
+        try:
+            await goal_dao._commit(session)
+            await uow.commit()
+        finally:
+            _current_unit_of_work.reset(token)
+
+    asyncio.run(run())
+    assert session.calls == ["commit", "flush", "commit"]
+    print(f"   ✅ 调用顺序: {session.calls}")
+
+
+def test_cache_invalidated_when_unit_of_work_ends():
+    """测试工作单元结束(包括回滚)时再次使缓存失效"""
+    print("🧪 测试工作单元结束时的缓存失效...")
+
+    goal = Goal(name="学习Python", creator_id="u1")
+    uow = UnitOfWork(FakeSession())
+
+    async def run():
+        token = _current_unit_of_work.set(uow)
+        try:
+            goal_dao._invalidate_cache(Goal, [goal.id])
+            # 事务进行中缓存被写入(可能是旧数据或未提交的数据)
+            entity_cache.set(goal)
+            await uow.rollback()
+        finally:
+            _current_unit_of_work.reset(token)
+
+    asyncio.run(run())
+    assert entity_cache.get(Goal, goal.id) is None
+    print("   ✅ 回滚后缓存已失效")
+
+
+if __name__ == "__main__":
+    test_commit_inside_unit_of_work_only_flushes()
+    test_cache_invalidated_when_unit_of_work_ends()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+按过滤条件批量更新测试
+"""
+
+import sys
+import os
+import asyncio
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import select
+from sqlalchemy.dialects import mysql, sqlite
+from sqlite_database import temp_database
+from entity.paper import Paper  # 注册User.papers关系映射
+from entity.session import Session  # 注册Question.sessions关系映射
+from entity.question import Question
+from dao.cache import entity_cache
+from dao.database import get_async_session_maker
+from dao.question_dao import question_dao
+from dao.unit_of_work import UnitOfWork, _current_unit_of_work
+
+
+class FakeSession:
+    """记录执行的语句，每次执行返回给定的ID列表"""
+
+    def __init__(self, dialect, ids):
+        self.bind = SimpleNamespace(dialect=dialect)
+        self.ids = ids
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(str(statement.compile(dialect=self.bind.dialect)))
+        return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: list(self.ids)))
+
+    async def flush(self):
+        pass
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+    def expunge_all(self):
+        pass
+
+
+def _run_in_unit_of_work(session, coro_factory):
+    async def run():
+        uow = UnitOfWork(session)
+        token = _current_unit_of_work.set(uow)
+        try:
+            result = await coro_factory()
+            await uow.commit()
+            return result
+        finally:
+            _current_unit_of_work.reset(token)
+    return asyncio.run(run())
+
+
+def test_update_where_with_returning():
+    """测试支持RETURNING的数据库一条语句完成更新并使缓存失效"""
+    print("🧪 测试RETURNING批量更新...")
+
+    question = Question(subject='math', type='choice', title='题目', creator_id='u1')
+    entity_cache.set(question)
+    session = FakeSession(sqlite.dialect(), [question.id])
+
+    count = _run_in_unit_of_work(session, lambda: question_dao.update_where({'creator_id': 'u1'}, {'is_active': False}))
+    assert count == 1
+    assert len(session.statements) == 1
+    assert session.statements[0].startswith("UPDATE question SET")
+    assert "RETURNING id" in session.statements[0]
+    assert entity_cache.get(Question, question.id) is None
+    print(f"   ✅ 语句: {session.statements[0]}")
+
+
+def test_soft_delete_where_without_returning():
+    """测试不支持RETURNING的数据库先加锁读取ID再更新"""
+    print("🧪 测试MySQL批量软删除...")
+
+    session = FakeSession(mysql.dialect(), ['q1', 'q2'])
+    count = _run_in_unit_of_work(session, lambda: question_dao.soft_delete_where({'creator_id': {'$in': ['u1', 'u2']}}))
+    assert count == 2
+    assert len(session.statements) == 2
+    assert session.statements[0].startswith("SELECT question.id") and "FOR UPDATE" in session.statements[0]
+    assert session.statements[1].startswith("UPDATE question SET") and "is_deleted" in session.statements[1]
+
+    # 没有匹配的行时不执行UPDATE
+    session = FakeSession(mysql.dialect(), [])
+    assert _run_in_unit_of_work(session, lambda: question_dao.soft_delete_where({'creator_id': 'u3'})) == 0
+    assert len(session.statements) == 1
+    print("   ✅ 加锁读取ID后更新")
+
+
+def test_update_where_rejects_invalid_arguments():
+    """测试拒绝空过滤条件和不能更新的字段"""
+    print("🧪 测试参数检查...")
+
+    for kwargs, values in [({}, {'is_active': False}), ({'creator_id': 'u1'}, {'id': 'x'}), ({'creator_id': 'u1'}, {'nope': 1})]:
+        try:
+            asyncio.run(question_dao.update_where(kwargs, values))
+            assert False, "应该抛出ValueError"
+        except ValueError as e:
+            print(f"   ✅ 拒绝: {e}")
+
+
+async def _load_rows() -> dict:
+    """直接读取所有问题(包括已删除的)"""
+    session_maker = await get_async_session_maker()
+    async with session_maker() as session:
+        return {question.id: question for question in (await session.execute(select(Question))).scalars().all()}
+
+
+def test_update_where_on_sqlite():
+    """测试在SQLite上批量更新和软删除: 只影响匹配且未删除的行，更新时间随之更新"""
+    print("🧪 测试SQLite批量更新和软删除...")
+
+    async def run():
+        async with temp_database():
+            for id, creator_id, deleted in [('q1', 'u1', False), ('q2', 'u1', False), ('q3', 'u1', True), ('q4', 'u2', False)]:
+                await question_dao.create(Question(id=id, subject='math', type='choice', title=id, creator_id=creator_id, is_deleted=deleted))
+            before = await _load_rows()
+            cached = await question_dao.get_by_id('q1')
+            updated = await question_dao.update_where({'creator_id': 'u1'}, {'tip': '批量提示'})
+            after_update = await _load_rows()
+            reloaded = await question_dao.get_by_id('q1')
+            deleted = await question_dao.soft_delete_where({'creator_id': {'$in': ['u1', 'u3']}})
+            after_delete = await _load_rows()
+            return before, cached, updated, after_update, reloaded, deleted, after_delete, await question_dao.get_by_id('q2')
+
+    before, cached, updated, after_update, reloaded, deleted, after_delete, missing = asyncio.run(run())
+    assert updated == 2
+    assert [id for id, row in after_update.items() if row.tip == '批量提示'] == ['q1', 'q2']
+    # 已删除和不匹配的行不更新，更新时间也不变
+    assert after_update['q3'].tip is None and after_update['q3'].updated_at == before['q3'].updated_at
+    assert after_update['q4'].tip is None and after_update['q4'].updated_at == before['q4'].updated_at
+    assert after_update['q1'].updated_at > before['q1'].updated_at
+    # 更新前读入缓存的实体已失效
+    assert cached.tip is None and reloaded.tip == '批量提示'
+
+    assert deleted == 2
+    assert [id for id, row in after_delete.items() if row.is_deleted] == ['q1', 'q2', 'q3']
+    assert after_delete['q1'].updated_at > after_update['q1'].updated_at
+    assert after_delete['q3'].updated_at == before['q3'].updated_at
+    assert missing is None
+    print(f"   ✅ 更新{updated}行, 软删除{deleted}行")
+
+
+if __name__ == "__main__":
+    test_update_where_with_returning()
+    test_soft_delete_where_without_returning()
+    test_update_where_rejects_invalid_arguments()
+    test_update_where_on_sqlite()
@@ -1,5 +1,5 @@
 from fastapi import Request
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
 def parse_dynamic_filters(request: Request) -> Dict[str, Any]:
     """
@@ -8,6 +8,7 @@ def parse_dynamic_filters(request: Request) -> Dict[str, Any]:
     - 范围参数：field__gte=value, field__lte=value, field__gt=value, field__lt=value
     - 模糊匹配：field__like=value
     - 包含匹配：field__in=value1,value2,value3
+    - 全文搜索：field__match=value (仅支持声明了全文索引的字段，如问题的title)
     - 不等于：field__ne=value
     
     Args:
@@ -20,7 +21,7 @@ def parse_dynamic_filters(request: Request) -> Dict[str, Any]:
     query_params = dict(request.query_params)
 
     # 移除特殊参数
-    special_params = ['page', 'page_size', 'order_by']
+    special_params = ['page', 'page_size', 'order_by', 'cursor', 'fields']
     for param in special_params:
         query_params.pop(param, None)
     
@@ -32,7 +33,7 @@ def parse_dynamic_filters(request: Request) -> Dict[str, Any]:
         if '__' in key:
             field_name, operator = key.split('__', 1)
             
-            if operator in ['gte', 'lte', 'gt', 'lt', 'ne', 'like', 'in']:
+            if operator in ['gte', 'lte', 'gt', 'lt', 'ne', 'like', 'match', 'in']:
                 if operator == 'in':
                     # 处理包含查询，支持逗号分隔的值
                     values = [v.strip() for v in value.split(',') if v.strip()]
@@ -45,7 +46,8 @@ def parse_dynamic_filters(request: Request) -> Dict[str, Any]:
                         'gt': '$gt',
                         'lt': '$lt',
                         'ne': '$ne',
-                        'like': '$like'
+                        'like': '$like',
+                        'match': '$match'
                     }
                     filters[field_name] = {op_map[operator]: value}
             else:
@@ -57,3 +59,19 @@ def parse_dynamic_filters(request: Request) -> Dict[str, Any]:
     
     return filters
 
+
+
+def parse_fields(fields: Optional[str], default: Optional[List[str]] = None) -> Optional[List[str]]:
+    """
+    解析列表接口的fields参数(逗号分隔的字段名)，指定需要返回的字段
+
+    Args:
+        fields: fields参数值
+        default: 未指定时使用的字段列表
+
+    Returns:
+        List[str]: 字段名列表
+    """
+    if not fields:
+        return default
+    return [field.strip() for field in fields.split(',') if field.strip()]
@@ -0,0 +1,63 @@
+"""
+压缩工具 - 大块JSON/文本数据压缩后存储
+"""
+
+import json
+import zlib
+from datetime import datetime
+from enum import Enum
+from typing import Any, Union
+
+# zlib压缩级别，6为速度和压缩率的折中
+COMPRESS_LEVEL = 6
+
+# compress_text的格式: 以COMPRESSED_MAGIC开头的是zlib压缩的UTF-8文本，其余为未压缩的UTF-8文本。
+# 第二个字节标识压缩算法，文本很少以\x00开头，以\x00开头的文本总是压缩存储，避免与压缩数据混淆
+COMPRESSED_MAGIC = b'\x00z'
+# 短于该字节数的文本压缩收益很小，不压缩
+COMPRESS_MIN_SIZE = 256
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"无法序列化的类型: {type(value).__name__}")
+
+
+def compress_text(text: str, level: int = COMPRESS_LEVEL, min_size: int = COMPRESS_MIN_SIZE) -> bytes:
+    """压缩文本，较短或压缩后没有变小的文本只编码为UTF-8"""
+    data = text.encode('utf-8')
+    if len(data) < min_size and not data.startswith(b'\x00'):
+        return data
+    compressed = COMPRESSED_MAGIC + zlib.compress(data, level)
+    if len(compressed) >= len(data) and not data.startswith(b'\x00'):
+        return data
+    return compressed
+
+
+def decompress_text(data: Union[bytes, str]) -> str:
+    """还原compress_text的结果，字符串(还未改写的旧数据)原样返回"""
+    if isinstance(data, str):
+        return data
+    data = bytes(data)
+    if data.startswith(COMPRESSED_MAGIC):
+        return zlib.decompress(data[len(COMPRESSED_MAGIC):]).decode('utf-8')
+    return data.decode('utf-8')
+
+
+def is_compressed(data: Union[bytes, str, None]) -> bool:
+    """数据是否为compress_text压缩后的格式"""
+    return isinstance(data, (bytes, bytearray, memoryview)) and bytes(data[:len(COMPRESSED_MAGIC)]) == COMPRESSED_MAGIC
+
+
+def compress_json(data: Any, level: int = COMPRESS_LEVEL) -> bytes:
+    """序列化为JSON后用zlib压缩，datetime转为ISO格式字符串，枚举转为值"""
+    text = json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=_json_default)
+    return zlib.compress(text.encode('utf-8'), level)
+
+
+def decompress_json(payload: bytes) -> Any:
+    """解压并解析compress_json的结果"""
+    return json.loads(zlib.decompress(payload).decode('utf-8'))
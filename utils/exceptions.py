@@ -34,6 +34,13 @@ class ValidationException(BusinessException):
         super().__init__(code=400, message=message, details=details)
 
 
+class ConflictException(BusinessException):
+    """数据冲突异常"""
+    
+    def __init__(self, message: str = "数据已被修改", details: Optional[str] = None):
+        super().__init__(code=409, message=message, details=details)
+
+
 class PermissionException(BusinessException):
     """权限异常"""
     
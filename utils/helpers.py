@@ -3,6 +3,9 @@
 """
 
 import logging
+import os
+import threading
+import time
 import uuid
 import requests
 from io import BytesIO
@@ -35,6 +38,43 @@ def setup_logging(name: str = "langgraph_agents") -> logging.Logger:
 def random_uuid(length: int = 10) -> str:
     return uuid.uuid4().hex[:length]
 
+
+# ULID使用的Crockford Base32字符表(小写)，字符顺序与ASCII顺序一致，字符串排序即时间排序
+_ULID_ALPHABET = "0123456789abcdefghjkmnpqrstvwxyz"
+_ulid_lock = threading.Lock()
+_ulid_last_ms = 0
+_ulid_last_random = 0
+
+
+def _encode_base32(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        chars.append(_ULID_ALPHABET[value & 31])
+        value >>= 5
+    return ''.join(reversed(chars))
+
+
+def time_ordered_id() -> str:
+    """
+    生成按时间递增的实体ID(ULID格式，26个字符)
+
+    前10个字符是毫秒时间戳，后16个字符是80位随机数；同一毫秒内生成的ID在上一个随机数上加1，
+    保证同一进程内严格递增。新行总是写在主键索引的末尾，避免随机ID造成的页分裂。
+    旧数据的10位十六进制ID仍然有效，两种ID可以共存于同一列
+    """
+    global _ulid_last_ms, _ulid_last_random
+    with _ulid_lock:
+        now_ms = int(time.time() * 1000)
+        if now_ms <= _ulid_last_ms:
+            # 同一毫秒(或系统时间回拨)时沿用上一个时间戳，随机数加1
+            now_ms = _ulid_last_ms
+            random_part = (_ulid_last_random + 1) & ((1 << 80) - 1)
+        else:
+            random_part = int.from_bytes(os.urandom(10), 'big')
+        _ulid_last_ms = now_ms
+        _ulid_last_random = random_part
+    return _encode_base32(now_ms, 10) + _encode_base32(random_part, 16)
+
 def download_bytes_from_url(url: str) -> BytesIO:
     resp = requests.get(url)
     resp.raise_for_status()